@@ -1,21 +1,51 @@
-import inspect
 import os
 import sys
-from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser
-from importlib.metadata import version
-from importlib.util import module_from_spec, spec_from_file_location
+from argparse import SUPPRESS, Action, ArgumentDefaultsHelpFormatter, ArgumentParser
 from pathlib import Path
-from types import FunctionType, ModuleType
 from typing import Any, Final, Literal
 
+from idefix_cli._registry import (
+    CommandManifest,
+    CommandRegistry,
+    LazyCommandParser,
+    get_module_from_path,  # noqa: F401 (backward compatibility)
+)
 from idefix_cli._theme import theme_ctx
 from idefix_cli.lib import get_config_file, get_option, print_error, print_warning
 
-CommandMap = dict[str, tuple[FunctionType, bool]]
+CommandMap = CommandRegistry
 
 
 BASE_COMMAND_PATH: Final[str] = str(Path(__file__).parent / "_commands")
 
+# path to an `idfx serve` socket. If defined, commands are forwarded to the server
+SOCKET_ENV_VAR: Final[str] = "IDFX_SOCKET"
+
+
+class _VersionAction(Action):
+    # equivalent to argparse's builtin 'version' action, but the version is
+    # only looked up when requested, because importlib.metadata is slow to import
+    def __init__(
+        self,
+        option_strings: list[str],
+        dest: str = SUPPRESS,
+        default: str = SUPPRESS,
+        help: str = "show program's version number and exit",
+    ) -> None:
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=default,
+            nargs=0,
+            help=help,
+        )
+
+    def __call__(self, parser: ArgumentParser, *args: Any, **kwargs: Any) -> None:
+        from importlib.metadata import version
+
+        print(version("idefix-cli"))
+        parser.exit()
+
 
 def _get_command_paths() -> list[str]:
     dirs = [BASE_COMMAND_PATH]
@@ -43,72 +73,27 @@ def _get_command_paths() -> list[str]:
     return paths
 
 
-def get_module_from_path(path: str, name: str) -> ModuleType:
-    if (spec := spec_from_file_location(name, path)) is None or spec.loader is None:
-        raise RuntimeError(f"Failed to load module from {path}")
-
-    module = module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-
 def _setup_commands(parser: ArgumentParser) -> CommandMap:
-    sparsers = parser.add_subparsers(title="commands", dest="command")
-    cmddict: CommandMap = {}
-    paths = _get_command_paths()
-
-    for module_path in paths:
-        command_name, _ = os.path.splitext(os.path.basename(module_path))
-        module = get_module_from_path(module_path, command_name)
-
-        # plugin validation
-
-        _command = getattr(module, "command", None)
-        _add_arguments = getattr(module, "add_arguments", None)
-
-        if _command is _add_arguments is None:
-            raise RuntimeError(
-                f"command plugin {command_name} is missing required functions "
-                "'command' and 'add_arguments'"
-            )
-        elif _command is None:
-            raise RuntimeError(
-                f"command plugin {command_name} is missing a 'command' function"
-            )
-        elif _add_arguments is None:
-            raise RuntimeError(
-                f"command plugin {command_name} is missing a 'add_arguments' function"
-            )
-
-        sig = inspect.signature(_add_arguments)
-        if (params := list(sig.parameters.keys())) != ["parser"]:
-            raise RuntimeError(
-                f"command plugin {command_name}.add_arguments function's signature is invalid. "
-                f"Expected a single argument named 'parser', found {params}"
-            )
-
-        if not module.__doc__:
-            # default is None, but we also invalidate empty strings
-            raise RuntimeError(
-                f"command plugin {command_name} is missing a module docstring"
-            )
-
-        usage: str | None
-        help, _, usage = module.__doc__.strip().partition("\n")
-        usage = usage or None
-        sub_parser = sparsers.add_parser(
-            command_name,
-            help=help,
-            usage=usage,
+    sparsers = parser.add_subparsers(
+        title="commands", dest="command", parser_class=LazyCommandParser
+    )
+    cmddict = CommandRegistry()
+    manifest = CommandManifest()
+
+    for module_path in _get_command_paths():
+        lazy_command = manifest.load_command(module_path)
+        metadata = lazy_command.metadata
+        # arguments are only added if and when the sub parser is selected
+        sparsers.add_parser(
+            metadata.name,
+            help=metadata.help,
+            usage=metadata.usage,
             formatter_class=ArgumentDefaultsHelpFormatter,
+            command=lazy_command,
         )
-        module.add_arguments(sub_parser)
-        sig = inspect.signature(module.command)
+        cmddict.register(lazy_command)
 
-        accepts_unknown_args = any(
-            param.kind is param.VAR_POSITIONAL for param in sig.parameters.values()
-        )
-        cmddict.update({command_name: (module.command, accepts_unknown_args)})
+    manifest.save()
     return cmddict
 
 
@@ -121,9 +106,7 @@ def cli(caller: Literal["idfx", "baballe"], argv: list[str] | None = None) -> An
     # https://docs.python.org/3.14/library/argparse.html#suggest-on-error
     parser.suggest_on_error = True  # type: ignore [attr-defined]
 
-    parser.add_argument(
-        "-v", "--version", action="version", version=version("idefix-cli")
-    )
+    parser.add_argument("-v", "--version", action=_VersionAction)
     commands = _setup_commands(parser)
 
     known_args, unknown_args = parser.parse_known_args(argv)
@@ -145,13 +128,38 @@ def cli(caller: Literal["idfx", "baballe"], argv: list[str] | None = None) -> An
     return cmd(*unknown_args, **vars(known_args))
 
 
-def main(caller: Literal["idfx", "baballe"], argv: list[str] | None = None) -> Any:
+def as_exit_code(retv: Any) -> int:
+    """Convert a command's return value (or SystemExit code) to an exit code,
+    as the interpreter would"""
+    if retv is None:
+        return 0
+    if isinstance(retv, int):
+        return retv
+    print(retv, file=sys.stderr)
+    return 1
+
+
+def run_locally(
+    caller: Literal["idfx", "baballe"], argv: list[str] | None = None
+) -> Any:
     theme_name = {"idfx": "default", "baballe": "baballe"}[caller]
 
     with theme_ctx(theme_name):
         return cli(caller, argv)
 
 
+def main(caller: Literal["idfx", "baballe"], argv: list[str] | None = None) -> Any:
+    args = sys.argv[1:] if argv is None else argv
+    if (socket_path := os.environ.get(SOCKET_ENV_VAR)) and args[:1] != ["serve"]:
+        from idefix_cli._client import forward
+
+        # fall back to running locally if the server is unreachable
+        if (ret := forward(caller, args, socket_path=socket_path)) is not None:
+            return ret
+
+    return run_locally(caller, argv)
+
+
 def idfx_entry_point(argv: list[str] | None = None) -> Any:
     return main(caller="idfx", argv=argv)
 
@@ -0,0 +1,476 @@
+"""A build cache shared between problem directories.
+
+Compiled objects are stored in entries keyed on Idefix's revision, the compiler
+and the build options (as recorded in CMakeCache.txt), so problem directories
+configured identically (e.g., clones in an ensemble) can reuse each other's
+objects instead of building Kokkos and Idefix from scratch.
+
+Within an entry, objects are addressed by the content of their dependencies
+(as recorded by the compiler), so an object is only reused if all files it was
+compiled from, within the problem directory and Idefix's sources, are identical.
+Paths to these directories are normalized, so entries can be shared between
+problem directories, and between copies of Idefix at the same revision.
+System headers are assumed to be covered by the compiler's identity.
+
+Entries are evicted in least recently used order, to stay within a size budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from collections.abc import Iterable
+from contextlib import suppress
+from pathlib import Path
+from shutil import copyfile, rmtree
+from typing import Any, Final, NamedTuple
+
+from idefix_cli._cache import dump_json, get_cache_dir, load_json
+from idefix_cli._cmake import read_cmake_cache
+from idefix_cli._rebuild import _get_file_key, _hash_file, get_index_dir, parse_depfile
+from idefix_cli.lib import get_config_file, get_idefix_info, get_option, print_warning
+
+__all__ = [
+    "BuildCache",
+    "BuildKey",
+    "CacheEntry",
+    "format_size",
+    "get_build_cache",
+    "get_build_key",
+    "parse_size",
+]
+
+CACHE_FORMAT_VERSION: Final = 1
+DEFAULT_MAX_SIZE: Final = 5 * 1024**3
+
+# placeholders for directories that objects may depend on
+_BUILD_DIR: Final = "@build"
+_IDEFIX_DIR: Final = "@idefix"
+
+_TRUE_VALUES: Final = frozenset(("true", "yes", "on", "1"))
+_FALSE_VALUES: Final = frozenset(("false", "no", "off", "0", ""))
+
+_SIZE_REGEXP = re.compile(
+    r"^\s*(?P<value>\d+(?:\.\d*)?)\s*(?P<unit>[KMGT]?)(?:i?B)?\s*$", re.IGNORECASE
+)
+_SIZE_UNITS: Final = ("", "K", "M", "G", "T")
+
+
+def parse_size(size: str) -> int:
+    """Parse a size in bytes, with an optional binary unit (e.g., '500M', '10GiB')
+
+    Raise ValueError if the size cannot be parsed.
+    """
+    if (match := _SIZE_REGEXP.match(size)) is None:
+        raise ValueError(f"invalid size {size!r}")
+    exponent = _SIZE_UNITS.index(match["unit"].upper())
+    return int(float(match["value"]) * 1024**exponent)
+
+
+def format_size(size: int) -> str:
+    value = float(size)
+    exponent = 0
+    while value >= 1024 and exponent < len(_SIZE_UNITS) - 1:
+        value /= 1024
+        exponent += 1
+    if exponent == 0:
+        return f"{size} B"
+    return f"{value:.1f} {_SIZE_UNITS[exponent]}iB"
+
+
+class BuildKey(NamedTuple):
+    digest: str
+    # human readable information, for `idfx cache`
+    revision: str
+    compiler: str
+
+
+def _get_compiler_id(directory: str) -> str:
+    # CMake records the compiler's identity in CMakeFiles/<cmake version>/
+    cmake_files = os.path.join(directory, "CMakeFiles")
+    try:
+        names = sorted(os.listdir(cmake_files))
+    except OSError:
+        return ""
+    for name in names:
+        try:
+            with open(os.path.join(cmake_files, name, "CMakeCXXCompiler.cmake")) as fh:
+                content = fh.read()
+        except OSError:
+            continue
+        values = dict(
+            re.findall(r'^set\(CMAKE_CXX_COMPILER_(ID|VERSION) "(.*)"\)', content, re.M)
+        )
+        return f"{values.get('ID', '')} {values.get('VERSION', '')}".strip()
+    return ""
+
+
+def get_build_key(directory: str | os.PathLike[str]) -> BuildKey | None:
+    """Return the key of build cache entries for a problem directory,
+    or None if it wasn't configured with CMake's Makefile generator."""
+    directory = os.path.abspath(directory)
+    try:
+        cache = read_cmake_cache(os.path.join(directory, "CMakeCache.txt"))
+    except OSError:
+        return None
+    if (generator := cache.get("CMAKE_GENERATOR")) is None or (
+        generator.value != "Unix Makefiles"
+    ):
+        # Ninja consumes depfiles, and tracks objects in its own database,
+        # so objects cannot be stored nor restored
+        return None
+
+    options = sorted(
+        (name, entry.type, entry.value.replace(directory, _BUILD_DIR))
+        for name, entry in cache.items()
+        if entry.type not in ("INTERNAL", "STATIC")
+    )
+    info = get_idefix_info()
+    revision = info.git_head or str(info.version)
+    compiler = _get_compiler_id(directory)
+    digest = hashlib.sha256(
+        json.dumps([CACHE_FORMAT_VERSION, revision, compiler, options]).encode()
+    ).hexdigest()
+    return BuildKey(digest=digest[:16], revision=revision, compiler=compiler)
+
+
+class CacheEntry(NamedTuple):
+    key: str
+    path: Path
+    size: int
+    nobjects: int
+    # in ns since the epoch
+    last_used: int
+    revision: str
+    compiler: str
+
+
+def _escape_make_word(word: str) -> str:
+    return word.replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
+
+
+class _PathNormalizer:
+    def __init__(self, build_dir: str, idefix_dir: str) -> None:
+        # the most specific prefix goes first, since problem directories
+        # are often nested within Idefix's sources (e.g., in test/)
+        self._prefixes = sorted(
+            (
+                (os.path.join(os.path.abspath(build_dir), ""), _BUILD_DIR),
+                (os.path.join(os.path.abspath(idefix_dir), ""), _IDEFIX_DIR),
+            ),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._hashes: dict[str, str | None] = {}
+
+    def normalize(self, path: str) -> str:
+        for prefix, placeholder in self._prefixes:
+            if path.startswith(prefix):
+                return placeholder + "/" + path[len(prefix) :].replace(os.sep, "/")
+        return path
+
+    def resolve(self, path: str) -> str:
+        for prefix, placeholder in self._prefixes:
+            if path.startswith(placeholder + "/"):
+                return prefix + path[len(placeholder) + 1 :].replace("/", os.sep)
+        return path
+
+    def get_hash(self, path: str) -> str | None:
+        # memoized, since many objects share the same headers
+        if path not in self._hashes:
+            self._hashes[path] = _hash_file(path)
+        return self._hashes[path]
+
+    def get_dependency_hashes(self, deps: Iterable[str]) -> dict[str, str | None]:
+        # only files within the problem directory or Idefix's sources are hashed
+        retv: dict[str, str | None] = {}
+        for dep in deps:
+            normalized = self.normalize(dep)
+            if normalized == dep:
+                retv[normalized] = None
+            elif (digest := self.get_hash(dep)) is not None:
+                retv[normalized] = digest
+        return retv
+
+
+def _get_target_dirs(build_dir: str) -> list[str]:
+    # all targets' object directories (<dir>/CMakeFiles/<target>.dir),
+    # as listed by CMake's Makefile generator
+    try:
+        with open(os.path.join(build_dir, "CMakeFiles", "TargetDirectories.txt")) as fh:
+            return [line.strip() for line in fh if line.strip()]
+    except OSError:
+        return []
+
+
+class BuildCache:
+    def __init__(
+        self, root: str | os.PathLike[str], *, max_size: int, enabled: bool = True
+    ) -> None:
+        self.root = Path(root)
+        self.max_size = max_size
+        # disabled caches can still be inspected and evicted from
+        self.enabled = enabled
+
+    def _get_manifest_file(self, key: str) -> Path:
+        return self.root / key / "manifest.json"
+
+    def _load_manifest(self, key: str) -> dict[str, Any] | None:
+        data = load_json(self._get_manifest_file(key))
+        if data.get("version") != CACHE_FORMAT_VERSION or not isinstance(
+            data.get("objects"), dict
+        ):
+            return None
+        return data
+
+    def list_entries(self) -> list[CacheEntry]:
+        """Return all entries, from the most to the least recently used"""
+        entries: list[CacheEntry] = []
+        try:
+            keys = os.listdir(self.root)
+        except OSError:
+            return []
+        for key in keys:
+            manifest_file = self._get_manifest_file(key)
+            if (data := self._load_manifest(key)) is None:
+                continue
+            try:
+                last_used = manifest_file.stat().st_mtime_ns
+            except OSError:
+                continue
+            variants = [v for obj in data["objects"].values() for v in obj.values()]
+            entries.append(
+                CacheEntry(
+                    key=key,
+                    path=self.root / key,
+                    size=sum(v["size"] for v in variants),
+                    nobjects=len(variants),
+                    last_used=last_used,
+                    revision=data["revision"],
+                    compiler=data["compiler"],
+                )
+            )
+        return sorted(entries, key=lambda e: e.last_used, reverse=True)
+
+    def evict(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            rmtree(self.root / key, ignore_errors=True)
+
+    def trim(self, max_size: int | None = None, *, keep: str = "") -> list[CacheEntry]:
+        """Evict least recently used entries until the cache fits within max_size
+        (defaults to the configured budget). Return evicted entries.
+
+        The entry designated by `keep` is never evicted.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = self.list_entries()
+        total = sum(e.size for e in entries)
+        evicted: list[CacheEntry] = []
+        for entry in reversed(entries):
+            if total <= max_size:
+                break
+            if entry.key == keep:
+                continue
+            self.evict([entry.key])
+            total -= entry.size
+            evicted.append(entry)
+        return evicted
+
+    def restore(self, directory: str | os.PathLike[str], key: BuildKey) -> int:
+        """Copy cached objects that are missing from a problem directory,
+        if all their dependencies are identical. Return the number of
+        restored objects."""
+        if (data := self._load_manifest(key.digest)) is None:
+            return 0
+
+        build_dir = os.path.abspath(directory)
+        paths = _PathNormalizer(build_dir, os.environ["IDEFIX_DIR"])
+        target_dirs = set(_get_target_dirs(build_dir))
+        record = _LocalRecord(build_dir, key.digest)
+        restored = 0
+        for relobj, variants in data["objects"].items():
+            obj = os.path.join(build_dir, *relobj.split("/"))
+            target_dir, _, _ = obj.partition(".dir" + os.sep)
+            target_dir += ".dir"
+            if target_dir not in target_dirs or os.path.exists(obj):
+                continue
+            matches = (
+                (vid, variant["deps"])
+                for vid, variant in variants.items()
+                if all(
+                    digest is None or paths.get_hash(paths.resolve(dep)) == digest
+                    for dep, digest in variant["deps"].items()
+                )
+            )
+            if (match := next(matches, None)) is None:
+                continue
+            vid, deps = match
+
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp_obj = f"{obj}.{os.getpid()}.tmp"
+            try:
+                copyfile(self.root / key.digest / "objects" / f"{vid}.o", tmp_obj)
+                # the depfile is written first, so an object is never
+                # restored without its dependencies
+                target = os.path.relpath(
+                    obj, os.path.dirname(os.path.dirname(target_dir))
+                )
+                with open(
+                    f"{obj}.d", "w", encoding="utf-8", errors="surrogateescape"
+                ) as fh:
+                    fh.write(f"{_escape_make_word(target)}: \\\n")
+                    fh.write(
+                        " \\\n".join(
+                            f"  {_escape_make_word(paths.resolve(dep))}" for dep in deps
+                        )
+                    )
+                    fh.write("\n")
+                os.replace(tmp_obj, obj)
+            except OSError:
+                for file in (tmp_obj, f"{obj}.d"):
+                    with suppress(OSError):
+                        os.remove(file)
+                continue
+            record.add(relobj, obj)
+            restored += 1
+
+        if restored:
+            # mark the entry as recently used
+            with suppress(OSError):
+                os.utime(self._get_manifest_file(key.digest))
+            record.save()
+        return restored
+
+    def store(self, directory: str | os.PathLike[str], key: BuildKey) -> int:
+        """Add objects from a problem directory to the cache.
+        Return the number of stored objects."""
+        build_dir = os.path.abspath(directory)
+        paths = _PathNormalizer(build_dir, os.environ["IDEFIX_DIR"])
+        record = _LocalRecord(build_dir, key.digest)
+        objects_dir = self.root / key.digest / "objects"
+        new_objects: dict[str, dict[str, Any]] = {}
+        for target_dir in _get_target_dirs(build_dir):
+            base_dir = os.path.dirname(os.path.dirname(target_dir))
+            for dirpath, _, filenames in os.walk(target_dir):
+                for name in filenames:
+                    if not name.endswith(".o"):
+                        continue
+                    obj = os.path.join(dirpath, name)
+                    relobj = os.path.relpath(obj, build_dir).replace(os.sep, "/")
+                    if record.is_stored(relobj, obj):
+                        continue
+                    try:
+                        deps = parse_depfile(f"{obj}.d", base_dir=base_dir)
+                    except OSError:
+                        # objects are only reused if their dependencies are known
+                        continue
+                    hashes = dict(sorted(paths.get_dependency_hashes(deps).items()))
+                    vid = hashlib.sha256(
+                        json.dumps([relobj, list(hashes.items())]).encode()
+                    ).hexdigest()
+                    cached_obj = objects_dir / f"{vid}.o"
+                    try:
+                        if not cached_obj.is_file():
+                            objects_dir.mkdir(parents=True, exist_ok=True)
+                            tmp_obj = cached_obj.with_suffix(f".{os.getpid()}.tmp")
+                            copyfile(obj, tmp_obj)
+                            os.replace(tmp_obj, cached_obj)
+                        size = cached_obj.stat().st_size
+                    except OSError:
+                        continue
+                    new_objects.setdefault(relobj, {})[vid] = {
+                        "deps": hashes,
+                        "size": size,
+                    }
+                    record.add(relobj, obj)
+
+        if new_objects:
+            # reload the manifest as late as possible, since other processes
+            # may write to the same entry concurrently
+            data = self._load_manifest(key.digest) or {
+                "version": CACHE_FORMAT_VERSION,
+                "revision": key.revision,
+                "compiler": key.compiler,
+                "objects": {},
+            }
+            for relobj, variants in new_objects.items():
+                data["objects"].setdefault(relobj, {}).update(variants)
+            dump_json(self._get_manifest_file(key.digest), data)
+        record.save()
+        return sum(len(v) for v in new_objects.values())
+
+
+class _LocalRecord:
+    # objects of a problem directory that are known to be in the cache,
+    # so they are not hashed again
+    def __init__(self, build_dir: str, key: str) -> None:
+        self.file = os.path.join(get_index_dir(build_dir), "build_cache.json")
+        data = load_json(self.file)
+        self.key = key
+        self._objects: dict[str, list[int]]
+        if (
+            data.get("version") == CACHE_FORMAT_VERSION
+            and data.get("key") == key
+            and isinstance(data.get("objects"), dict)
+        ):
+            self._objects = data["objects"]
+        else:
+            self._objects = {}
+        self._modified = False
+
+    def is_stored(self, relobj: str, obj: str) -> bool:
+        return self._objects.get(relobj) == _get_file_key(obj)
+
+    def add(self, relobj: str, obj: str) -> None:
+        if (file_key := _get_file_key(obj)) is not None:
+            self._objects[relobj] = file_key
+            self._modified = True
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        dump_json(
+            self.file,
+            {
+                "version": CACHE_FORMAT_VERSION,
+                "key": self.key,
+                "objects": self._objects,
+            },
+        )
+        self._modified = False
+
+
+def _get_max_size() -> int:
+    if not (max_size_str := get_option("idfx cache", "max_size")):
+        return DEFAULT_MAX_SIZE
+    try:
+        return parse_size(max_size_str)
+    except ValueError:
+        print_warning(
+            "Expected [idfx cache].max_size to be a size (e.g. '10G'), "
+            f"got {max_size_str!r} from {get_config_file()}. "
+            f"Using default value ({format_size(DEFAULT_MAX_SIZE)})."
+        )
+        return DEFAULT_MAX_SIZE
+
+
+def get_build_cache() -> BuildCache:
+    """Return the build cache, as configured in the [idfx cache] section"""
+    enabled_str = get_option("idfx cache", "enabled").lower()
+    if enabled_str not in _TRUE_VALUES | _FALSE_VALUES:
+        print_warning(
+            "Expected [idfx cache].enabled to be a boolean, "
+            f"got {enabled_str!r} from {get_config_file()}. "
+            "The build cache is disabled."
+        )
+
+    if directory := get_option("idfx cache", "directory"):
+        root = Path(directory).expanduser()
+    else:
+        root = get_cache_dir() / "builds"
+    return BuildCache(
+        root, max_size=_get_max_size(), enabled=enabled_str in _TRUE_VALUES
+    )
@@ -0,0 +1,221 @@
+"""Compilation timings of translation units, summarized after a build.
+
+Makefile builds are instrumented by substituting make's SHELL with a wrapper
+(_build_timer.py) recording the duration and CPU time of each compilation command.
+Ninja builds need no instrumentation, since timings are already recorded in
+.ninja_log, but CPU times aren't available.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from contextlib import suppress
+from pathlib import Path
+from tempfile import mkstemp
+from typing import NamedTuple
+
+from idefix_cli._cmake import get_generator
+from idefix_cli.lib import print_warning
+
+__all__ = [
+    "BuildTimer",
+    "CompileRecord",
+    "format_build_report",
+    "format_duration",
+]
+
+TIMER_SCRIPT = Path(__file__).with_name("_build_timer.py")
+_OBJECT_SUFFIXES = (".o", ".obj")
+_WHITESPACE = re.compile(r"\s")
+
+
+class CompileRecord(NamedTuple):
+    target: str
+    start_ns: int
+    end_ns: int
+    cpu_ns: int | None = None
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+
+def format_duration(ns: int) -> str:
+    """
+    Examples:
+        >>> format_duration(12_345_000_000)
+        '12.3s'
+        >>> format_duration(83_400_000_000)
+        '1m23.4s'
+    """
+    minutes, seconds = divmod(ns / 1e9, 60)
+    if minutes:
+        return f"{minutes:.0f}m{seconds:04.1f}s"
+    return f"{seconds:.1f}s"
+
+
+def _parse_timer_log(content: str) -> list[CompileRecord]:
+    records = []
+    for line in content.splitlines():
+        try:
+            start, end, cpu, target = line.split("\t", maxsplit=3)
+            records.append(CompileRecord(target, int(start), int(end), int(cpu)))
+        except ValueError:
+            continue
+    return records
+
+
+def _parse_ninja_log(content: str) -> list[CompileRecord]:
+    # start and end times are in ms, relative to the start of the build
+    records = []
+    for line in content.splitlines():
+        if line.startswith("#"):
+            continue
+        try:
+            start, end, _mtime, target, _hash = line.split("\t")
+            if target.endswith(_OBJECT_SUFFIXES):
+                records.append(
+                    CompileRecord(target, int(start) * 10**6, int(end) * 10**6)
+                )
+        except ValueError:
+            continue
+    return records
+
+
+class BuildTimer:
+    """Time translation units compiled while building a problem directory.
+
+    Use instrument() to adapt the build command, then collect() once it's done.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+        self.generator = get_generator(directory)
+        self.enabled = False
+        self._logfile: str | None = None
+        self._ninja_log_offset = 0
+
+    @property
+    def ninja_log(self) -> Path:
+        return self.directory / ".ninja_log"
+
+    def instrument(self, cmd: list[str]) -> list[str]:
+        """Return the build command, adapted to record compilation timings.
+
+        The command is returned unchanged, with a warning,
+        if timings can't be recorded for this build.
+        """
+        if self.generator == "Ninja":
+            try:
+                self._ninja_log_offset = self.ninja_log.stat().st_size
+            except FileNotFoundError:
+                self._ninja_log_offset = 0
+            self.enabled = True
+            return cmd
+
+        if self.generator not in (None, "Unix Makefiles"):
+            print_warning(
+                f"build reports are not supported with the {self.generator} generator"
+            )
+            return cmd
+
+        fd, self._logfile = mkstemp(prefix="idfx-build-", suffix=".log")
+        os.close(fd)
+        shell_args = [sys.executable, "-S", str(TIMER_SCRIPT), self._logfile]
+        if any(_WHITESPACE.search(arg) for arg in shell_args):
+            # make splits SHELL on whitespace
+            print_warning(
+                "build reports are not supported with paths containing whitespace "
+                f"({' '.join(shell_args)!r})"
+            )
+            self.cleanup()
+            return cmd
+
+        self.enabled = True
+        make_args = [f"SHELL={' '.join(shell_args)}"]
+        if cmd[0] == "cmake":
+            return [*cmd, "--", *make_args]
+        return [*cmd, *make_args]
+
+    def collect(self) -> list[CompileRecord] | None:
+        """Return timings recorded since the build command was instrumented,
+        or None if it couldn't be instrumented."""
+        if not self.enabled:
+            return None
+
+        if self.generator == "Ninja":
+            try:
+                with open(self.ninja_log, "rb") as fh:
+                    fh.seek(self._ninja_log_offset)
+                    content = fh.read().decode(errors="replace")
+            except OSError:
+                return []
+            return _parse_ninja_log(content)
+
+        assert self._logfile is not None
+        try:
+            with open(self._logfile) as fh:
+                return _parse_timer_log(fh.read())
+        except OSError:
+            return []
+        finally:
+            self.cleanup()
+
+    def cleanup(self) -> None:
+        if self._logfile is not None:
+            with suppress(OSError):
+                os.remove(self._logfile)
+            self._logfile = None
+
+
+def _shorten(target: str, roots: list[Path]) -> str:
+    path = Path(target)
+    for root in roots:
+        if path.is_relative_to(root):
+            return str(path.relative_to(root))
+    return target
+
+
+def format_build_report(
+    records: list[CompileRecord],
+    *,
+    wall_ns: int,
+    jobs: int,
+    top: int = 10,
+    roots: list[Path] | None = None,
+) -> str:
+    """Summarize compilation timings: slowest translation units,
+    total compilation and CPU times, and achieved parallelism.
+
+    Targets are displayed relative to the first matching directory in roots.
+    """
+    if not records:
+        return "Build report: no translation units were compiled"
+
+    busy_ns = sum(r.duration_ns for r in records)
+    lines = [
+        (
+            f"Build report: {len(records)} translation units compiled "
+            f"in {format_duration(wall_ns)} (wall time)"
+        ),
+        f"  total compilation time: {format_duration(busy_ns)}",
+    ]
+    cpu_times = [r.cpu_ns for r in records if r.cpu_ns is not None]
+    if cpu_times:
+        lines.append(f"  total CPU time: {format_duration(sum(cpu_times))}")
+    if wall_ns > 0:
+        parallelism = busy_ns / wall_ns
+        lines.append(
+            f"  achieved parallelism: {parallelism:.1f} "
+            f"({parallelism / jobs:.0%} of {jobs} jobs)"
+        )
+
+    slowest = sorted(records, key=lambda r: r.duration_ns, reverse=True)[:top]
+    lines.append(f"  slowest translation units ({len(slowest)}/{len(records)}):")
+    lines.extend(
+        f"    {format_duration(r.duration_ns):>8}  {_shorten(r.target, roots or [])}"
+        for r in slowest
+    )
+    return "\n".join(lines)
@@ -0,0 +1,47 @@
+"""A shell wrapper timing compilation commands, for build reports.
+
+It's substituted to make's SHELL as
+
+    SHELL="python -S _build_timer.py LOGFILE"
+
+so make runs it as `python -S _build_timer.py LOGFILE -c COMMAND` for each recipe
+line. Recipes are forwarded to /bin/sh (CMake's own choice of SHELL), and for
+compilation commands a tab-separated line (start and end times, CPU time, in ns,
+and the compiled source file) is appended to LOGFILE.
+
+This script is executed on its own for every recipe line, so it doesn't import
+anything from idefix_cli, and should stay as lightweight as possible.
+"""
+
+import os
+import re
+import sys
+import time
+
+SHELL = "/bin/sh"
+COMPILE_COMMAND = re.compile(r"\s-c\s+(\S+)\s*$")
+
+
+def main(argv: list[str]) -> int:
+    logfile, *args = argv
+    start = time.time_ns()
+    pid = os.posix_spawn(SHELL, [SHELL, *args], os.environ)
+    _, status, rusage = os.wait4(pid, 0)
+    end = time.time_ns()
+
+    if args and (match := COMPILE_COMMAND.search(args[-1])) is not None:
+        cpu = round((rusage.ru_utime + rusage.ru_stime) * 1e9)
+        record = f"{start}\t{end}\t{cpu}\t{match.group(1)}\n"
+        fd = os.open(logfile, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, record.encode())
+        finally:
+            os.close(fd)
+    if (code := os.waitstatus_to_exitcode(status)) < 0:
+        # killed by a signal, report it as a shell would
+        return 128 - code
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
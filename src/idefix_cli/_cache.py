@@ -0,0 +1,75 @@
+import json
+import os
+import platform
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+__all__ = ["get_cache_dir", "load_cache", "dump_cache", "load_json", "dump_json"]
+
+if platform.system().lower().startswith("win"):
+    # Windows
+    _CACHE_HOME_ENV_VAR = "LOCALAPPDATA"
+    _DEFAULT_CACHE_HOME = os.path.join("AppData", "Local")
+else:
+    # POSIX
+    _CACHE_HOME_ENV_VAR = "XDG_CACHE_HOME"
+    _DEFAULT_CACHE_HOME = ".cache"
+
+
+def _get_cache_home() -> str:
+    # read from the environment, as it is when called
+    return os.environ.get(
+        _CACHE_HOME_ENV_VAR,
+        os.path.join(os.path.expanduser("~"), _DEFAULT_CACHE_HOME),
+    )
+
+
+XDG_CACHE_HOME = _get_cache_home()
+
+
+def get_cache_dir() -> Path:
+    return Path(XDG_CACHE_HOME, "idefix_cli")
+
+
+def _get_cache_file(name: str) -> Path:
+    return get_cache_dir() / f"{name}.json"
+
+
+def load_json(path: str | os.PathLike[str]) -> dict[str, Any]:
+    # a missing or corrupted cache is never an error: it is simply empty
+    try:
+        with open(path, "rb") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def dump_json(path: str | os.PathLike[str], data: dict[str, Any]) -> None:
+    # failing to write a cache is never an error either, and writes are atomic,
+    # so concurrent idfx processes never read a partially written file
+    from tempfile import NamedTemporaryFile
+
+    path = Path(path)
+    tmp_file: str | None = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            "w", dir=path.parent, prefix=f".{path.stem}", delete=False
+        ) as fh:
+            tmp_file = fh.name
+            json.dump(data, fh)
+        os.replace(tmp_file, path)
+    except OSError:
+        if tmp_file is not None:
+            with suppress(OSError):
+                os.remove(tmp_file)
+
+
+def load_cache(name: str) -> dict[str, Any]:
+    return load_json(_get_cache_file(name))
+
+
+def dump_cache(name: str, data: dict[str, Any]) -> None:
+    dump_json(_get_cache_file(name), data)
@@ -0,0 +1,141 @@
+# This module implements both ends of the protocol used by `idfx serve`.
+# It is imported by idfx's entry point whenever $IDFX_SOCKET is defined, so it
+# should only depend on (light) modules from the standard library.
+#
+# Both ends check that their peer runs as the same user before exchanging
+# anything, since requests are executed with the environment the client sends.
+#
+# Protocol (over a Unix stream socket)
+# - client -> server: a single null byte, carrying the client's stdin, stdout
+#   and stderr file descriptors as ancillary data (SCM_RIGHTS),
+#   followed by a length-prefixed json header {"caller", "argv", "cwd", "env"}
+# - server -> client: the pid of the process running the command, and then
+#   its return code, both as 4-byte signed integers
+import json
+import os
+import socket
+import struct
+import sys
+from typing import Any
+
+__all__ = [
+    "forward",
+    "get_default_socket_path",
+    "is_same_user",
+    "recv_request",
+    "send_int",
+]
+
+_INT = struct.Struct("!i")
+
+
+def get_default_socket_path() -> str:
+    if (runtime_dir := os.environ.get("XDG_RUNTIME_DIR")) is not None:
+        return os.path.join(runtime_dir, "idfx.sock")
+    import tempfile
+
+    return os.path.join(tempfile.gettempdir(), f"idfx-{os.getuid()}.sock")
+
+
+def get_peer_uid(sock: socket.socket) -> int | None:
+    """Return the uid of the process at the other end of a connected Unix socket,
+    or None if it cannot be determined."""
+    try:
+        if hasattr(socket, "SO_PEERCRED"):
+            # Linux: struct ucred {pid, uid, gid}
+            creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+            return int(struct.unpack("3i", creds)[1])
+        if sys.platform == "darwin" or "bsd" in sys.platform:
+            # LOCAL_PEERCRED (1) at level SOL_LOCAL (0):
+            # struct xucred {version, uid, ...}
+            creds = sock.getsockopt(0, 1, 8)
+            return int(struct.unpack("2I", creds[:8])[1])
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def is_same_user(sock: socket.socket) -> bool:
+    return get_peer_uid(sock) == os.getuid()
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks: list[bytes] = []
+    while size > 0:
+        if not (chunk := sock.recv(size)):
+            raise ConnectionError("connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_int(sock: socket.socket, value: int) -> None:
+    sock.sendall(_INT.pack(value))
+
+
+def recv_int(sock: socket.socket) -> int:
+    (value,) = _INT.unpack(_recv_exactly(sock, _INT.size))
+    return int(value)
+
+
+def recv_request(sock: socket.socket) -> tuple[dict[str, Any], list[int]]:
+    _, fds, _, _ = socket.recv_fds(sock, 1, 3)
+    payload = _recv_exactly(sock, recv_int(sock))
+    return json.loads(payload), fds
+
+
+def forward(caller: str, argv: list[str], *, socket_path: str) -> int | None:
+    """Run a command through an `idfx serve` server.
+
+    Return the command's return code, or None if no server could be reached
+    (or if it isn't run by the current user).
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock:
+        if not is_same_user(sock):
+            # anyone may create a socket at a predictable path:
+            # never send them our environment or standard streams
+            print(
+                f"ignoring {socket_path}, which isn't served by the current user",
+                file=sys.stderr,
+            )
+            return None
+
+        header = json.dumps(
+            {
+                "caller": caller,
+                "argv": argv,
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+            }
+        ).encode()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        socket.send_fds(sock, [b"\0"], [0, 1, 2])
+        send_int(sock, len(header))
+        sock.sendall(header)
+
+        pid: int | None = None
+        while True:
+            try:
+                if pid is None:
+                    pid = recv_int(sock)
+                return recv_int(sock)
+            except KeyboardInterrupt:
+                # the server process isn't part of our process group, so
+                # interruptions need to be relayed explicitly
+                if pid is not None:
+                    from signal import SIGINT
+
+                    os.kill(pid, SIGINT)
+            except ConnectionError:
+                print(
+                    f"lost connection to idfx server ({socket_path})", file=sys.stderr
+                )
+                return 1
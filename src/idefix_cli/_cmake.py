@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import NamedTuple
+
+__all__ = [
+    "BUILD_FILES",
+    "CMakeCacheEntry",
+    "get_generator",
+    "is_cmake_true",
+    "read_cmake_cache",
+]
+
+# files generated by supported CMake generators, that are required to build
+BUILD_FILES: dict[str, str] = {
+    "Unix Makefiles": "Makefile",
+    "Ninja": "build.ninja",
+}
+
+_TRUE_CONSTANTS = frozenset(("1", "ON", "YES", "TRUE", "Y"))
+_NUMBER_REGEXP = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+
+class CMakeCacheEntry(NamedTuple):
+    type: str
+    value: str
+
+
+def read_cmake_cache(path: str | os.PathLike[str]) -> dict[str, CMakeCacheEntry]:
+    """Parse a CMakeCache.txt file, as {name: (type, value)}
+
+    Raise OSError if the file cannot be read.
+    """
+    entries: dict[str, CMakeCacheEntry] = {}
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith(("#", "//")):
+                continue
+            # entries are formatted as NAME:TYPE=VALUE, where NAME may be quoted
+            if line.startswith('"'):
+                name, sep, rest = line[1:].partition('":')
+            else:
+                name, sep, rest = line.partition(":")
+            if not sep:
+                continue
+            type_, sep, value = rest.partition("=")
+            if not sep:
+                continue
+            entries[name] = CMakeCacheEntry(type_, value)
+    return entries
+
+
+def is_cmake_true(value: str) -> bool:
+    """Evaluate a value as a boolean constant, following CMake's if() rules"""
+    if value.upper() in _TRUE_CONSTANTS:
+        return True
+    return _NUMBER_REGEXP.fullmatch(value) is not None and float(value) != 0
+
+
+def get_generator(directory: str | os.PathLike[str]) -> str | None:
+    """Return the CMake generator used in a build directory, if any"""
+    try:
+        cache = read_cmake_cache(os.path.join(directory, "CMakeCache.txt"))
+    except OSError:
+        return None
+    if (entry := cache.get("CMAKE_GENERATOR")) is None:
+        return None
+    return entry.value
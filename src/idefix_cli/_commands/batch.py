@@ -0,0 +1,236 @@
+"""run many idfx commands from a single process
+
+Read idfx commands from a file (or stdin), one job per line, e.g.
+
+  clone base run1 && write run1/idefix.ini params1.json
+  clone base run2 && write run2/idefix.ini params2.json
+
+Jobs run concurrently. Commands chained with '&&' within a job are executed in
+order, until one of them fails. Empty lines and comments (#) are ignored.
+"""
+
+from __future__ import annotations
+
+import os
+import shlex
+import sys
+import traceback
+from argparse import ArgumentParser
+from tempfile import TemporaryFile
+from typing import IO, NamedTuple
+
+from idefix_cli.lib import print_error, print_success
+
+# commands that cannot be batched
+FORBIDDEN_COMMANDS = frozenset(("serve",))
+
+
+class Job(NamedTuple):
+    lineno: int
+    line: str
+    commands: list[list[str]]
+
+
+def parse_jobs(lines: list[str]) -> list[Job]:
+    jobs: list[Job] = []
+    for lineno, line in enumerate(lines, start=1):
+        try:
+            tokens = shlex.split(line, comments=True)
+        except ValueError as exc:
+            raise ValueError(f"line {lineno}: {exc}") from None
+        if not tokens:
+            continue
+
+        commands: list[list[str]] = [[]]
+        for token in tokens:
+            if token == "&&":
+                commands.append([])
+            else:
+                commands[-1].append(token)
+
+        for argv in commands:
+            if argv[:1] == ["idfx"]:
+                # allow (but don't require) explicitly naming the program
+                argv.pop(0)
+            if not argv:
+                raise ValueError(f"line {lineno}: empty command")
+            if argv[0] in FORBIDDEN_COMMANDS:
+                raise ValueError(f"line {lineno}: idfx {argv[0]} cannot be batched")
+        jobs.append(Job(lineno=lineno, line=line.strip(), commands=commands))
+    return jobs
+
+
+def _run_in_process(argv: list[str]) -> int:
+    from idefix_cli.__main__ import as_exit_code, cli
+
+    try:
+        ret = as_exit_code(cli("idfx", argv))
+    except SystemExit as exc:
+        ret = as_exit_code(exc.code)
+    except Exception:
+        traceback.print_exc()
+        ret = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return ret
+
+
+def _get_exit_code(status: int) -> int:
+    if (ret := os.waitstatus_to_exitcode(status)) < 0:
+        # killed by a signal, reported as shells do
+        ret = 128 - ret
+    return ret
+
+
+def run_command(argv: list[str]) -> int:
+    # Each command runs in a child process, because some commands (e.g. idfx conf)
+    # replace their process with another program (exec), which would otherwise
+    # end the job (or the whole batch) early, without running the rest of it.
+    if sys.platform.startswith("win"):
+        # fork isn't available
+        import subprocess
+
+        return subprocess.run([sys.executable, "-m", "idefix_cli", *argv]).returncode
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if (pid := os.fork()) == 0:
+        ret = 1
+        try:
+            ret = _run_in_process(argv)
+        finally:
+            os._exit(ret & 0xFF)
+    _, status = os.waitpid(pid, 0)
+    return _get_exit_code(status)
+
+
+def run_job(job: Job) -> int:
+    for argv in job.commands:
+        if (ret := run_command(argv)) != 0:
+            return ret
+    return 0
+
+
+def _report(job: Job, ret: int) -> None:
+    if ret == 0:
+        print_success(f"line {job.lineno} (exit code 0): {job.line}")
+    else:
+        print_error(f"line {job.lineno} (exit code {ret}): {job.line}")
+
+
+def _run_sequentially(jobs: list[Job]) -> list[int]:
+    retcodes: list[int] = []
+    for job in jobs:
+        retcodes.append(ret := run_job(job))
+        _report(job, ret)
+    return retcodes
+
+
+def _run_concurrently(jobs: list[Job], max_workers: int) -> list[int]:
+    # Each job runs in a process forked from this one, so it inherits already
+    # imported modules. Processes are used instead of threads because commands
+    # may change the working directory or environment variables.
+    # Outputs (including those from subprocesses) are captured at the file
+    # descriptor level, and replayed when the job is complete, so they don't
+    # interleave.
+    retcodes: dict[int, int] = {}
+    running: dict[int, tuple[Job, IO[bytes]]] = {}
+    pending = iter(jobs)
+
+    while True:
+        while len(running) < max_workers and (job := next(pending, None)) is not None:
+            output = TemporaryFile()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if (pid := os.fork()) == 0:
+                # worker process
+                ret = 1
+                try:
+                    stdin = os.open(os.devnull, os.O_RDONLY)
+                    os.dup2(stdin, 0)
+                    os.dup2(output.fileno(), 1)
+                    os.dup2(output.fileno(), 2)
+                    sys.stdin = open(0, closefd=False)
+                    sys.stdout = open(1, "w", closefd=False)
+                    sys.stderr = open(2, "w", closefd=False)
+                    ret = run_job(job)
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(ret & 0xFF)
+            running[pid] = (job, output)
+
+        if not running:
+            break
+
+        pid, status = os.wait()
+        job, job_output = running.pop(pid)
+        retcodes[job.lineno] = ret = _get_exit_code(status)
+        with job_output:
+            job_output.seek(0)
+            sys.stdout.flush()
+            sys.stdout.buffer.write(job_output.read())
+            sys.stdout.flush()
+        _report(job, ret)
+
+    return [retcodes[job.lineno] for job in jobs]
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        help="file to read commands from (use '-' for stdin)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="maximal number of concurrent jobs (default: number of available CPUs)",
+    )
+
+
+def command(source: str = "-", jobs: int | None = None) -> int:
+    from idefix_cli._commands.run import get_cpu_count
+
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        try:
+            with open(source) as fh:
+                lines = fh.read().splitlines()
+        except OSError as exc:
+            print_error(f"could not read {source}: {exc.strerror}")
+            return 1
+
+    try:
+        batch = parse_jobs(lines)
+    except ValueError as exc:
+        print_error(str(exc))
+        return 1
+
+    if not batch:
+        print("Nothing to do.")
+        return 0
+
+    if jobs is None:
+        jobs = get_cpu_count()
+    elif jobs < 1:
+        print_error(
+            f"the --jobs parameter expects a strictly positive integer (got {jobs})"
+        )
+        return 1
+
+    if sys.platform.startswith("win"):
+        # fork isn't available
+        retcodes = _run_sequentially(batch)
+    else:
+        retcodes = _run_concurrently(batch, max_workers=min(jobs, len(batch)))
+
+    if nfailed := sum(ret != 0 for ret in retcodes):
+        print_error(f"{nfailed} out of {len(batch)} jobs failed")
+        return 1
+    print_success(f"all {len(batch)} jobs completed successfully")
+    return 0
@@ -0,0 +1,112 @@
+"""inspect and evict entries from the shared build cache
+
+The build cache is enabled in the [idfx cache] section of the configuration file.
+Entries are listed from the most to the least recently used.
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser, ArgumentTypeError
+from datetime import datetime
+
+from idefix_cli._build_cache import format_size, get_build_cache, parse_size
+from idefix_cli.lib import print_error, print_success
+
+
+def _size_type(value: str) -> int:
+    try:
+        return parse_size(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(str(exc)) from None
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "action",
+        nargs="?",
+        choices=["list", "evict"],
+        default="list",
+        help="list entries (default), or evict some of them",
+    )
+    parser.add_argument(
+        "keys",
+        nargs="*",
+        help="keys (or unique prefixes) of entries to evict",
+    )
+    evict_group = parser.add_mutually_exclusive_group()
+    evict_group.add_argument(
+        "--all",
+        dest="evict_all",
+        action="store_true",
+        help="evict all entries",
+    )
+    evict_group.add_argument(
+        "--max-size",
+        dest="max_size",
+        type=_size_type,
+        help="evict least recently used entries until the cache fits within this size",
+    )
+
+
+def command(
+    action: str = "list",
+    keys: list[str] | None = None,
+    evict_all: bool = False,
+    max_size: int | None = None,
+) -> int:
+    build_cache = get_build_cache()
+    entries = build_cache.list_entries()
+    keys = keys or []
+
+    if action == "list":
+        if keys or evict_all or max_size is not None:
+            print_error("keys, --all and --max-size can only be used with 'evict'")
+            return 1
+        if not build_cache.enabled:
+            print("The build cache is disabled.")
+        if not entries:
+            print(f"No entries in {build_cache.root}")
+            return 0
+        print(f"{'KEY':<17}{'SIZE':>10}  {'LAST USED':<17}{'OBJECTS':>8}  COMPILER")
+        for entry in entries:
+            last_used = datetime.fromtimestamp(entry.last_used / 1e9)
+            print(
+                f"{entry.key:<17}{format_size(entry.size):>10}  "
+                f"{last_used:%Y-%m-%d %H:%M}{entry.nobjects:>9}  "
+                f"{entry.compiler} (Idefix {entry.revision[:12]})"
+            )
+        total = sum(e.size for e in entries)
+        print(
+            f"\nTotal: {format_size(total)} (budget: {format_size(build_cache.max_size)})"
+            f", in {build_cache.root}"
+        )
+        return 0
+
+    if sum((bool(keys), evict_all, max_size is not None)) != 1:
+        print_error("evict requires either keys, --all or --max-size")
+        return 1
+
+    if max_size is not None:
+        evicted = build_cache.trim(max_size)
+    elif evict_all:
+        evicted = entries
+        build_cache.evict(e.key for e in evicted)
+    else:
+        evicted = []
+        for key in keys:
+            candidates = [e for e in entries if e.key.startswith(key)]
+            if len(candidates) != 1:
+                reason = "no" if not candidates else "more than one"
+                print_error(f"{reason} entry matches key {key!r}")
+                return 1
+            evicted.extend(candidates)
+        build_cache.evict(e.key for e in evicted)
+
+    if evicted:
+        print_success(
+            f"Evicted {len(evicted)} entries "
+            f"({format_size(sum(e.size for e in evicted))})"
+        )
+    else:
+        print("Nothing to evict.")
+    return 0
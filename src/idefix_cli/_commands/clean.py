@@ -3,13 +3,17 @@
 from __future__ import annotations
 
 import os
-import subprocess
 from argparse import ArgumentParser
 from contextlib import chdir
 from pathlib import Path
-from shutil import rmtree, which
+from shutil import rmtree
 
-from idefix_cli.lib import files_from_patterns, make_file_tree, prompt_ask
+from idefix_cli.lib import (
+    files_from_patterns,
+    get_git_tracked_files,
+    make_file_tree,
+    prompt_ask,
+)
 
 # bpatterns are those targeted by `make clean`, which is equivalent to
 # rm -f *.o *.cuda *.host
@@ -26,12 +30,22 @@ kokkos_files = frozenset(
     )
 )
 
-cmake_files = frozenset(("CMakeCache.txt", "cmake_install.cmake", "build"))
+cmake_files = frozenset(
+    (
+        "CMakeCache.txt",
+        "cmake_install.cmake",
+        "build",
+        # generated by Ninja
+        ".ninja_deps",
+        ".ninja_log",
+    )
+)
 
 # only cleared if `--all` flag is passed
-gpatterns = frozenset(("Makefile", "idefix"))
+gpatterns = frozenset(("Makefile", "build.ninja", "idefix"))
 
-GENERATED_DIRS = frozenset(("CMakeFiles",))
+# .idfx holds idfx's own build records (see idefix_cli._rebuild)
+GENERATED_DIRS = frozenset(("CMakeFiles", ".idfx"))
 
 
 def add_arguments(parser: ArgumentParser) -> None:
@@ -70,19 +84,7 @@ def command(
             patterns |= gpatterns
 
         # Guarantee that git indexed files are never cleaned
-        if which("git") is not None:
-            # we don't check the result of the process, meaning we trust git not to output
-            # anything to stdout in case the current dir isn't part of a git repo
-            git_files = set(
-                subprocess.run(["git", "ls-files"], capture_output=True)
-                .stdout.decode()
-                .strip()
-                .split("\n")
-            )
-        else:
-            git_files = set()
-
-        patterns -= git_files
+        patterns -= get_git_tracked_files(os.curdir)
 
         targets = files_from_patterns(Path.cwd(), *patterns)
 
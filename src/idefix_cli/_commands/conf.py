@@ -29,8 +29,17 @@ from enum import Enum, auto
 from pathlib import Path
 from typing import Any, NoReturn, assert_never
 
-from packaging.version import Version
-
+from packaging.version import InvalidVersion, Version
+
+from idefix_cli._cache import dump_cache, load_cache
+from idefix_cli._cmake import (
+    BUILD_FILES,
+    CMakeCacheEntry,
+    get_generator,
+    is_cmake_true,
+    read_cmake_cache,
+)
+from idefix_cli._cpu_arch import get_native_arch
 from idefix_cli.lib import (
     get_config_file,
     get_idefix_version,
@@ -61,6 +70,48 @@ class IdefixEnvError(OSError):
     pass
 
 
+# cmake's version, keyed on its executable's path, mtime and size
+_CMAKE_VERSION_MEMO: dict[str, tuple[int, int, str | None]] = {}
+
+
+def _probe_cmake_version(cmake: str) -> str | None:
+    out = subprocess.run([cmake, "--version"], capture_output=True).stdout.decode()
+    if (match := re.search(VERSION_REGEXP, out)) is None:
+        return None
+    return match.group()
+
+
+def get_cmake_version(cmake: str) -> Version | None:
+    """Return the version of a cmake executable, or None if it can't be parsed.
+
+    Spawning cmake is comparatively slow, so results are cached (in memory and
+    on disk), until the executable is modified.
+    """
+    cmake = os.path.realpath(cmake)
+    st = os.stat(cmake)
+    key = (st.st_mtime_ns, st.st_size)
+    if (memo := _CMAKE_VERSION_MEMO.get(cmake)) is None or memo[:2] != key:
+        cache = load_cache("toolchain")
+        entry = cache.get(cmake)
+        if not (
+            isinstance(entry, list)
+            and len(entry) == 3
+            and entry[:2] == list(key)
+            and isinstance(entry[2], str | None)
+        ):
+            entry = [*key, _probe_cmake_version(cmake)]
+            cache[cmake] = entry
+            dump_cache("toolchain", cache)
+        memo = _CMAKE_VERSION_MEMO[cmake] = (*key, entry[2])
+
+    if (version := memo[2]) is None:
+        return None
+    try:
+        return Version(version)
+    except InvalidVersion:
+        return None
+
+
 def validate_cmake_support() -> None:
     msg = f"cmake is required from {get_config_file()}, but "
     errors: list[str] = []
@@ -80,16 +131,13 @@ def validate_cmake_support() -> None:
                 f"found {idefix_ver}"
             )
 
-    if shutil.which("cmake") is None:
+    if (cmake := shutil.which("cmake")) is None:
         errors.append("couldn't find cmake executable")
     else:
-        cmake_ver_str: str = subprocess.run(
-            ["cmake", "--version"], capture_output=True
-        ).stdout.decode()
-        if (match := re.search(VERSION_REGEXP, cmake_ver_str)) is None:
+        if (cmake_ver := get_cmake_version(cmake)) is None:
             errors.append("couldn't parse result from `cmake --version`")
 
-        elif (cmake_ver := Version(match.group())) < CMAKE_MIN_VERSIONS["cmake"]:
+        elif cmake_ver < CMAKE_MIN_VERSIONS["cmake"]:
             errors.append(
                 f"cmake setup requires cmake {CMAKE_MIN_VERSIONS['cmake']} or newer, "
                 f"found {cmake_ver}"
@@ -186,7 +234,19 @@ def substitute_cmake_archs(args: list[str]) -> list[str]:
     if _args.arch is None:
         return args
 
-    return unknown_args + [f"-DKokkos_ARCH_{_.upper()}=ON" for _ in _args.arch]
+    archs: list[str] = _args.arch
+    if "native" in (arch.lower() for arch in archs):
+        if (native_arch := get_native_arch()) is None:
+            print_warning(
+                "Could not detect the host's CPU architecture. "
+                "Falling back to Kokkos_ARCH_NATIVE"
+            )
+            native_arch = "NATIVE"
+        else:
+            print(f"Detected CPU architecture: {native_arch}")
+        archs = [native_arch if arch.lower() == "native" else arch for arch in archs]
+
+    return unknown_args + [f"-DKokkos_ARCH_{_.upper()}=ON" for _ in archs]
 
 
 def substitute_cmake_cxx(args: list[str]) -> list[str]:
@@ -206,15 +266,112 @@ def substitute_cmake_cxx(args: list[str]) -> list[str]:
     return unknown_args + [f"-DCMAKE_CXX_COMPILER={_args.cxx}"]
 
 
+def substitute_cmake_launcher(args: list[str]) -> list[str]:
+    # wire a compiler cache (e.g. ccache or sccache) into the build
+    if any(re.match(r"-D\s?CMAKE_CXX_COMPILER_LAUNCHER=", _) for _ in args):
+        return args
+    if not (launcher := get_option("idfx conf", "compiler_launcher")):
+        return args
+    if shutil.which(launcher) is None:
+        print_warning(
+            f"Could not find compiler launcher {launcher!r} "
+            f"(from {get_config_file()}). Ignoring it."
+        )
+        return args
+    return [*args, f"-DCMAKE_CXX_COMPILER_LAUNCHER={launcher}"]
+
+
+def substitute_cmake_generator(args: list[str], directory: Path) -> list[str]:
+    # select a generator, unless one was explicitly requested
+    if any(arg.startswith("-G") for arg in args):
+        return args
+    if get_generator(directory) is not None:
+        # the generator of an existing build directory cannot be changed
+        return args
+    if (generator := get_option("idfx conf", "generator") or "auto") != "auto":
+        return [*args, "-G", generator]
+    if shutil.which("ninja") is not None:
+        return [*args, "-G", "Ninja"]
+    return args
+
+
 def substitute_cmake_args(args: list[str]) -> list[str]:
     # compatibility layer to enable configure.py's arguments with cmake
     # order matters
     args = substitute_cmake_archs(args)
     args = substitute_cmake_flags(args)
     args = substitute_cmake_cxx(args)
+    args = substitute_cmake_launcher(args)
     return args
 
 
+def _parse_cmake_args(args: list[str]) -> tuple[dict[str, str], str | None] | None:
+    # Return cache definitions (-D) and the generator (-G) from cmake arguments,
+    # or None if any other argument is found, since its effect isn't known
+    definitions: dict[str, str] = {}
+    generator: str | None = None
+    it = iter(args)
+    for arg in it:
+        if arg in ("-D", "-G"):
+            if (value := next(it, None)) is None:
+                return None
+            arg += value
+        if arg.startswith("-D"):
+            name, sep, value = arg[2:].partition("=")
+            if not sep:
+                return None
+            # the type is optional (-DNAME:TYPE=VALUE)
+            definitions[name.partition(":")[0].strip()] = value
+        elif arg.startswith("-G"):
+            generator = arg[2:]
+        else:
+            return None
+    return definitions, generator
+
+
+def _is_same_cache_value(entry: CMakeCacheEntry, value: str) -> bool:
+    if entry.value == value:
+        return True
+    if entry.type == "BOOL":
+        return is_cmake_true(entry.value) == is_cmake_true(value)
+    if entry.type == "FILEPATH" and (path := shutil.which(value)) is not None:
+        # CMake resolves compilers to absolute paths
+        return os.path.realpath(path) == os.path.realpath(entry.value)
+    return False
+
+
+@requires_idefix()
+def is_configured(directory: Path, args: list[str]) -> bool:
+    """Return True if running cmake with these arguments in a directory
+    wouldn't change its existing configuration."""
+    if (parsed := _parse_cmake_args(args)) is None:
+        return False
+    definitions, generator = parsed
+    try:
+        cache = read_cmake_cache(directory / "CMakeCache.txt")
+    except OSError:
+        return False
+
+    if (home := cache.get("CMAKE_HOME_DIRECTORY")) is None or os.path.realpath(
+        home.value
+    ) != os.path.realpath(os.environ["IDEFIX_DIR"]):
+        return False
+
+    if (cached_generator := cache.get("CMAKE_GENERATOR")) is None or (
+        generator is not None and generator != cached_generator.value
+    ):
+        return False
+    if (build_file := BUILD_FILES.get(cached_generator.value)) is None or not (
+        directory / build_file
+    ).is_file():
+        return False
+
+    return all(
+        (entry := cache.get(name)) is not None and _is_same_cache_value(entry, value)
+        for name, value in definitions.items()
+    )
+
+
 def add_arguments(parser: ArgumentParser) -> None:
     parser.add_argument("--dir", dest="directory", default=".", help="target directory")
 
@@ -225,6 +382,15 @@ def add_arguments(parser: ArgumentParser) -> None:
         action="store_true",
         help="Use ccmake over cmake (no effect with python configuration engine)",
     )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        action="store_true",
+        help=(
+            "run cmake even if the directory is already configured "
+            "with the requested options"
+        ),
+    )
 
 
 def _validate_engine(query: str) -> tuple[EngineRequirement | None, ErrorMessage]:
@@ -266,7 +432,9 @@ def _get_engine() -> tuple[EngineRequirement | None, ErrorMessage]:
 
 
 @requires_idefix()
-def command(*args: str, directory: str, interactive: bool) -> int | NoReturn:
+def command(
+    *args: str, directory: str, interactive: bool, force: bool = False
+) -> int | NoReturn:
     python_cmd = ["python3", os.path.join(os.environ["IDEFIX_DIR"], "configure.py")]
     cmake_cmd = ["ccmake" if interactive else "cmake", os.environ["IDEFIX_DIR"]]
 
@@ -289,6 +457,14 @@ def command(*args: str, directory: str, interactive: bool) -> int | NoReturn:
     if engine_req is EngineRequirement.CMAKE:
         cmd = cmake_cmd
         clargs = substitute_cmake_args(clargs)
+        clargs = substitute_cmake_generator(clargs, path.resolve())
+        if not (interactive or force) and is_configured(path.resolve(), clargs):
+            # make still runs cmake again if any CMakeLists.txt changed
+            print(
+                f"{path} is already configured with the requested options, "
+                "skipping cmake (use --force to run it anyway)"
+            )
+            return 0
     elif engine_req is EngineRequirement.PYTHON:
         cmd = python_cmd
     else:
@@ -6,21 +6,55 @@ import os
 import re
 import subprocess
 import sys
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 from contextlib import chdir
 from copy import deepcopy
+from datetime import datetime
 from enum import StrEnum, auto
 from math import prod
 from pathlib import Path
 from tempfile import NamedTemporaryFile
-from time import sleep, time, time_ns
-from typing import Final, assert_never
+from textwrap import indent
+from time import monotonic, time, time_ns
+from typing import Any, Final, Literal, NamedTuple, assert_never
 
 import inifix
 from packaging.version import Version
 
+from idefix_cli._build_cache import get_build_cache, get_build_key
+from idefix_cli._build_report import BuildTimer, format_build_report
+from idefix_cli._cmake import (
+    BUILD_FILES,
+    get_generator,
+    is_cmake_true,
+    read_cmake_cache,
+)
+from idefix_cli._compiler_cache import get_compiler_cache_stats, get_compiler_launcher
+from idefix_cli._progress import (
+    TIME_INTEGRATOR_LOG_LINE,
+    ProgressMonitor,
+    Watchdog,
+    WatchdogAction,
+    parse_duration,
+)
+from idefix_cli._rebuild import (
+    BuildManifest,
+    DependencyGraph,
+    SourceIndex,
+    filter_dependencies,
+    get_build_configuration,
+    get_updated_files,
+)
+from idefix_cli._run_report import (
+    RUN_REPORT_FILE,
+    ResourceUsage,
+    dump_run_report,
+    make_run_report,
+    poll_process,
+)
+from idefix_cli._topology import get_available_memory, get_cpu_topology
 from idefix_cli.lib import (
-    files_from_patterns,
+    LogFollower,
     get_config_file,
     get_idefix_version,
     get_option,
@@ -34,9 +68,6 @@ from idefix_cli.lib import (
 )
 
 MAIN_LOG_FILE = "idefix.0.log"
-TIME_INTEGRATOR_LOG_LINE = re.compile(
-    "^TimeIntegrator:\\s*(?P<time>.+) \\|\\s*(?P<cycle>\\d+) \\|"
-)
 JOB_COMPLETED = re.compile("Main: Job completed")
 
 
@@ -59,33 +90,131 @@ def _spawn_idefix_lt_1(cmd: list[str], *, ncycles: int) -> int:
         os.remove(MAIN_LOG_FILE)
     prog = subprocess.Popen(cmd)
     start_wait = time()
-    while not os.path.exists(MAIN_LOG_FILE):
+
+    def should_stop() -> bool:
+        if prog.poll() is not None:
+            return True
         # idefix is not necessarily well behaved regarding retcodes,
         # so we don't have a simple way to check wether the process
         # has returned already or not, creating the opportunity for
         # an infinite loop here, hence the timeout mechanism
-        if (time() - start_wait) > 60:
-            return -2
-        sleep(0.1)
-
-    complete = False
-    last_edit = -1.0
-    while not complete:
-        if last_edit != (new_edit := os.stat(MAIN_LOG_FILE).st_mtime):
-            with open(MAIN_LOG_FILE) as fh:
-                for line in fh:
-                    if JOB_COMPLETED.match(line):
-                        complete = True
-                        break
-                    if (match := TIME_INTEGRATOR_LOG_LINE.match(line)) is None:
+        return not os.path.exists(MAIN_LOG_FILE) and (time() - start_wait) > 60
+
+    with LogFollower(MAIN_LOG_FILE) as log:
+        for line in log.follow(until=should_stop):
+            if JOB_COMPLETED.match(line):
+                prog.wait()
+                return -1
+            if (match := TIME_INTEGRATOR_LOG_LINE.match(line)) is None:
+                continue
+            if int(match["cycle"]) == ncycles:
+                prog.send_signal(SIGUSR2)
+                prog.wait()
+                return -1
+
+    if prog.poll() is None:
+        return -2
+    # idefix exited before completing the requested number of cycles
+    return 1
+
+
+# minimal delay (s) between progress reports printed with --monitor
+MONITOR_INTERVAL: Final = 5.0
+
+
+def _stop_idefix(prog: subprocess.Popen[bytes], action: WatchdogAction) -> None:
+    if sys.platform.startswith("win"):
+        # there's no graceful stop
+        if action == "kill":
+            prog.kill()
+        else:
+            prog.terminate()
+        return
+
+    from signal import SIGKILL, SIGTERM, SIGUSR2  # not available on Windows
+
+    # same as _spawn_idefix_lt_1, SIGUSR2 makes idefix stop gracefully,
+    # writing a dump.
+    # Popen's methods aren't used here, because they may reap the process if it
+    # just exited, after which its resource usage couldn't be collected
+    signum = {"stop": SIGUSR2, "terminate": SIGTERM, "kill": SIGKILL}[action]
+    os.kill(prog.pid, signum)
+
+
+def _watch_idefix(
+    cmd: list[str],
+    *,
+    progress: ProgressMonitor,
+    monitor: bool = False,
+    watchdog: Watchdog | None = None,
+) -> tuple[int, ResourceUsage | None]:
+    # run idefix, following its progress from new log lines, to periodically
+    # report it and/or stop idefix if it exceeds its time budget or stalls.
+    # Return its exit code and resource usage
+    with LogFollower(MAIN_LOG_FILE) as log:
+        # a log file left over by a previous run is overwritten by idefix
+        log.seek_end()
+        with subprocess.Popen(cmd) as prog:
+            if watchdog is not None:
+                watchdog.start = watchdog.last_progress = monotonic()
+            last_report = -MONITOR_INTERVAL
+            while True:
+                usage = poll_process(prog)
+                done = prog.returncode is not None
+                for line in log.read_lines():
+                    last_cycle = progress.records[-1].cycle if progress.records else -1
+                    if (record := progress.feed(line)) is None:
                         continue
-                    if int(match["cycle"]) == ncycles:
-                        prog.send_signal(SIGUSR2)
-                        complete = True
-                        break
-            last_edit = new_edit
-        sleep(0.01)
-    return -1
+                    if watchdog is not None and record.cycle != last_cycle:
+                        watchdog.record_progress()
+                    if (
+                        monitor
+                        and (now := monotonic()) - last_report >= MONITOR_INTERVAL
+                    ):
+                        print(f"Progress: {progress.format_status()}", file=sys.stderr)
+                        last_report = now
+                if done:
+                    break
+                if watchdog is not None and (action := watchdog.check()) is not None:
+                    if action == "stop":
+                        print_warning(f"{watchdog.reason}, stopping idefix")
+                    else:
+                        print_warning(f"idefix is still running, sending it {action}")
+                    _stop_idefix(prog, action)
+                log.wait()
+    return prog.returncode, usage
+
+
+def _get_max_cycles(idefix_args: tuple[str, ...]) -> int | None:
+    if "-maxcycles" not in idefix_args:
+        return None
+    try:
+        return int(idefix_args[idefix_args.index("-maxcycles") + 1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _get_tstop(conf: dict[str, Any]) -> float | None:
+    try:
+        tstop = float(conf["TimeIntegrator"]["tstop"][0])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    # a negative tstop means the simulation runs until another limit is reached
+    return tstop if tstop > 0 else None
+
+
+def _parse_dec(idefix_args: tuple[str, ...]) -> int | None:
+    # the number of processes implied by idefix's -dec argument, if any
+    if "-dec" not in idefix_args:
+        return None
+    i0 = idefix_args.index("-dec")
+    dec_args: list[int] = []
+    for i in range(i0 + 1, len(idefix_args)):
+        try:
+            dec_args.append(int(idefix_args[i]))
+        except ValueError:
+            break
+    return prod(dec_args) if dec_args else None
 
 
 def get_command(
@@ -95,15 +224,8 @@ def get_command(
 
     if nproc < 0 and "-dec" in idefix_args:
         # try to guess the number of processes
-        i0 = idefix_args.index("-dec")
-        dec_args: list[int] = []
-        for i in range(i0 + 1, len(idefix_args)):
-            try:
-                dec_args.append(int(idefix_args[i]))
-            except ValueError:
-                break
-        if dec_args:
-            nproc = prod(dec_args)
+        if (dec_nproc := _parse_dec(idefix_args)) is not None:
+            nproc = dec_nproc
         else:
             print_warning(
                 "Couldn't parse -dec parameters, "
@@ -116,9 +238,55 @@ def get_command(
     return cmd
 
 
+class ParallelLayout(NamedTuple):
+    # number of MPI processes (-1 means idefix isn't run through mpirun)
+    nproc: int
+    # number of OpenMP threads per process, if it should be set
+    omp_threads: int | None
+
+
+def get_parallel_layout(
+    directory: Path, nproc: int | Literal["auto"], idefix_args: tuple[str, ...]
+) -> ParallelLayout:
+    # Select a number of MPI processes (if requested with --nproc auto) and
+    # OpenMP threads, from the build options and available physical cores.
+    try:
+        cmake_cache = read_cmake_cache(directory / "CMakeCache.txt")
+    except OSError:
+        cmake_cache = {}
+
+    def is_enabled(option: str) -> bool:
+        if (entry := cmake_cache.get(option)) is None:
+            return False
+        return is_cmake_true(entry.value)
+
+    topology = get_cpu_topology()
+    cores = topology.effective_cores
+    uses_openmp = is_enabled("Kokkos_ENABLE_OPENMP")
+    ranks: int
+    if nproc != "auto":
+        ranks = nproc
+    elif not is_enabled("Idefix_MPI") or any(
+        is_enabled(f"Kokkos_ENABLE_{backend}") for backend in ("CUDA", "HIP", "SYCL")
+    ):
+        ranks = -1
+    elif uses_openmp:
+        # one process per NUMA node, each running one thread per core
+        ranks = min(topology.numa_nodes, cores)
+    else:
+        ranks = cores
+
+    omp_threads: int | None = None
+    if uses_openmp and "OMP_NUM_THREADS" not in os.environ:
+        nprocesses = ranks if ranks > 0 else (_parse_dec(idefix_args) or 1)
+        omp_threads = max(1, cores // nprocesses)
+    return ParallelLayout(ranks, omp_threads)
+
+
 class RebuildMode(StrEnum):
     ALWAYS = auto()
     PROMPT = auto()
+    AUTO = auto()
 
 
 # known end messages in Idefix
@@ -134,28 +302,129 @@ KNOWN_FAIL: Final = (
 
 def get_cpu_count() -> int:
     # this function exists primarily to be mocked
-    # instead of something we don't own
-    base_cpu_count: int | None
-    if sys.version_info >= (3, 13):
-        base_cpu_count = os.process_cpu_count()
-    elif hasattr(os, "sched_getaffinity"):
-        # this function isn't available on all platforms
-        base_cpu_count = len(os.sched_getaffinity(0))
-    else:
-        # this proxy is good enough in most situations
-        base_cpu_count = os.cpu_count()
-    return base_cpu_count or 1
+    # instead of something we don't own.
+    # This accounts for CPU affinity and quotas (e.g., in containers)
+    return get_cpu_topology().effective_cpus
+
+
+def get_host_cpu_count() -> int:
+    # all CPUs on the host, which the load average is measured against
+    return os.cpu_count() or 1
 
 
 def get_highest_power_of_two(n_max: int) -> int:
     return 1 << (n_max.bit_length() - 1)
 
 
+# compiling a translation unit that includes Kokkos can take over a GiB of memory
+MEMORY_PER_BUILD_JOB: Final = 1536 * 1024**2
+
+
+def get_load_average() -> float | None:
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        # not available on Windows
+        return None
+
+
+def get_build_jobs() -> tuple[int, str]:
+    """Select a number of parallel compilation jobs from available resources.
+
+    Return the selected value, along with a short explanation.
+    """
+    if jobs_str := get_option("compilation", "jobs"):
+        try:
+            jobs = int(jobs_str)
+        except ValueError:
+            jobs = 0
+        if jobs >= 1:
+            return jobs, f"as configured in {get_config_file()}"
+        print_warning(
+            "Expected [compilation].jobs to be a strictly positive integer, "
+            f"got {jobs_str!r} from {get_config_file()}. Ignoring it."
+        )
+
+    jobs = ncpus = get_cpu_count()
+    reason = f"{ncpus} CPUs available"
+    # the load average is system-wide, so idle capacity is measured against the
+    # host's CPUs, which may be much more than we're allowed to use
+    # (e.g., in a container with a CPU quota)
+    if (load := get_load_average()) is not None and (
+        idle := max(1, get_host_cpu_count() - round(load))
+    ) < jobs:
+        jobs = idle
+        reason += f", current load average is {load:.1f}"
+
+    if (memory := get_available_memory()) is not None and (
+        max_jobs := max(1, memory // MEMORY_PER_BUILD_JOB)
+    ) < jobs:
+        jobs = max_jobs
+        reason += f", {memory / 1024**3:.1f} GiB of memory available"
+
+    return jobs, reason
+
+
+@requires_idefix()
+def get_source_files(directory: Path) -> list[str]:
+    # files that may affect the build, in the problem directory and Idefix's sources
+    source_index = SourceIndex(directory)
+    files = source_index.get_sources(directory)
+    idefix_dir = os.environ["IDEFIX_DIR"]
+    files.extend(
+        source_index.get_sources(os.path.join(idefix_dir, "src"), tracked_only=True)
+    )
+    source_index.save()
+
+    # only keep actual dependencies of the executable, if they are known
+    depgraph = DependencyGraph(directory)
+    files = filter_dependencies(files, depgraph.get_dependencies())
+    depgraph.save()
+    return files
+
+
+def get_build_command(directory: str | os.PathLike[str], *, jobs: int) -> list[str]:
+    if get_generator(directory) is None:
+        # configured with Idefix's python script
+        return ["make", "-j", str(jobs)]
+    return ["cmake", "--build", ".", "--parallel", str(jobs)]
+
+
 @requires_idefix()
-def build_idefix(directory: str) -> int:
-    ncpus = min(8, get_highest_power_of_two(get_cpu_count()))
-    cmd = ["make", "-j", str(ncpus)]
-    return run_subcommand(cmd, loc=Path(directory), err="failed to build idefix")
+def build_idefix(directory: str, *, report: bool = False) -> int:
+    build_cache = get_build_cache()
+    build_key = get_build_key(directory) if build_cache.enabled else None
+    if build_key is not None:
+        if restored := build_cache.restore(directory, build_key):
+            print(f"Restored {restored} objects from the build cache")
+
+    launcher = get_compiler_launcher(directory)
+    launcher_stats = get_compiler_cache_stats(launcher) if launcher else None
+
+    jobs, reason = get_build_jobs()
+    print(f"Building with {jobs} parallel jobs ({reason})")
+    cmd = get_build_command(directory, jobs=jobs)
+    timer = BuildTimer(directory) if report else None
+    if timer is not None:
+        cmd = timer.instrument(cmd)
+    tstart = time_ns()
+    ret = run_subcommand(cmd, loc=Path(directory), err="failed to build idefix")
+    wall_ns = time_ns() - tstart
+
+    if timer is not None and (records := timer.collect()) is not None:
+        roots = [Path(os.environ["IDEFIX_DIR"]).resolve(), Path(directory).resolve()]
+        print(format_build_report(records, wall_ns=wall_ns, jobs=jobs, roots=roots))
+
+    if launcher is not None and launcher_stats is not None:
+        if (stats := get_compiler_cache_stats(launcher)) is not None:
+            print(
+                f"Compiler cache ({os.path.basename(launcher)}): {stats - launcher_stats}"
+            )
+
+    if ret == 0 and build_key is not None:
+        build_cache.store(directory, build_key)
+        build_cache.trim(keep=build_key.digest)
+    return ret
 
 
 class MultipleMaxCycles(Exception):
@@ -181,6 +450,27 @@ def parse_ncycles(unknown_args: tuple[str, ...], ncycles: int) -> tuple[str, ...
         return unknown_args
 
 
+def _nproc_type(value: str) -> int | Literal["auto"]:
+    if value == "auto":
+        return "auto"
+    try:
+        return int(value)
+    except ValueError:
+        raise ArgumentTypeError(
+            f"expected an integer or 'auto', got {value!r}"
+        ) from None
+
+
+def _duration_type(value: str) -> float:
+    try:
+        duration = parse_duration(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(str(exc)) from None
+    if duration <= 0:
+        raise ArgumentTypeError(f"expected a positive duration, got {value!r}")
+    return duration
+
+
 def add_arguments(parser: ArgumentParser) -> None:
     parser.add_argument("--dir", dest="directory", default=".", help="target directory")
     parser.add_argument(
@@ -226,12 +516,13 @@ def add_arguments(parser: ArgumentParser) -> None:
     parser.add_argument(
         "--nproc",
         action="store",
-        type=int,
+        type=_nproc_type,
         default=-1,
         help=(
             "run idefix in parallel over selected number of ALU. "
             "Requires the code to be configured for MPI. "
-            "This parameter can be left unspecified if -dec is passed."
+            "This parameter can be left unspecified if -dec is passed. "
+            "Use 'auto' to select it from available physical cores."
         ),
     )
     parser.add_argument(
@@ -241,6 +532,51 @@ def add_arguments(parser: ArgumentParser) -> None:
         default=None,
         help="ncycles for --one (use `--one --times 2` to run for 2 steps)",
     )
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help=(
+            "periodically report progress while idefix is running: simulation time, "
+            "cycle rate, cell updates per second, MPI overhead and estimated time "
+            "remaining (requires idefix >= 1.0)"
+        ),
+    )
+    parser.add_argument(
+        "--max-walltime",
+        dest="max_walltime",
+        type=_duration_type,
+        help=(
+            "gracefully stop idefix (writing a dump) once this wall time is elapsed "
+            "(e.g. 3600, 1h30m or 01:30:00). Requires idefix >= 1.0"
+        ),
+    )
+    parser.add_argument(
+        "--stall-timeout",
+        dest="stall_timeout",
+        type=_duration_type,
+        help=(
+            "gracefully stop idefix (writing a dump) if no new cycle is logged "
+            "for this long (e.g. 10m). Requires idefix >= 1.0"
+        ),
+    )
+    parser.add_argument(
+        "--run-report",
+        dest="run_report",
+        action="store_true",
+        help=(
+            f"write a JSON report of resource usage and performance ({RUN_REPORT_FILE}) "
+            "next to idefix's logs. Requires idefix >= 1.0"
+        ),
+    )
+    parser.add_argument(
+        "--build-report",
+        dest="build_report",
+        action="store_true",
+        help=(
+            "if idefix is (re)built, report compilation times of translation units "
+            "and achieved build parallelism"
+        ),
+    )
 
 
 def command(
@@ -251,9 +587,14 @@ def command(
     duration: float | None = None,
     time_step: float | None = None,
     one_step: list[str] | None = None,
-    nproc: int = -1,
+    nproc: int | Literal["auto"] = -1,
     ncycles: int | None = None,
     outputs: list[str] | None = None,
+    build_report: bool = False,
+    monitor: bool = False,
+    max_walltime: float | None = None,
+    stall_timeout: float | None = None,
+    run_report: bool = False,
 ) -> int:
     if one_step is None:
         if ncycles is not None:
@@ -284,9 +625,11 @@ def command(
 
     d = Path(directory).resolve()
     exe = d / "idefix"
-    if not exe.is_file() and not (d / "Makefile").is_file():
+    if not exe.is_file() and not any(
+        (d / build_file).is_file() for build_file in BUILD_FILES.values()
+    ):
         print_error(
-            f"No idefix executable or Makefile found in the target directory {d}",
+            f"No idefix executable or build files found in the target directory {d}",
             hint="Run `idfx conf` first",
         )
         return 1
@@ -361,47 +704,10 @@ def command(
         build_is_required = True
     elif rebuild_mode is RebuildMode.PROMPT:
         if exe.is_file():
-            last_build_time = os.stat(exe).st_mtime
-            source_patterns = (
-                "**/*.hpp",
-                "**/*.cpp",
-                "**/*.h",
-                "**/*.c",
-                "**/CMakeLists.txt",
-                "**/Makefile.cmake",
-            )
-            files_to_check = files_from_patterns(d, *source_patterns, recursive=True)
-            idefix_dir = Path(os.environ["IDEFIX_DIR"])
-            try:
-                with chdir(idefix_dir):
-                    git_indexed_idefix_files = [
-                        os.path.abspath(_)
-                        for _ in subprocess.run(
-                            ["git", "ls-files"], capture_output=True
-                        )
-                        .stdout.decode()
-                        .split("\n")
-                    ]
-            except subprocess.CalledProcessError:
-                # emmit no warning here as Idefix might not be installed as a git copy
-                pass
-            else:
-                source_files = files_from_patterns(
-                    idefix_dir / "src", *source_patterns, recursive=True
-                )
-                files_to_check.extend(
-                    set(git_indexed_idefix_files).intersection(source_files)
-                )
-
-            source_edit_times = tuple(
-                (file, os.stat(file).st_mtime) for file in files_to_check
-            )
-            time_deltas = tuple(
-                (file, edit_time - last_build_time)
-                for file, edit_time in source_edit_times
-            )
-            if updated_since_compilation := tuple(
-                file for file, td in time_deltas if td > 0
+            last_build_time = os.stat(exe).st_mtime_ns
+            files_to_check = get_source_files(d)
+            if updated_since_compilation := get_updated_files(
+                files_to_check, since_ns=last_build_time
             ):
                 print_warning(
                     "The following files were updated since last successful compilation:",
@@ -412,11 +718,30 @@ def command(
                 )
             else:
                 build_is_required = False
+    elif rebuild_mode is RebuildMode.AUTO:
+        manifest = BuildManifest(d)
+        if exe.is_file():
+            changes = manifest.get_changes(
+                exe,
+                get_source_files(d),
+                configuration=get_build_configuration(d),
+            )
+            if build_is_required := bool(changes):
+                print("Changes detected since last build:")
+                print(indent("\n".join(changes), "  "))
     else:
         assert_never(rebuild_mode)
 
-    if build_is_required and (ret := build_idefix(directory)) != 0:
-        return ret
+    if build_is_required:
+        if (ret := build_idefix(directory, report=build_report)) != 0:
+            return ret
+        if rebuild_mode is RebuildMode.AUTO:
+            manifest.record(
+                exe,
+                # sources may have been generated during the build
+                get_source_files(d),
+                configuration=get_build_configuration(d),
+            )
 
     if conf != base_conf:
         tmp_inifile = NamedTemporaryFile()
@@ -426,14 +751,33 @@ def command(
     else:
         inputfile = str(pinifile.relative_to(d.resolve()))
 
-    cmd = get_command(inputfile, nproc=nproc, idefix_args=unknown_args)
+    layout = get_parallel_layout(d, nproc, unknown_args)
+    if layout.omp_threads is not None:
+        os.environ["OMP_NUM_THREADS"] = str(layout.omp_threads)
+        print(f"Using {layout.omp_threads} OpenMP threads per process")
+    cmd = get_command(inputfile, nproc=layout.nproc, idefix_args=unknown_args)
 
     print_subcommand(cmd, loc=d)
 
+    watchdog: Watchdog | None = None
+    if max_walltime is not None or stall_timeout is not None:
+        watchdog = Watchdog(max_walltime=max_walltime, stall_timeout=stall_timeout)
+
     if get_idefix_version() >= Version("1.0.0"):
+        progress = ProgressMonitor(
+            tstop=_get_tstop(conf), max_cycles=_get_max_cycles(unknown_args)
+        )
+        usage: ResourceUsage | None = None
+        start = datetime.now()
         tstart = time_ns()
         with chdir(d):
-            ret = subprocess.call(cmd)
+            if monitor or watchdog is not None or run_report:
+                ret, usage = _watch_idefix(
+                    cmd, progress=progress, monitor=monitor, watchdog=watchdog
+                )
+            else:
+                ret = subprocess.call(cmd)
+        wall_time = (time_ns() - tstart) / 1e9
 
         logfile = d / MAIN_LOG_FILE
         if ret == 0 and logfile.is_file() and logfile.stat().st_mtime_ns > tstart:
@@ -452,7 +796,28 @@ def command(
             # temptation to guess what happened.
             pass
 
+        if run_report:
+            report = make_run_report(
+                cmd,
+                start=start,
+                wall_time=wall_time,
+                returncode=ret,
+                usage=usage,
+                progress=progress,
+            )
+            try:
+                dump_run_report(d / RUN_REPORT_FILE, report)
+            except OSError as exc:
+                print_warning(f"failed to write run report ({exc})")
+            else:
+                print(f"Run report written to {d / RUN_REPORT_FILE}")
+
     else:
+        if monitor or watchdog is not None or run_report:
+            print_warning(
+                "--monitor, --max-walltime, --stall-timeout and --run-report "
+                "require idefix >= 1.0, ignoring them"
+            )
         with chdir(d):
             ret = _spawn_idefix_lt_1(cmd, ncycles=ncycles)
 
@@ -0,0 +1,205 @@
+"""run a resident server to amortize idfx's startup time
+
+Start a long-running process that executes idfx commands received over a local
+Unix socket. Any idfx invocation from an environment where $IDFX_SOCKET points to
+this socket is forwarded to the server, which runs it from a (forked) warm process.
+Stop the server with Ctrl+C.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import sys
+import traceback
+from argparse import ArgumentParser
+from contextlib import suppress
+from types import FrameType
+from typing import Any
+
+from idefix_cli.__main__ import SOCKET_ENV_VAR
+from idefix_cli._client import (
+    get_default_socket_path,
+    is_same_user,
+    recv_request,
+    send_int,
+)
+from idefix_cli.lib import (
+    get_configuration,
+    get_idefix_version,
+    print_error,
+    print_success,
+    print_warning,
+)
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--socket",
+        dest="socket_path",
+        help=(
+            "path to the socket file "
+            "(default: $XDG_RUNTIME_DIR/idfx.sock, or a temporary file)"
+        ),
+    )
+
+
+def _reap_children(signum: int, frame: FrameType | None) -> None:
+    with suppress(ChildProcessError):
+        while os.waitpid(-1, os.WNOHANG)[0] > 0:
+            pass
+
+
+def _warm_up() -> None:
+    # import every command (and plugin) module once and for all so forked
+    # workers inherit them
+    from idefix_cli.__main__ import _setup_commands
+
+    commands = _setup_commands(ArgumentParser())
+    for name in commands:
+        commands.get_command(name).module  # noqa: B018
+    get_configuration()
+    if os.path.isdir(os.environ.get("IDEFIX_DIR", "")):
+        get_idefix_version()
+
+
+def _apply_user_dirs() -> None:
+    # configuration and cache directories are looked up once, when modules are
+    # imported (i.e., when the server started), so they need to be looked up
+    # again from the client's environment
+    import idefix_cli._cache
+    import idefix_cli.lib
+
+    idefix_cli.lib.XDG_CONFIG_HOME = idefix_cli.lib._get_config_home()
+    idefix_cli._cache.XDG_CACHE_HOME = idefix_cli._cache._get_cache_home()
+
+
+def _run_command(request: dict[str, Any]) -> int:
+    from idefix_cli.__main__ import as_exit_code, run_locally
+
+    try:
+        ret = as_exit_code(run_locally(request["caller"], request["argv"]))
+    except SystemExit as exc:
+        ret = as_exit_code(exc.code)
+    except KeyboardInterrupt:
+        ret = 130
+    except Exception:
+        traceback.print_exc()
+        ret = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return ret
+
+
+def _handle_request(conn: socket.socket) -> int:
+    from signal import SIG_DFL, SIGCHLD, signal
+
+    signal(SIGCHLD, SIG_DFL)
+    request, fds = recv_request(conn)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = open(0, closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False)
+
+    os.environ.clear()
+    os.environ.update(request["env"])
+    os.chdir(request["cwd"])
+    _apply_user_dirs()
+
+    # The command runs in its own child process, because some commands
+    # (e.g. idfx conf) replace their process with another program (exec),
+    # after which this one couldn't report back to the client.
+    if (pid := os.fork()) == 0:
+        ret = 1
+        try:
+            conn.close()
+            ret = _run_command(request)
+        finally:
+            os._exit(ret & 0xFF)
+
+    send_int(conn, pid)
+    _, status = os.waitpid(pid, 0)
+    if (ret := os.waitstatus_to_exitcode(status)) < 0:
+        # killed by a signal, reported as shells do
+        ret = 128 - ret
+    send_int(conn, ret)
+    return ret
+
+
+def _is_alive(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+        else:
+            return True
+
+
+def command(socket_path: str | None = None) -> int:
+    if sys.platform.startswith("win"):
+        print_error("idfx serve isn't supported on Windows")
+        return 1
+    from signal import SIGCHLD, signal
+
+    if socket_path is None:
+        socket_path = get_default_socket_path()
+
+    if os.path.exists(socket_path):
+        if _is_alive(socket_path):
+            print_error(f"an idfx server is already listening on {socket_path}")
+            return 1
+        # stale socket from a server that didn't exit cleanly
+        try:
+            os.remove(socket_path)
+        except OSError as exc:
+            print_error(
+                f"could not remove {socket_path} ({exc.strerror})",
+                hint="select another path with --socket",
+            )
+            return 1
+
+    _warm_up()
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        # the socket is created with restrictive permissions, so that
+        # no other user can connect, even briefly
+        umask = os.umask(0o177)
+        try:
+            server.bind(socket_path)
+        finally:
+            os.umask(umask)
+        try:
+            server.listen()
+            signal(SIGCHLD, _reap_children)
+            print_success(f"listening on {socket_path}")
+            print(
+                f"Run `export {SOCKET_ENV_VAR}={socket_path}` "
+                "to forward idfx commands to this server",
+                flush=True,
+            )
+            while True:
+                conn, _ = server.accept()
+                if not is_same_user(conn):
+                    # requests are executed with the environment they carry
+                    print_warning("rejected a connection from another user")
+                    conn.close()
+                    continue
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    # worker process
+                    server.close()
+                    try:
+                        ret = _handle_request(conn)
+                    except BaseException:
+                        ret = 1
+                    os._exit(ret & 0xFF)
+                conn.close()
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            os.remove(socket_path)
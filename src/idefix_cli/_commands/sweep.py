@@ -0,0 +1,281 @@
+"""run parameter sweeps from a problem directory
+
+Variants of an inifile are generated from a sweep specification (a JSON or TOML
+file), each in its own directory, which shares the base problem's executable.
+Variants are then run concurrently, as many at a time as available cores allow.
+Unknown arguments are passed to idefix.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Any, NamedTuple
+
+import inifix
+
+from idefix_cli._commands.clone import MemorizedPath, command as clone
+from idefix_cli._commands.run import (
+    KNOWN_FAIL,
+    KNOWN_SUCCESS,
+    MAIN_LOG_FILE,
+    get_command,
+)
+from idefix_cli._progress import format_eta
+from idefix_cli._sweep import apply_variant, get_variants, load_sweep_spec
+from idefix_cli._topology import get_cpu_topology
+from idefix_cli.lib import print_error, print_success, print_warning
+
+# written in the output directory
+MANIFEST_FILE = "sweep.json"
+# written in each variant's directory
+OUTPUT_FILE = "idfx_sweep.out"
+
+
+class Job(NamedTuple):
+    name: str
+    directory: Path
+
+
+class RunningJob(NamedTuple):
+    job: Job
+    process: subprocess.Popen[bytes]
+    start: float
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument("spec", help="sweep specification file (JSON or TOML)")
+    parser.add_argument(
+        "--dir", dest="directory", default=".", help="base problem directory"
+    )
+    parser.add_argument(
+        "-i",
+        dest="inifile",
+        default="idefix.ini",
+        help="base inifile (relative to the base problem directory)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="sweep",
+        help="directory where variants are created (default: sweep)",
+    )
+    parser.add_argument(
+        "--nproc",
+        type=int,
+        default=1,
+        help="number of MPI processes per variant (default: 1, without mpirun)",
+    )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        help="number of cores to use (default: available physical cores)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="only create variants, without running them",
+    )
+
+
+def _get_status(job: Job, returncode: int) -> tuple[bool, str]:
+    # Idefix >= 1.0 intentionally always returns 0, even on failure,
+    # so the final status is read from its log, as in idfx run
+    if returncode != 0:
+        return False, f"exit code {returncode}"
+    try:
+        with open(job.directory / MAIN_LOG_FILE) as fh:
+            last_line = fh.read().strip().split("\n")[-1].strip()
+    except OSError:
+        return True, "completed (no log)"
+    if last_line in KNOWN_FAIL:
+        return False, last_line
+    if last_line in KNOWN_SUCCESS:
+        return True, "completed successfully"
+    return True, "completed with an unknown status"
+
+
+def _wait_any(running: dict[int, RunningJob]) -> tuple[RunningJob, int]:
+    if sys.platform.startswith("win"):
+        # os.wait isn't available
+        while True:
+            for pid, rjob in running.items():
+                if (ret := rjob.process.poll()) is not None:
+                    return running.pop(pid), ret
+            sleep(0.1)
+
+    pid, status = os.wait()
+    rjob = running.pop(pid)
+    rjob.process.returncode = ret = os.waitstatus_to_exitcode(status)
+    return rjob, ret
+
+
+def _run_jobs(
+    jobs: list[Job], cmd: list[str], *, max_workers: int, env: dict[str, str]
+) -> int:
+    # run jobs as processes (not forks, unlike batch), since they only spawn idefix
+    nfailed = ndone = 0
+    pending = iter(jobs)
+    running: dict[int, RunningJob] = {}
+    while True:
+        while len(running) < max_workers and (job := next(pending, None)) is not None:
+            with open(job.directory / OUTPUT_FILE, "wb") as output:
+                prog = subprocess.Popen(
+                    cmd,
+                    cwd=job.directory,
+                    env=env,
+                    stdin=subprocess.DEVNULL,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                )
+            running[prog.pid] = RunningJob(job, prog, monotonic())
+
+        if not running:
+            break
+
+        rjob, ret = _wait_any(running)
+        ndone += 1
+        success, status = _get_status(rjob.job, ret)
+        message = (
+            f"[{ndone}/{len(jobs)}] {rjob.job.name}: {status} "
+            f"in {format_eta(monotonic() - rjob.start)}"
+        )
+        if success:
+            print_success(message)
+        else:
+            nfailed += 1
+            print_error(message, hint=f"see {rjob.job.directory / OUTPUT_FILE}")
+    return nfailed
+
+
+def command(
+    *idefix_args: str,
+    spec: str,
+    directory: str = ".",
+    inifile: str = "idefix.ini",
+    output: str = "sweep",
+    nproc: int = 1,
+    cores: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    base = Path(directory).resolve()
+    if not (base / "idefix").is_file():
+        print_error(
+            f"No idefix executable found in {base}",
+            hint="Build the base problem first, e.g. with `idfx run --one`",
+        )
+        return 1
+    if nproc < 1:
+        print_error(
+            f"the --nproc parameter expects a strictly positive integer (got {nproc})"
+        )
+        return 1
+    if cores is not None and cores < 1:
+        print_error(
+            f"the --cores parameter expects a strictly positive integer (got {cores})"
+        )
+        return 1
+
+    try:
+        variants = get_variants(load_sweep_spec(spec))
+    except OSError as exc:
+        print_error(f"could not read {spec}: {exc.strerror}")
+        return 1
+    except ValueError as exc:
+        print_error(f"invalid sweep specification {spec}: {exc}")
+        return 1
+    if not variants:
+        print("Nothing to do.")
+        return 0
+
+    pinifile = base / inifile
+    try:
+        with open(pinifile, "rb") as fh:
+            base_conf = inifix.load(fh, sections="require")
+    except OSError:
+        print_error(f"could not find inifile {pinifile}")
+        return 1
+    except ValueError as exc:
+        print_error(
+            "configuration file seems malformed. "
+            f"The following exception was raised\n{exc}"
+        )
+        return 1
+
+    try:
+        confs = [apply_variant(base_conf, variant) for variant in variants]
+    except ValueError as exc:
+        print_error(str(exc))
+        return 1
+
+    outdir = Path(output).resolve()
+    width = len(str(len(variants) - 1))
+    jobs = [Job(f"{i:0{width}d}", outdir / f"{i:0{width}d}") for i in range(len(confs))]
+    if existing := [job.directory for job in jobs if job.directory.exists()]:
+        print_error(f"destination directory exists {existing[0]}")
+        return 1
+
+    # variants are shallow clones of the base problem, including its executable,
+    # with their own inifile
+    inifile_name = pinifile.name
+    for job, conf in zip(jobs, confs, strict=True):
+        with redirect_stdout(StringIO()):
+            ret = clone(
+                MemorizedPath(str(base)).resolve(),
+                MemorizedPath(str(job.directory)),
+                shallow=True,
+                include=["idefix"],
+                exclude=[inifile_name],
+            )
+        if ret != 0:
+            return ret
+        with open(job.directory / inifile_name, "wb") as fh:
+            inifix.dump(conf, fh, sections="require")
+
+    manifest: dict[str, Any] = {
+        "base": str(base),
+        "inifile": inifile_name,
+        "variants": {
+            job.name: variant for job, variant in zip(jobs, variants, strict=True)
+        },
+    }
+    with open(outdir / MANIFEST_FILE, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+        fh.write("\n")
+
+    if dry_run:
+        print_success(f"Created {len(jobs)} variants in {outdir}")
+        return 0
+
+    if cores is None:
+        cores = get_cpu_topology().effective_cores
+    if nproc > cores:
+        print_warning(
+            f"each variant requires {nproc} processes, but only {cores} cores are available"
+        )
+    max_workers = min(len(jobs), max(1, cores // nproc))
+
+    cmd = get_command(
+        inifile_name, nproc=nproc if nproc > 1 else -1, idefix_args=idefix_args
+    )
+    env = os.environ.copy()
+    # avoid oversubscribing cores with OpenMP builds
+    env.setdefault("OMP_NUM_THREADS", "1")
+
+    print(
+        f"Running {len(jobs)} variants in {outdir}, {max_workers} at a time "
+        f"({nproc} processes each, on {cores} cores)"
+    )
+    if nfailed := _run_jobs(jobs, cmd, max_workers=max_workers, env=env):
+        print_error(f"{nfailed} out of {len(jobs)} variants failed")
+        return 1
+    print_success(f"all {len(jobs)} variants completed successfully")
+    return 0
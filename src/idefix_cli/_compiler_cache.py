@@ -0,0 +1,112 @@
+"""Statistics from compiler caches (ccache, sccache) used as compiler launchers.
+
+These tools only report cumulative statistics, so the statistics of a single
+build are obtained as the difference between snapshots taken before and after
+it. Concurrent builds using the same cache are counted too.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from typing import NamedTuple
+
+from idefix_cli._cmake import read_cmake_cache
+
+__all__ = [
+    "CompilerCacheStats",
+    "get_compiler_cache_stats",
+    "get_compiler_launcher",
+]
+
+# ccache >= 4.0, then ccache 3.7
+_CCACHE_HIT_KEYS = frozenset(
+    (
+        "direct_cache_hit",
+        "preprocessed_cache_hit",
+        "cache_hit_direct",
+        "cache_hit_cpp",
+    )
+)
+_CCACHE_MISS_KEYS = frozenset(("cache_miss",))
+
+
+class CompilerCacheStats(NamedTuple):
+    hits: int
+    misses: int
+
+    def __sub__(self, other: object) -> CompilerCacheStats:
+        if not isinstance(other, CompilerCacheStats):
+            return NotImplemented
+        return CompilerCacheStats(self.hits - other.hits, self.misses - other.misses)
+
+    def __str__(self) -> str:
+        if (total := self.hits + self.misses) == 0:
+            return "nothing was compiled"
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hits / total:.0%} hit rate)"
+        )
+
+
+def get_compiler_launcher(directory: str | os.PathLike[str]) -> str | None:
+    """Return the compiler launcher configured in a problem directory, if any"""
+    try:
+        cache = read_cmake_cache(os.path.join(directory, "CMakeCache.txt"))
+    except OSError:
+        return None
+    if (entry := cache.get("CMAKE_CXX_COMPILER_LAUNCHER")) is None:
+        return None
+    # this is a CMake list, possibly including arguments to the launcher
+    return entry.value.partition(";")[0] or None
+
+
+def _run_stats_command(cmd: list[str]) -> str | None:
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout
+
+
+def _parse_ccache_stats(output: str) -> CompilerCacheStats:
+    hits = misses = 0
+    for line in output.splitlines():
+        key, _, value = line.partition("\t")
+        if not value.isdigit():
+            continue
+        if key in _CCACHE_HIT_KEYS:
+            hits += int(value)
+        elif key in _CCACHE_MISS_KEYS:
+            misses += int(value)
+    return CompilerCacheStats(hits, misses)
+
+
+def _parse_sccache_stats(output: str) -> CompilerCacheStats | None:
+    try:
+        stats = json.loads(output)["stats"]
+        return CompilerCacheStats(
+            hits=sum(stats["cache_hits"]["counts"].values()),
+            misses=sum(stats["cache_misses"]["counts"].values()),
+        )
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def get_compiler_cache_stats(launcher: str) -> CompilerCacheStats | None:
+    """Return cumulative statistics for a compiler cache,
+    or None if the launcher isn't a supported compiler cache."""
+    name = os.path.splitext(os.path.basename(launcher))[0]
+    if name == "ccache":
+        if (output := _run_stats_command([launcher, "--print-stats"])) is None:
+            return None
+        return _parse_ccache_stats(output)
+    elif name == "sccache":
+        cmd = [launcher, "--show-stats", "--stats-format", "json"]
+        if (output := _run_stats_command(cmd)) is None:
+            return None
+        return _parse_sccache_stats(output)
+    else:
+        return None
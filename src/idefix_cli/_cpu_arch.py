@@ -0,0 +1,148 @@
+"""Detection of the host CPU's architecture, as a Kokkos architecture flag.
+
+Kokkos_ARCH_NATIVE only passes -march=native to the compiler, while selecting
+the actual architecture also enables Kokkos' own architecture-specific code paths
+(e.g., for AVX-512). Detection relies on /proc/cpuinfo, so it's only available
+on Linux.
+"""
+
+from __future__ import annotations
+
+import platform
+import socket
+
+from idefix_cli._cache import dump_cache, load_cache
+
+__all__ = ["detect_kokkos_arch", "get_native_arch"]
+
+# aarch64 CPUs, as (implementer, part)
+_ARM_ARCHS: dict[tuple[int, int], str] = {
+    (0x46, 0x001): "A64FX",
+    (0x43, 0x0A1): "ARMV8_THUNDERX",
+    (0x43, 0x0AF): "ARMV8_THUNDERX2",
+    (0x41, 0xD0C): "ARMV81",  # Neoverse N1
+    (0x41, 0xD40): "ARMV81",  # Neoverse V1
+    (0x41, 0xD4F): "ARMV9_GRACE",  # Neoverse V2
+}
+
+# Intel Ice Lake server models (client models share the same flags)
+_ICX_MODELS = frozenset((0x6A, 0x6C))
+
+
+def _parse_cpuinfo(cpuinfo: str) -> dict[str, str]:
+    # fields of the first processor
+    fields: dict[str, str] = {}
+    for line in cpuinfo.splitlines():
+        if not line.strip():
+            if fields:
+                break
+            continue
+        key, sep, value = line.partition(":")
+        if sep:
+            fields.setdefault(key.strip(), value.strip())
+    return fields
+
+
+def _parse_int(value: str | None) -> int | None:
+    if value is None:
+        return None
+    try:
+        return int(value, 0)
+    except ValueError:
+        return None
+
+
+def _detect_x86_arch(fields: dict[str, str]) -> str | None:
+    flags = set(fields.get("flags", "").split())
+    family = _parse_int(fields.get("cpu family"))
+    model = _parse_int(fields.get("model"))
+    vendor = fields.get("vendor_id")
+
+    if vendor == "AuthenticAMD":
+        if family is None or model is None:
+            return None
+        if family >= 0x19:
+            # Zen 4 is the first AMD architecture to support AVX-512
+            return "ZEN4" if "avx512f" in flags else "ZEN3"
+        if family == 0x17:
+            return "ZEN2" if model >= 0x30 else "ZEN"
+        return None
+
+    if vendor != "GenuineIntel":
+        return None
+    if "avx512er" in flags:
+        return "KNL"
+    if "amx_tile" in flags:
+        return "SPR"
+    if "avx512_vbmi2" in flags:
+        return "ICX" if model in _ICX_MODELS else "ICL"
+    if "avx512f" in flags:
+        return "SKX"
+    if "avx2" in flags:
+        if "clflushopt" in flags:
+            return "SKL"
+        return "BDW" if "adx" in flags else "HSW"
+    if "avx" in flags:
+        return "SNB"
+    return None
+
+
+def _detect_arm_arch(fields: dict[str, str]) -> str | None:
+    implementer = _parse_int(fields.get("CPU implementer"))
+    part = _parse_int(fields.get("CPU part"))
+    if implementer is None or part is None:
+        return None
+    return _ARM_ARCHS.get((implementer, part))
+
+
+def _detect_power_arch(fields: dict[str, str]) -> str | None:
+    cpu = fields.get("cpu", "").upper()
+    for arch in ("POWER9", "POWER8"):
+        if cpu.startswith(arch):
+            return arch
+    return None
+
+
+def detect_kokkos_arch(cpuinfo: str, machine: str) -> str | None:
+    """Return the Kokkos architecture matching a CPU, as described in
+    /proc/cpuinfo, or None if it isn't recognized.
+
+    Examples:
+        >>> detect_kokkos_arch(
+        ...     "vendor_id : GenuineIntel\\ncpu family : 6\\nmodel : 85\\n"
+        ...     "flags : fpu sse avx avx2 avx512f\\n",
+        ...     machine="x86_64",
+        ... )
+        'SKX'
+    """
+    fields = _parse_cpuinfo(cpuinfo)
+    machine = machine.lower()
+    if machine in ("x86_64", "amd64"):
+        return _detect_x86_arch(fields)
+    if machine in ("aarch64", "arm64"):
+        return _detect_arm_arch(fields)
+    if machine.startswith("ppc64"):
+        return _detect_power_arch(fields)
+    return None
+
+
+def get_native_arch() -> str | None:
+    """Return the Kokkos architecture of the current host, if it is recognized.
+
+    Results are cached per host name, since home directories are typically
+    shared between heterogeneous nodes of a cluster.
+    """
+    host = socket.gethostname()
+    cache = load_cache("native_archs")
+    if isinstance(arch := cache.get(host), str):
+        return arch
+
+    try:
+        with open("/proc/cpuinfo") as fh:
+            cpuinfo = fh.read()
+    except OSError:
+        return None
+    if (arch := detect_kokkos_arch(cpuinfo, platform.machine())) is not None:
+        cache[host] = arch
+        dump_cache("native_archs", cache)
+    return arch
@@ -0,0 +1,271 @@
+"""A single-pass file pattern matcher.
+
+All include and exclude patterns are compiled into a single matcher, so a
+directory tree is walked exactly once (with os.scandir), however many patterns
+are requested. Matching follows glob.glob's semantics:
+
+- wildcards don't match hidden names (starting with "."), unless the pattern
+  component itself starts with "."
+- "**" matches any number of (non-hidden) directories, only if recursive=True
+- a pattern ending with a separator only matches directories
+
+Subtrees are pruned as soon as they can't contain a match, including when
+they are entirely excluded (e.g. with "build/**").
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from collections.abc import Callable, Iterable
+from fnmatch import translate
+from itertools import chain
+from operator import methodcaller
+from typing import NamedTuple
+
+__all__ = ["PatternMatcher"]
+
+_MAGIC_REGEXP = re.compile(r"[*?[]")
+_SEP_REGEXP = re.compile(
+    "[" + re.escape(os.sep + (os.altsep or "")) + "]+",
+)
+
+
+class _Wildcard(NamedTuple):
+    # either a compiled regexp's match method, or a str.endswith call for the
+    # most common case of a pattern matching a suffix (e.g. "*.cpp")
+    match: Callable[[str], object]
+    # wildcards only match hidden names if they explicitly start with "."
+    hidden: bool
+
+
+# a component is either a literal name, a wildcard, or RECURSIVE ("**")
+_Component = str | _Wildcard | None
+RECURSIVE: None = None
+
+
+class _Pattern(NamedTuple):
+    components: tuple[_Component, ...]
+    dir_only: bool
+    exclude: bool
+    # for each position, whether remaining components can match a hidden name
+    hidden_tail: tuple[bool, ...]
+
+
+# a state is a (pattern index, position) pair
+_State = tuple[int, int]
+
+
+def _is_hidden(name: str) -> bool:
+    return name[0] == "."
+
+
+def _compile_component(component: str, *, recursive: bool) -> _Component:
+    if recursive and component == "**":
+        return RECURSIVE
+    if _MAGIC_REGEXP.search(component) is None:
+        return os.path.normcase(component)
+    component = os.path.normcase(component)
+    if component.startswith("*") and _MAGIC_REGEXP.search(component[1:]) is None:
+        return _Wildcard(methodcaller("endswith", component[1:]), hidden=False)
+    return _Wildcard(
+        re.compile(translate(component)).match, hidden=_is_hidden(component)
+    )
+
+
+def _can_match_hidden(component: _Component) -> bool:
+    if component is RECURSIVE:
+        return False
+    if isinstance(component, str):
+        return _is_hidden(component)
+    return component.hidden
+
+
+def _compile(pattern: str, *, recursive: bool, exclude: bool) -> _Pattern | None:
+    # Return None if the pattern isn't supported (absolute paths, relative
+    # references), in which case the caller should fall back to glob.
+    if not pattern or os.path.isabs(pattern) or os.path.splitdrive(pattern)[0]:
+        return None
+    dir_only = pattern.endswith(os.sep) or (
+        os.altsep is not None and pattern.endswith(os.altsep)
+    )
+    parts = _SEP_REGEXP.split(pattern.strip(os.sep + (os.altsep or "")))
+    if any(part in ("", ".", "..") for part in parts):
+        return None
+    components = tuple(_compile_component(p, recursive=recursive) for p in parts)
+    hidden_tail = tuple(
+        any(_can_match_hidden(c) for c in components[i:])
+        for i in range(len(components) + 1)
+    )
+    return _Pattern(components, dir_only, exclude, hidden_tail)
+
+
+class PatternMatcher:
+    def __init__(
+        self,
+        patterns: Iterable[str],
+        *,
+        excludes: Iterable[str] = (),
+        recursive: bool = False,
+    ) -> None:
+        self._patterns: list[_Pattern] = []
+        flagged = chain(
+            ((p, False) for p in patterns),
+            ((p, True) for p in excludes),
+        )
+        for pattern, exclude in flagged:
+            compiled = _compile(pattern, recursive=recursive, exclude=exclude)
+            if compiled is None:
+                raise ValueError(f"unsupported pattern {pattern!r}")
+            self._patterns.append(compiled)
+
+        # The set of possible states is small, and typically shared by many
+        # directories and files, so transitions and decisions are memoized.
+        self._advance_memo: dict[tuple[frozenset[_State], str], frozenset[_State]] = {}
+        self._match_memo: dict[tuple[frozenset[_State], bool], bool] = {}
+        self._descend_memo: dict[frozenset[_State], bool] = {}
+
+    @staticmethod
+    def supports(patterns: Iterable[str], *, recursive: bool = False) -> bool:
+        return all(
+            _compile(p, recursive=recursive, exclude=False) is not None
+            for p in patterns
+        )
+
+    def _is_trailing_recursive(self, pid: int, pos: int) -> bool:
+        components = self._patterns[pid].components
+        return pos == len(components) - 1 and components[pos] is RECURSIVE
+
+    def _closure(self, states: Iterable[_State]) -> frozenset[_State]:
+        # A recursive component may match zero directories. This doesn't apply
+        # to a trailing one, which only matches the current path itself if it's
+        # a directory (see _is_match)
+        retv: set[_State] = set()
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            if state in retv:
+                continue
+            retv.add(state)
+            pid, pos = state
+            components = self._patterns[pid].components
+            if pos < len(components) - 1 and components[pos] is RECURSIVE:
+                stack.append((pid, pos + 1))
+        return frozenset(retv)
+
+    def _advance(self, states: frozenset[_State], name: str) -> frozenset[_State]:
+        key = (states, name)
+        if (retv := self._advance_memo.get(key)) is None:
+            retv = self._advance_memo[key] = self._compute_advance(states, name)
+        return retv
+
+    def _compute_advance(
+        self, states: frozenset[_State], name: str
+    ) -> frozenset[_State]:
+        ncname = os.path.normcase(name)
+        hidden = _is_hidden(name)
+        retv: list[_State] = []
+        for pid, pos in states:
+            components = self._patterns[pid].components
+            if pos == len(components):
+                continue
+            component = components[pos]
+            if component is RECURSIVE:
+                if not hidden:
+                    retv.append((pid, pos))
+                    if pos == len(components) - 1:
+                        retv.append((pid, pos + 1))
+            elif isinstance(component, str):
+                if ncname == component:
+                    retv.append((pid, pos + 1))
+            elif (not hidden or component.hidden) and component.match(ncname):
+                retv.append((pid, pos + 1))
+        return self._closure(retv)
+
+    def _is_match(self, states: frozenset[_State], *, is_dir: bool) -> bool:
+        key = (states, is_dir)
+        if (retv := self._match_memo.get(key)) is None:
+            retv = self._match_memo[key] = self._compute_is_match(states, is_dir)
+        return retv
+
+    def _compute_is_match(self, states: frozenset[_State], is_dir: bool) -> bool:
+        included = False
+        for pid, pos in states:
+            pattern = self._patterns[pid]
+            if pos == len(pattern.components):
+                if pattern.dir_only and not is_dir:
+                    continue
+            elif not (is_dir and self._is_trailing_recursive(pid, pos)):
+                continue
+            if pattern.exclude:
+                return False
+            included = True
+        return included
+
+    def _is_excluded_subtree(self, states: frozenset[_State]) -> bool:
+        # True if every match that could be found below the current directory
+        # is also excluded. A trailing "**" exclusion rejects any descendant,
+        # except those with hidden names, so the subtree can only be pruned if
+        # no include pattern can match these.
+        if not any(
+            (pattern := self._patterns[pid]).exclude
+            and not pattern.dir_only
+            and self._is_trailing_recursive(pid, pos)
+            for pid, pos in states
+        ):
+            return False
+        return not any(
+            self._patterns[pid].hidden_tail[pos]
+            for pid, pos in states
+            if not self._patterns[pid].exclude
+        )
+
+    def _has_include(self, states: frozenset[_State]) -> bool:
+        # True if an include pattern could still match below the current directory
+        return any(
+            not (pattern := self._patterns[pid]).exclude
+            and pos < len(pattern.components)
+            for pid, pos in states
+        )
+
+    def _should_descend(self, states: frozenset[_State]) -> bool:
+        if (retv := self._descend_memo.get(states)) is None:
+            retv = self._descend_memo[states] = self._has_include(
+                states
+            ) and not self._is_excluded_subtree(states)
+        return retv
+
+    def match(self, source: str | os.PathLike[str]) -> list[str]:
+        """Return absolute paths to all matches, in alphabetical order"""
+        root = os.path.abspath(source)
+        if not os.path.isdir(root):
+            return []
+
+        retv: list[str] = []
+        initial = self._closure((pid, 0) for pid in range(len(self._patterns)))
+        if self._is_match(initial, is_dir=True):
+            retv.append(root)
+
+        stack: list[tuple[str, frozenset[_State]]] = []
+        if self._should_descend(initial):
+            stack.append((root, initial))
+        while stack:
+            dirpath, states = stack.pop()
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if not (new_states := self._advance(states, entry.name)):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if self._is_match(new_states, is_dir=is_dir):
+                    retv.append(entry.path)
+                if is_dir and self._should_descend(new_states):
+                    stack.append((entry.path, new_states))
+
+        return sorted(retv)
@@ -0,0 +1,292 @@
+"""Progress of a running Idefix simulation, as reported in its main log file.
+
+TimeIntegrator lines are formatted as a table, the columns of which are
+described by a header line, e.g.
+
+TimeIntegrator:             time |            cycle |        time step | cell (updates/s) | MPI overhead (%)
+TimeIntegrator:     1.593742e-03 |               10 |     2.593742e-04 |     1.348727e+06 |         0.448231
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import deque
+from time import monotonic
+from typing import Final, Literal, NamedTuple
+
+__all__ = [
+    "TIME_INTEGRATOR_LOG_LINE",
+    "ProgressMonitor",
+    "ProgressRecord",
+    "Watchdog",
+    "format_eta",
+    "parse_duration",
+]
+
+TIME_INTEGRATOR_LOG_LINE = re.compile(
+    "^TimeIntegrator:\\s*(?P<time>.+) \\|\\s*(?P<cycle>\\d+) \\|"
+)
+_DURATION_REGEXP = re.compile(
+    r"^(?:(?P<d>\d+(?:\.\d*)?)d)?(?:(?P<h>\d+(?:\.\d*)?)h)?"
+    r"(?:(?P<m>\d+(?:\.\d*)?)m)?(?:(?P<s>\d+(?:\.\d*)?)s?)?$"
+)
+_CELL_UPDATES_COLUMN = "cell (updates/s)"
+_MPI_OVERHEAD_COLUMN = "MPI overhead (%)"
+
+
+class ProgressRecord(NamedTuple):
+    # monotonic time (s) at which the record was read
+    wall_time: float
+    time: float
+    cycle: int
+    cell_updates: float | None = None
+    mpi_overhead: float | None = None
+
+
+def _parse_float(value: str) -> float | None:
+    try:
+        ret = float(value)
+    except ValueError:
+        # N/A
+        return None
+    return None if math.isnan(ret) else ret
+
+
+def format_eta(seconds: float) -> str:
+    """
+    Examples:
+        >>> format_eta(42.3)
+        '42s'
+        >>> format_eta(725)
+        '12m05s'
+        >>> format_eta(3 * 86400 + 4980)
+        '73h23m'
+    """
+    seconds = round(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+def parse_duration(value: str) -> float:
+    """Parse a duration, in seconds, either as a number, with units (d, h, m, s),
+    or formatted as [[HH:]MM:]SS, as used by job schedulers.
+
+    Examples:
+        >>> parse_duration("90")
+        90.0
+        >>> parse_duration("1h30m")
+        5400.0
+        >>> parse_duration("01:30:00")
+        5400.0
+    """
+    value = value.strip()
+    if ":" in value:
+        parts = value.split(":")
+        if len(parts) <= 3 and all(p.isdigit() for p in parts):
+            return float(sum(int(p) * 60**i for i, p in enumerate(reversed(parts))))
+    elif value and (match := _DURATION_REGEXP.match(value)) is not None:
+        factors = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+        return sum(float(match[k] or 0) * f for k, f in factors.items())
+    raise ValueError(f"invalid duration {value!r}")
+
+
+class ProgressMonitor:
+    """Estimate throughput and remaining time of a simulation from TimeIntegrator
+    log lines, fed as they're written.
+
+    Rates are measured over the last few records (window), so
+    they reflect the current performance of the simulation.
+    """
+
+    def __init__(
+        self,
+        *,
+        tstop: float | None = None,
+        max_cycles: int | None = None,
+        window: int = 10,
+    ) -> None:
+        self.tstop = tstop
+        self.max_cycles = max_cycles
+        self.records: deque[ProgressRecord] = deque(maxlen=window)
+        self._columns: list[str] = []
+        # sums and counts of values logged since the simulation started
+        self._cell_updates = [0.0, 0]
+        self._mpi_overhead = [0.0, 0]
+
+    def feed(
+        self, line: str, *, wall_time: float | None = None
+    ) -> ProgressRecord | None:
+        """Parse a log line, returning a new record if it's a TimeIntegrator line"""
+        if not line.startswith("TimeIntegrator:"):
+            return None
+        fields = [f.strip() for f in line.removeprefix("TimeIntegrator:").split("|")]
+        if (match := TIME_INTEGRATOR_LOG_LINE.match(line)) is None:
+            if "cycle" in fields:
+                self._columns = fields
+            return None
+
+        def get_column(name: str) -> float | None:
+            if name not in self._columns:
+                return None
+            if (index := self._columns.index(name)) >= len(fields):
+                return None
+            return _parse_float(fields[index])
+
+        if (time := _parse_float(match["time"])) is None:
+            return None
+        record = ProgressRecord(
+            wall_time=monotonic() if wall_time is None else wall_time,
+            time=time,
+            cycle=int(match["cycle"]),
+            cell_updates=get_column(_CELL_UPDATES_COLUMN),
+            mpi_overhead=get_column(_MPI_OVERHEAD_COLUMN),
+        )
+        if self.records and record.cycle < self.records[-1].cycle:
+            # the simulation was restarted
+            self.records.clear()
+            self._cell_updates = [0.0, 0]
+            self._mpi_overhead = [0.0, 0]
+        self.records.append(record)
+        for value, acc in (
+            (record.cell_updates, self._cell_updates),
+            (record.mpi_overhead, self._mpi_overhead),
+        ):
+            if value is not None:
+                acc[0] += value
+                acc[1] += 1
+        return record
+
+    @property
+    def mean_cell_updates(self) -> float | None:
+        """Average of cell updates per second, over all logged cycles"""
+        total, count = self._cell_updates
+        return total / count if count else None
+
+    @property
+    def mean_mpi_overhead(self) -> float | None:
+        """Average MPI overhead (%), over all logged cycles"""
+        total, count = self._mpi_overhead
+        return total / count if count else None
+
+    def _get_rate(self, attr: str) -> float | None:
+        if len(self.records) < 2:
+            return None
+        first, last = self.records[0], self.records[-1]
+        if (elapsed := last.wall_time - first.wall_time) <= 0:
+            return None
+        return float(getattr(last, attr) - getattr(first, attr)) / elapsed
+
+    @property
+    def cycle_rate(self) -> float | None:
+        """Cycles per second of wall time"""
+        return self._get_rate("cycle")
+
+    @property
+    def time_rate(self) -> float | None:
+        """Simulation time units per second of wall time"""
+        return self._get_rate("time")
+
+    @property
+    def eta(self) -> float | None:
+        """Estimated remaining wall time (s) until either tstop or max_cycles is reached"""
+        if not self.records:
+            return None
+        last = self.records[-1]
+        estimates: list[float] = []
+        if self.tstop is not None and (rate := self.time_rate):
+            estimates.append((self.tstop - last.time) / rate)
+        if self.max_cycles is not None and (rate := self.cycle_rate):
+            estimates.append((self.max_cycles - last.cycle) / rate)
+        if not estimates:
+            return None
+        return max(0.0, min(estimates))
+
+    def format_status(self) -> str:
+        if not self.records:
+            return "waiting for progress..."
+        last = self.records[-1]
+        status = [f"t = {last.time:.4e}"]
+        if self.tstop is not None and self.tstop > 0:
+            status[0] += f" / {self.tstop:g} ({last.time / self.tstop:.1%})"
+        status.append(f"cycle {last.cycle}")
+        if (cycle_rate := self.cycle_rate) is not None:
+            status.append(f"{cycle_rate:.3g} cycles/s")
+        if last.cell_updates is not None:
+            status.append(f"{last.cell_updates:.3e} cell updates/s")
+        if last.mpi_overhead is not None:
+            status.append(f"MPI overhead {last.mpi_overhead:.1f}%")
+        if (eta := self.eta) is not None:
+            status.append(f"ETA {format_eta(eta)}")
+        return " | ".join(status)
+
+
+# delay (s) given to idefix to stop gracefully (writing a dump),
+# and then to exit after being terminated, before it's killed
+STOP_GRACE_PERIOD: Final = 120.0
+KILL_DELAY: Final = 10.0
+
+WatchdogAction = Literal["stop", "terminate", "kill"]
+
+
+class Watchdog:
+    """Decide when a running simulation should be stopped, because it ran out
+    of its wall time budget, or made no progress (no new cycle) for too long.
+
+    Stopping escalates from a graceful stop to termination, then to killing,
+    if the simulation is still running after grace periods.
+    All times are measured with time.monotonic, in seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_walltime: float | None = None,
+        stall_timeout: float | None = None,
+        start: float | None = None,
+    ) -> None:
+        self.max_walltime = max_walltime
+        self.stall_timeout = stall_timeout
+        self.start = monotonic() if start is None else start
+        self.last_progress = self.start
+        # why the simulation is being stopped
+        self.reason: str | None = None
+        self._stop_time = 0.0
+        self._actions: list[WatchdogAction] = ["stop", "terminate", "kill"]
+
+    def record_progress(self, now: float | None = None) -> None:
+        self.last_progress = monotonic() if now is None else now
+
+    def check(self, now: float | None = None) -> WatchdogAction | None:
+        """Return the next action to take, if any. Each action is returned once."""
+        if now is None:
+            now = monotonic()
+        if self.reason is None:
+            if self.max_walltime is not None and now - self.start >= self.max_walltime:
+                self.reason = (
+                    f"wall time budget ({format_eta(self.max_walltime)}) exhausted"
+                )
+            elif (
+                self.stall_timeout is not None
+                and now - self.last_progress >= self.stall_timeout
+            ):
+                self.reason = (
+                    f"no progress in the last {format_eta(now - self.last_progress)}"
+                )
+            else:
+                return None
+            self._stop_time = now
+            return self._actions.pop(0)
+
+        if not self._actions:
+            return None
+        delay = STOP_GRACE_PERIOD if self._actions[0] == "terminate" else KILL_DELAY
+        if now - self._stop_time >= delay:
+            self._stop_time = now
+            return self._actions.pop(0)
+        return None
@@ -0,0 +1,465 @@
+"""Detection of source files updated since the last compilation.
+
+Source files are tracked in an index, stored in the problem directory, which
+records the content of every directory that was visited. A directory is only
+listed again if its modification time changed (i.e., if files were added,
+removed or renamed), so refreshing the index costs one stat per directory and
+one stat per source file.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterable
+from itertools import chain
+from typing import Any, Final
+
+from idefix_cli._cache import dump_json, load_json
+from idefix_cli.lib import get_git_tracked_files
+
+__all__ = [
+    "SOURCE_PATTERNS",
+    "BuildManifest",
+    "DependencyGraph",
+    "SourceIndex",
+    "filter_dependencies",
+    "get_build_configuration",
+    "get_index_dir",
+    "get_updated_files",
+    "parse_depfile",
+]
+
+# equivalent to recursive patterns ("**/*.hpp", ...)
+SOURCE_PATTERNS: Final = (
+    "*.hpp",
+    "*.cpp",
+    "*.h",
+    "*.c",
+    "CMakeLists.txt",
+    "Makefile.cmake",
+)
+_SOURCE_SUFFIXES: Final = tuple(p[1:] for p in SOURCE_PATTERNS if p.startswith("*"))
+_SOURCE_NAMES: Final = frozenset(p for p in SOURCE_PATTERNS if not p.startswith("*"))
+
+# directories that never contain relevant source files
+_SKIPPED_DIRS: Final = frozenset(("CMakeFiles",))
+
+# Directories modified very recently can't be trusted as unchanged in the future,
+# since a file could be added within the same timestamp granularity.
+# Their content is never reused.
+_RACY_DELAY_NS: Final = 2_000_000_000
+
+# files are stat'ed concurrently above this threshold, which helps to hide
+# latency on network filesystems
+_CONCURRENT_STAT_THRESHOLD: Final = 64
+
+INDEX_FORMAT_VERSION: Final = 1
+
+
+def get_index_dir(directory: str | os.PathLike[str]) -> str:
+    return os.path.join(directory, ".idfx")
+
+
+def _is_source_file(name: str) -> bool:
+    return name in _SOURCE_NAMES or name.endswith(_SOURCE_SUFFIXES)
+
+
+def _get_mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _get_mtimes_ns(paths: list[str]) -> list[int | None]:
+    if len(paths) < _CONCURRENT_STAT_THRESHOLD:
+        return [_get_mtime_ns(p) for p in paths]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        return list(executor.map(_get_mtime_ns, paths))
+
+
+class SourceIndex:
+    """An incrementally updated record of source files in one or more trees"""
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.file = os.path.join(get_index_dir(directory), "sources.json")
+        data = load_json(self.file)
+        self._trees: dict[str, Any]
+        if data.get("version") == INDEX_FORMAT_VERSION and isinstance(
+            data.get("trees"), dict
+        ):
+            self._trees = data["trees"]
+        else:
+            self._trees = {}
+        self._modified = False
+
+    def _refresh_tree(self, root: str) -> list[str]:
+        # return all source files found in root, updating the index
+        # for any directory that changed
+        old_dirs: dict[str, Any] = self._trees.get(root, {}).get("dirs", {})
+        new_dirs: dict[str, Any] = {}
+        files: list[str] = []
+        visited: set[tuple[int, int]] = set()
+        now = time.time_ns()
+
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                st = os.stat(dirpath)
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) in visited:
+                # symlink loop
+                continue
+            visited.add((st.st_dev, st.st_ino))
+
+            entry = old_dirs.get(dirpath)
+            if entry is None or entry["mtime_ns"] != st.st_mtime_ns:
+                entry = self._list_dir(dirpath)
+                if now - st.st_mtime_ns < _RACY_DELAY_NS:
+                    entry["mtime_ns"] = None
+                else:
+                    entry["mtime_ns"] = st.st_mtime_ns
+                self._modified = True
+            new_dirs[dirpath] = entry
+            files.extend(os.path.join(dirpath, name) for name in entry["files"])
+            stack.extend(os.path.join(dirpath, name) for name in entry["subdirs"])
+
+        if new_dirs.keys() != old_dirs.keys():
+            self._modified = True
+        self._trees.setdefault(root, {})["dirs"] = new_dirs
+        return files
+
+    @staticmethod
+    def _list_dir(dirpath: str) -> dict[str, Any]:
+        # hidden files and directories are ignored, as with glob
+        files: list[str] = []
+        subdirs: list[str] = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if entry.name not in _SKIPPED_DIRS:
+                            subdirs.append(entry.name)
+                    elif _is_source_file(entry.name):
+                        files.append(entry.name)
+        except OSError:
+            pass
+        return {"files": sorted(files), "subdirs": sorted(subdirs)}
+
+    def get_sources(
+        self,
+        root: str | os.PathLike[str],
+        *,
+        tracked_only: bool = False,
+    ) -> list[str]:
+        """Return all source files in root, in alphabetical order.
+
+        If tracked_only is True, only files tracked in git are included.
+        """
+        root_dir = os.path.abspath(root)
+        files = self._refresh_tree(root_dir)
+        if tracked_only:
+            tracked = get_git_tracked_files(root_dir)
+            prefix_len = len(os.path.join(root_dir, ""))
+            files = [f for f in files if f[prefix_len:].replace(os.sep, "/") in tracked]
+        return sorted(files)
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        dump_json(self.file, {"version": INDEX_FORMAT_VERSION, "trees": self._trees})
+        self._modified = False
+
+
+def get_updated_files(files: Iterable[str], *, since_ns: int) -> list[str]:
+    """Return files modified after a given time (in ns), preserving order"""
+    files = list(files)
+    return [
+        file
+        for file, mtime_ns in zip(files, _get_mtimes_ns(files), strict=True)
+        if mtime_ns is not None and mtime_ns > since_ns
+    ]
+
+
+def _get_file_key(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _hash_file(path: str) -> str | None:
+    import hashlib
+
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.file_digest(fh, "sha256").hexdigest()
+    except OSError:
+        return None
+
+
+def get_build_configuration(directory: str | os.PathLike[str]) -> str:
+    """Return a digest of build options for a problem directory.
+
+    This covers user-facing entries from CMakeCache.txt, or the Makefile
+    generated by Idefix's python configuration script, if CMake wasn't used.
+    """
+    import hashlib
+
+    from idefix_cli._cmake import read_cmake_cache
+
+    try:
+        cache = read_cmake_cache(os.path.join(directory, "CMakeCache.txt"))
+    except OSError:
+        return _hash_file(os.path.join(directory, "Makefile")) or ""
+
+    options = sorted(
+        (name, *entry)
+        for name, entry in cache.items()
+        if entry.type not in ("INTERNAL", "STATIC")
+    )
+    return hashlib.sha256(repr(options).encode()).hexdigest()
+
+
+class BuildManifest:
+    """A record of source contents and build options, as of the last build.
+
+    Sources are compared by content, so rebuilds are not triggered by changes
+    in modification times alone (e.g., after `git checkout` or `rsync`),
+    while files hashes are only computed again if their mtime or size changed.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.file = os.path.join(get_index_dir(directory), "build_manifest.json")
+        data = load_json(self.file)
+        self._data: dict[str, Any] | None
+        if data.get("version") == INDEX_FORMAT_VERSION:
+            self._data = data
+        else:
+            self._data = None
+
+    def _get_hash(self, path: str, key: list[int]) -> str | None:
+        # reuse recorded hashes for files whose mtime and size didn't change
+        if self._data is not None:
+            record = self._data["sources"].get(path)
+            if record is not None and record[:2] == key:
+                return record[2]  # type: ignore [no-any-return]
+        return _hash_file(path)
+
+    def get_changes(
+        self, exe: str | os.PathLike[str], sources: list[str], *, configuration: str
+    ) -> list[str]:
+        """Return a description of all changes since the last recorded build.
+
+        Sources that were modified without their mtime being updated
+        are touched, so that they are not skipped by make.
+        """
+        if self._data is None:
+            return ["no build record found"]
+        if _get_file_key(os.fspath(exe)) != self._data["executable"]:
+            return ["executable was modified outside of idfx"]
+
+        changes: list[str] = []
+        if configuration != self._data["configuration"]:
+            changes.append("build configuration changed")
+
+        recorded_sources: dict[str, list[Any]] = self._data["sources"]
+        exe_mtime_ns = self._data["executable"][0]
+        touched = False
+        for path in sorted(recorded_sources.keys() - set(sources)):
+            changes.append(f"removed: {path}")
+        for path in sources:
+            if (key := _get_file_key(path)) is None:
+                continue
+            if (record := recorded_sources.get(path)) is None:
+                changes.append(f"new: {path}")
+                continue
+            if record[:2] == key:
+                continue
+            if (digest := _hash_file(path)) == record[2]:
+                # same content, new mtime: no need to hash it again next time
+                record[:2] = key
+                touched = True
+                continue
+            if digest is not None and key[0] <= exe_mtime_ns:
+                os.utime(path)
+            changes.append(f"modified: {path}")
+
+        if touched and not changes:
+            dump_json(self.file, self._data)
+        return changes
+
+    def record(
+        self, exe: str | os.PathLike[str], sources: list[str], *, configuration: str
+    ) -> None:
+        if (exe_key := _get_file_key(os.fspath(exe))) is None:
+            return
+        records: dict[str, list[Any]] = {}
+        for path in sources:
+            if (key := _get_file_key(path)) is None:
+                continue
+            if (digest := self._get_hash(path, key)) is not None:
+                records[path] = [*key, digest]
+        self._data = {
+            "version": INDEX_FORMAT_VERSION,
+            "executable": exe_key,
+            "configuration": configuration,
+            "sources": records,
+        }
+        dump_json(self.file, self._data)
+
+
+def _split_make_words(text: str) -> list[str]:
+    # split a list of prerequisites, as written in a Makefile-style depfile,
+    # where spaces within paths are escaped
+    words: list[str] = []
+    current: list[str] = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and i + 1 < len(text) and text[i + 1] in " #\\":
+            current.append(text[i + 1])
+            i += 2
+            continue
+        if char == "$" and text[i + 1 : i + 2] == "$":
+            current.append("$")
+            i += 2
+            continue
+        if char.isspace():
+            if current:
+                words.append("".join(current))
+                current.clear()
+        else:
+            current.append(char)
+        i += 1
+    if current:
+        words.append("".join(current))
+    return words
+
+
+def parse_depfile(path: str, *, base_dir: str) -> set[str]:
+    """Return all prerequisites listed in a Makefile-style dependency file,
+    as absolute paths (relative ones are resolved from base_dir)
+
+    Raise OSError if the file cannot be read.
+    """
+    with open(path, encoding="utf-8", errors="surrogateescape") as fh:
+        content = fh.read()
+
+    deps: set[str] = set()
+    # join continuation lines
+    for line in content.replace("\\\r\n", " ").replace("\\\n", " ").splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        # split the rule at the first colon followed by a space or end of line,
+        # so that Windows drive letters are not mistaken for separators
+        for i, char in enumerate(line):
+            if char == ":" and line[i + 1 : i + 2] in ("", " ", "\t"):
+                break
+        else:
+            continue
+        deps.update(
+            os.path.normpath(os.path.join(base_dir, word))
+            for word in _split_make_words(line[i + 1 :])
+        )
+    return deps
+
+
+class DependencyGraph:
+    """Dependencies of Idefix's executable, as recorded by the compiler.
+
+    These are read from dependency files that CMake generates as a side effect
+    of compilation (CMakeFiles/idefix.dir/**/*.o.d, and compiler_depend.make).
+    Parsed files are cached, and only parsed again if they changed.
+    """
+
+    TARGET_DIR = os.path.join("CMakeFiles", "idefix.dir")
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = os.path.abspath(directory)
+        self.file = os.path.join(get_index_dir(directory), "depgraph.json")
+        data = load_json(self.file)
+        self._depfiles: dict[str, Any]
+        if data.get("version") == INDEX_FORMAT_VERSION and isinstance(
+            data.get("depfiles"), dict
+        ):
+            self._depfiles = data["depfiles"]
+        else:
+            self._depfiles = {}
+        self._modified = False
+
+    def _find_depfiles(self) -> list[str]:
+        depfiles: list[str] = []
+        for dirpath, _, filenames in os.walk(
+            os.path.join(self.directory, self.TARGET_DIR)
+        ):
+            depfiles.extend(
+                os.path.join(dirpath, name)
+                for name in filenames
+                if name.endswith(".o.d")
+                or name in ("compiler_depend.make", "depend.make")
+            )
+        return sorted(depfiles)
+
+    def get_dependencies(self) -> set[str] | None:
+        """Return all files the executable depends on, or None if unknown
+        (e.g., if it wasn't built with CMake, or not built yet)"""
+        depfiles: dict[str, Any] = {}
+        for depfile in self._find_depfiles():
+            if (key := _get_file_key(depfile)) is None:
+                continue
+            entry = self._depfiles.get(depfile)
+            if entry is None or entry["key"] != key:
+                try:
+                    deps = parse_depfile(depfile, base_dir=self.directory)
+                except OSError:
+                    continue
+                entry = {"key": key, "deps": sorted(deps)}
+                self._modified = True
+            depfiles[depfile] = entry
+
+        if depfiles.keys() != self._depfiles.keys():
+            self._modified = True
+        self._depfiles = depfiles
+
+        deps = set(chain.from_iterable(entry["deps"] for entry in depfiles.values()))
+        return deps or None
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        dump_json(
+            self.file, {"version": INDEX_FORMAT_VERSION, "depfiles": self._depfiles}
+        )
+        self._modified = False
+
+
+def filter_dependencies(sources: list[str], dependencies: set[str] | None) -> list[str]:
+    """Filter out source files that the executable doesn't depend on.
+
+    Build system files are always preserved, since they are not compilation
+    dependencies, but may still affect the build.
+    """
+    if dependencies is None:
+        return sources
+    return [
+        file
+        for file in sources
+        if file in dependencies
+        or os.path.basename(file) in _SOURCE_NAMES
+        # the compiler may have been passed paths with symlinks resolved
+        or os.path.realpath(file) in dependencies
+    ]
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import os
+from argparse import ArgumentParser
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from importlib.util import module_from_spec, spec_from_file_location
+from types import ModuleType
+from typing import Any, NamedTuple
+
+from idefix_cli._cache import dump_cache, load_cache
+
+__all__ = [
+    "CommandManifest",
+    "CommandMetadata",
+    "CommandRegistry",
+    "LazyCommand",
+    "LazyCommandParser",
+    "get_module_from_path",
+    "load_command",
+]
+
+
+class CommandMetadata(NamedTuple):
+    name: str
+    path: str
+    help: str
+    usage: str | None
+    accepts_unknown_args: bool
+
+
+def get_module_from_path(path: str, name: str) -> ModuleType:
+    if (spec := spec_from_file_location(name, path)) is None or spec.loader is None:
+        raise RuntimeError(f"Failed to load module from {path}")
+
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# modules are kept around so that long-lived processes (idfx serve) don't
+# need to execute them more than once, unless their source changes
+_MODULE_CACHE: dict[str, tuple[tuple[int, int], ModuleType]] = {}
+
+
+def _import_command_module(path: str, name: str) -> ModuleType:
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    if (cached := _MODULE_CACHE.get(path)) is not None and cached[0] == key:
+        return cached[1]
+    module = get_module_from_path(path, name)
+    _MODULE_CACHE[path] = (key, module)
+    return module
+
+
+def _validate_functions(
+    name: str, *, has_command: bool, has_add_arguments: bool
+) -> None:
+    if not (has_command or has_add_arguments):
+        raise RuntimeError(
+            f"command plugin {name} is missing required functions "
+            "'command' and 'add_arguments'"
+        )
+    elif not has_command:
+        raise RuntimeError(f"command plugin {name} is missing a 'command' function")
+    elif not has_add_arguments:
+        raise RuntimeError(
+            f"command plugin {name} is missing a 'add_arguments' function"
+        )
+
+
+def _validate_add_arguments_params(name: str, params: list[str]) -> None:
+    if params != ["parser"]:
+        raise RuntimeError(
+            f"command plugin {name}.add_arguments function's signature is invalid. "
+            f"Expected a single argument named 'parser', found {params}"
+        )
+
+
+def _make_metadata(
+    name: str, path: str, *, docstring: str | None, accepts_unknown_args: bool
+) -> CommandMetadata:
+    if not docstring:
+        # default is None, but we also invalidate empty strings
+        raise RuntimeError(f"command plugin {name} is missing a module docstring")
+
+    help, _, usage = docstring.strip().partition("\n")
+    return CommandMetadata(
+        name=name,
+        path=path,
+        help=help,
+        usage=usage or None,
+        accepts_unknown_args=accepts_unknown_args,
+    )
+
+
+def _metadata_from_source(path: str, name: str) -> CommandMetadata | None:
+    # Extract metadata without executing the module.
+    # Return None if the source is too dynamic to be validated statically
+    # (e.g. required functions are imported or conditionally defined), in which
+    # case the caller should fall back to importing the module.
+    import ast
+
+    with open(path, "rb") as fh:
+        tree = ast.parse(fh.read(), filename=path)
+
+    functions = {
+        node.name: node
+        for node in tree.body
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef)
+    }
+    if "command" not in functions or "add_arguments" not in functions:
+        return None
+    if (docstring := ast.get_docstring(tree, clean=False)) is None:
+        return None
+
+    args = functions["add_arguments"].args
+    params = [
+        arg.arg
+        for arg in (
+            *args.posonlyargs,
+            *args.args,
+            *([args.vararg] if args.vararg else []),
+            *args.kwonlyargs,
+            *([args.kwarg] if args.kwarg else []),
+        )
+    ]
+    _validate_add_arguments_params(name, params)
+    return _make_metadata(
+        name,
+        path,
+        docstring=docstring,
+        accepts_unknown_args=functions["command"].args.vararg is not None,
+    )
+
+
+def _metadata_from_module(module: ModuleType, path: str, name: str) -> CommandMetadata:
+    import inspect
+
+    _command = getattr(module, "command", None)
+    _add_arguments = getattr(module, "add_arguments", None)
+    _validate_functions(
+        name,
+        has_command=_command is not None,
+        has_add_arguments=_add_arguments is not None,
+    )
+
+    sig = inspect.signature(_add_arguments)  # type: ignore [arg-type]
+    _validate_add_arguments_params(name, list(sig.parameters.keys()))
+
+    sig = inspect.signature(_command)  # type: ignore [arg-type]
+    accepts_unknown_args = any(
+        param.kind is param.VAR_POSITIONAL for param in sig.parameters.values()
+    )
+    return _make_metadata(
+        name, path, docstring=module.__doc__, accepts_unknown_args=accepts_unknown_args
+    )
+
+
+class LazyCommand:
+    """A command whose module is only imported on first access"""
+
+    def __init__(
+        self, metadata: CommandMetadata, *, module: ModuleType | None = None
+    ) -> None:
+        self.metadata = metadata
+        self._module = module
+
+    @property
+    def module(self) -> ModuleType:
+        if self._module is None:
+            self._module = _import_command_module(
+                self.metadata.path, self.metadata.name
+            )
+        return self._module
+
+    @property
+    def function(self) -> Callable[..., Any]:
+        return self.module.command  # type: ignore [no-any-return]
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        self.module.add_arguments(parser)
+
+
+def load_command(path: str) -> LazyCommand:
+    """Validate a command module and return it in a lazy wrapper.
+
+    The module is only executed if its metadata cannot be determined
+    from its source code alone.
+    """
+    name, _ = os.path.splitext(os.path.basename(path))
+    if (metadata := _metadata_from_source(path, name)) is not None:
+        return LazyCommand(metadata)
+
+    module = _import_command_module(path, name)
+    return LazyCommand(_metadata_from_module(module, path, name), module=module)
+
+
+class CommandManifest:
+    """A persistent record of validated command metadata.
+
+    Entries are keyed on the path, modification time and size of each
+    command file, so a command is only validated again if its source changes,
+    or if idefix_cli itself is updated.
+    """
+
+    CACHE_NAME = "commands"
+
+    def __init__(self) -> None:
+        # Identify the installed version of idefix_cli from this very file
+        # rather than with importlib.metadata, which is much slower to import.
+        # Any (re)installation of the package invalidates the manifest.
+        st = os.stat(__file__)
+        self.fingerprint = [__file__, st.st_mtime_ns, st.st_size]
+        data = load_cache(self.CACHE_NAME)
+        self._entries: dict[str, dict[str, Any]]
+        if data.get("fingerprint") == self.fingerprint and isinstance(
+            data.get("entries"), dict
+        ):
+            self._entries = data["entries"]
+        else:
+            self._entries = {}
+        self._modified = False
+
+    def load_command(self, path: str) -> LazyCommand:
+        st = os.stat(path)
+        key = [st.st_mtime_ns, st.st_size]
+        if (entry := self._entries.get(path)) is not None and entry["key"] == key:
+            try:
+                return LazyCommand(CommandMetadata(**entry["metadata"]))
+            except TypeError:
+                # invalid entry, overwrite it
+                pass
+
+        command = load_command(path)
+        self._entries[path] = {"key": key, "metadata": command.metadata._asdict()}
+        self._modified = True
+        return command
+
+    def save(self) -> None:
+        if not self._modified:
+            return
+        entries = {
+            path: entry for path, entry in self._entries.items() if os.path.isfile(path)
+        }
+        dump_cache(
+            self.CACHE_NAME, {"fingerprint": self.fingerprint, "entries": entries}
+        )
+        self._modified = False
+
+
+class LazyCommandParser(ArgumentParser):
+    # A sub parser which only defines its arguments (and therefore imports
+    # the corresponding module) when it is actually selected.
+    def __init__(self, *args: Any, command: LazyCommand | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._lazy_command = command
+
+    def parse_known_args(  # type: ignore [override]
+        self, args: Sequence[str] | None = None, namespace: Any = None
+    ) -> tuple[Any, list[str]]:
+        if (command := self._lazy_command) is not None:
+            self._lazy_command = None
+            command.add_arguments(self)
+        return super().parse_known_args(args, namespace)
+
+
+class CommandRegistry(Mapping[str, tuple[Callable[..., Any], bool]]):
+    def __init__(self) -> None:
+        self._registry: dict[str, LazyCommand] = {}
+
+    def register(self, command: LazyCommand) -> None:
+        self._registry[command.metadata.name] = command
+
+    def get_command(self, name: str) -> LazyCommand:
+        return self._registry[name]
+
+    def __getitem__(self, name: str) -> tuple[Callable[..., Any], bool]:
+        command = self._registry[name]
+        return command.function, command.metadata.accepts_unknown_args
+
+    def __contains__(self, name: object) -> bool:
+        # avoid the default implementation, which would import the module
+        return name in self._registry
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._registry)
+
+    def __len__(self) -> int:
+        return len(self._registry)
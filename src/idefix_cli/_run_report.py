@@ -0,0 +1,107 @@
+"""Resource usage of Idefix runs, written as JSON reports.
+
+Resource usage is collected with os.wait4, so it covers the spawned process
+and the descendants it waited for (e.g., MPI ranks launched by mpirun on the
+local host). It's not available on Windows.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from idefix_cli._progress import ProgressMonitor
+
+__all__ = [
+    "RUN_REPORT_FILE",
+    "ResourceUsage",
+    "dump_run_report",
+    "make_run_report",
+    "poll_process",
+]
+
+RUN_REPORT_FILE = "idfx_run.json"
+_RUN_REPORT_VERSION = 1
+
+
+class ResourceUsage(NamedTuple):
+    # CPU times, in s
+    user_time: float
+    system_time: float
+    # peak resident set size of the largest process, in bytes
+    max_rss: int
+    voluntary_context_switches: int
+    involuntary_context_switches: int
+
+
+def poll_process(
+    prog: subprocess.Popen[bytes], *, block: bool = False
+) -> ResourceUsage | None:
+    """Check if a process exited, or wait for it (block=True), setting its returncode.
+
+    Unlike Popen.poll and Popen.wait, the process' resource usage is returned
+    once it has exited (if available).
+    """
+    if prog.returncode is not None:
+        return None
+    if not hasattr(os, "wait4"):
+        # Windows
+        prog.wait() if block else prog.poll()
+        return None
+
+    pid, status, rusage = os.wait4(prog.pid, 0 if block else os.WNOHANG)
+    if pid == 0:
+        return None
+    prog.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kiB on Linux, but in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    return ResourceUsage(
+        user_time=rusage.ru_utime,
+        system_time=rusage.ru_stime,
+        max_rss=rusage.ru_maxrss * rss_unit,
+        voluntary_context_switches=rusage.ru_nvcsw,
+        involuntary_context_switches=rusage.ru_nivcsw,
+    )
+
+
+def make_run_report(
+    cmd: list[str],
+    *,
+    start: datetime,
+    wall_time: float,
+    returncode: int,
+    usage: ResourceUsage | None,
+    progress: ProgressMonitor,
+) -> dict[str, Any]:
+    """Collect a run's metadata, resource usage and performance in a JSON-serializable
+    dict. Unavailable data is set to None."""
+    report: dict[str, Any] = {
+        "version": _RUN_REPORT_VERSION,
+        "command": cmd,
+        "start": start.isoformat(timespec="seconds"),
+        "wall_time": wall_time,
+        "returncode": returncode,
+    }
+    report.update(
+        dict.fromkeys(ResourceUsage._fields) if usage is None else usage._asdict()
+    )
+    last = progress.records[-1] if progress.records else None
+    report.update(
+        {
+            "cycles": None if last is None else last.cycle,
+            "time": None if last is None else last.time,
+            "cell_updates_per_second": progress.mean_cell_updates,
+            "mpi_overhead": progress.mean_mpi_overhead,
+        }
+    )
+    return report
+
+
+def dump_run_report(path: str | os.PathLike[str], report: dict[str, Any]) -> None:
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+        fh.write("\n")
@@ -0,0 +1,146 @@
+"""Parameter sweeps: variants of an inifile, generated from a sweep specification.
+
+A specification maps parameters, named as 'section.key', to values, and selects
+how variants are generated (mode):
+- "product" (default): the cartesian product of lists of values
+- "list": an explicit list of variants
+- "lhs": a Latin hypercube sampling of intervals, with a given number of samples
+
+Specifications are read from JSON or TOML files, e.g.
+
+  mode = "lhs"
+  samples = 16
+  seed = 42
+
+  [parameters]
+  "Hydro.csiso" = [0.1, 1.0]
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+from copy import deepcopy
+from itertools import product
+from typing import Any
+
+__all__ = [
+    "MODES",
+    "apply_variant",
+    "get_variants",
+    "latin_hypercube",
+    "load_sweep_spec",
+]
+
+MODES = ("product", "list", "lhs")
+
+Variant = dict[str, Any]
+
+
+def load_sweep_spec(path: str | os.PathLike[str]) -> dict[str, Any]:
+    """Read a sweep specification from a JSON or TOML file (depending on its suffix)"""
+    if os.fspath(path).endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as fh:
+            try:
+                data = tomllib.load(fh)
+            except tomllib.TOMLDecodeError as exc:
+                raise ValueError(f"invalid TOML ({exc})") from None
+    else:
+        with open(path) as fh:
+            try:
+                data = json.load(fh)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"invalid JSON ({exc})") from None
+    if not isinstance(data, dict):
+        raise ValueError("expected a mapping at the top level")
+    return data
+
+
+def _split_name(name: str) -> tuple[str, str]:
+    section, sep, key = name.partition(".")
+    if not (sep and section and key):
+        raise ValueError(f"expected parameters named as 'section.key', got {name!r}")
+    return section, key
+
+
+def latin_hypercube(
+    bounds: dict[str, tuple[float, float]], samples: int, *, rng: random.Random
+) -> list[Variant]:
+    """Sample intervals so that each of their samples equal subintervals
+    is sampled exactly once, with subintervals randomly paired between parameters.
+
+    Examples:
+        >>> variants = latin_hypercube({"a.b": (0, 1)}, 4, rng=random.Random(0))
+        >>> sorted(int(v["a.b"] * 4) for v in variants)
+        [0, 1, 2, 3]
+    """
+    columns: dict[str, list[float]] = {}
+    for name, (low, high) in bounds.items():
+        width = (high - low) / samples
+        strata = [low + (i + rng.random()) * width for i in range(samples)]
+        rng.shuffle(strata)
+        columns[name] = strata
+    return [{name: columns[name][i] for name in columns} for i in range(samples)]
+
+
+def get_variants(spec: dict[str, Any]) -> list[Variant]:
+    """Generate variants, as mappings of 'section.key' names to values,
+    from a sweep specification."""
+    mode = spec.get("mode", "product")
+    if mode not in MODES:
+        raise ValueError(f"unknown mode {mode!r} (expected one of {MODES})")
+
+    variants: list[Variant]
+    if mode == "list":
+        explicit_variants = spec.get("variants")
+        if not isinstance(explicit_variants, list) or not all(
+            isinstance(v, dict) for v in explicit_variants
+        ):
+            raise ValueError("'list' mode requires 'variants', a list of mappings")
+        variants = explicit_variants
+    else:
+        if not isinstance(parameters := spec.get("parameters"), dict):
+            raise ValueError(f"{mode!r} mode requires 'parameters', a mapping")
+        if not all(isinstance(v, list) and v for v in parameters.values()):
+            raise ValueError("parameters must be mapped to non-empty lists")
+
+        if mode == "product":
+            variants = [
+                dict(zip(parameters, values, strict=True))
+                for values in product(*parameters.values())
+            ]
+        else:
+            samples = spec.get("samples")
+            if not isinstance(samples, int) or samples < 1:
+                raise ValueError("'lhs' mode requires 'samples', a positive integer")
+            bounds: dict[str, tuple[float, float]] = {}
+            for name, interval in parameters.items():
+                if len(interval) != 2 or not all(
+                    isinstance(x, int | float) for x in interval
+                ):
+                    raise ValueError(
+                        f"expected an interval [low, high] for {name!r}, got {interval}"
+                    )
+                bounds[name] = (interval[0], interval[1])
+            rng = random.Random(spec.get("seed"))
+            variants = latin_hypercube(bounds, samples, rng=rng)
+
+    for variant in variants:
+        for name in variant:
+            _split_name(name)
+    return variants
+
+
+def apply_variant(conf: dict[str, Any], variant: Variant) -> dict[str, Any]:
+    """Return a copy of an inifile's content, with a variant's values.
+    Parameters are required to be defined in the original inifile, to catch typos."""
+    conf = deepcopy(conf)
+    for name, value in variant.items():
+        section, key = _split_name(name)
+        if key not in conf.get(section, {}):
+            raise ValueError(f"{name!r} isn't defined in the base inifile")
+        conf[section][key] = value
+    return conf
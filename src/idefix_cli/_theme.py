@@ -2,8 +2,7 @@ import sys
 import unicodedata
 from collections.abc import Generator
 from contextlib import contextmanager
-from dataclasses import dataclass
-from typing import Literal, TypedDict
+from typing import Literal, NamedTuple, TypedDict
 
 __all__ = ["get_symbol", "theme_ctx"]
 
@@ -16,8 +15,7 @@ class SymbolSet(TypedDict):
     HINT: str
 
 
-@dataclass(frozen=True, slots=True, kw_only=True)
-class Theme:
+class Theme(NamedTuple):
     name: str
     symbols: SymbolSet
     enter_msg: str | None
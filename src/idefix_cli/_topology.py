@@ -0,0 +1,220 @@
+"""Detection of computing resources available to the current process.
+
+On Linux, this accounts for CPU affinity, SMT (hardware threads sharing a
+physical core), NUMA nodes, and cgroup limits (e.g. in containers), as
+reported in /proc and /sys. Elsewhere, only the number of logical CPUs is known.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from functools import cache
+from math import ceil
+
+__all__ = [
+    "CPUTopology",
+    "get_available_memory",
+    "get_cpu_quota",
+    "get_cpu_topology",
+]
+
+SYS_CPU_DIR = "/sys/devices/system/cpu"
+SYS_NODE_DIR = "/sys/devices/system/node"
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class CPUTopology:
+    # hardware threads this process may run on
+    logical_cpus: int
+    # distinct physical cores these threads belong to
+    physical_cores: int
+    # NUMA nodes these cores belong to
+    numa_nodes: int
+    # number of CPUs worth of time allowed by the cgroup quota, if any
+    quota: float | None
+
+    @property
+    def effective_cpus(self) -> int:
+        if self.quota is None:
+            return self.logical_cpus
+        return max(1, min(self.logical_cpus, ceil(self.quota)))
+
+    @property
+    def effective_cores(self) -> int:
+        if self.quota is None:
+            return self.physical_cores
+        return max(1, min(self.physical_cores, ceil(self.quota)))
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _parse_cpu_list(cpu_list: str) -> set[int]:
+    # e.g. "0-3,8,10-11"
+    cpus: set[int] = set()
+    for item in cpu_list.split(","):
+        if not (item := item.strip()):
+            continue
+        start, _, stop = item.partition("-")
+        cpus.update(range(int(start), int(stop or start) + 1))
+    return cpus
+
+
+def _get_affinity() -> set[int] | None:
+    if hasattr(os, "sched_getaffinity"):
+        # this function isn't available on all platforms
+        return set(os.sched_getaffinity(0))
+    return None
+
+
+def _get_logical_cpu_count() -> int:
+    base_cpu_count: int | None
+    if sys.version_info >= (3, 13):
+        base_cpu_count = os.process_cpu_count()
+    elif (affinity := _get_affinity()) is not None:
+        base_cpu_count = len(affinity)
+    else:
+        # this proxy is good enough in most situations
+        base_cpu_count = os.cpu_count()
+    return base_cpu_count or 1
+
+
+def _get_physical_cores(cpus: set[int]) -> int | None:
+    cores: set[tuple[str, str]] = set()
+    for cpu in cpus:
+        topology_dir = os.path.join(SYS_CPU_DIR, f"cpu{cpu}", "topology")
+        package_id = _read_text(os.path.join(topology_dir, "physical_package_id"))
+        core_id = _read_text(os.path.join(topology_dir, "core_id"))
+        if package_id is None or core_id is None:
+            return None
+        cores.add((package_id, core_id))
+    return len(cores) or None
+
+
+def _get_numa_nodes(cpus: set[int]) -> int | None:
+    try:
+        names = os.listdir(SYS_NODE_DIR)
+    except OSError:
+        return None
+    nnodes = 0
+    for name in names:
+        if not (name.startswith("node") and name[4:].isdigit()):
+            continue
+        cpu_list = _read_text(os.path.join(SYS_NODE_DIR, name, "cpulist"))
+        if cpu_list and not cpus.isdisjoint(_parse_cpu_list(cpu_list)):
+            nnodes += 1
+    return nnodes or None
+
+
+def _get_cgroup_dirs(controller: str | None = None) -> list[str]:
+    # cgroup directories for this process, from the innermost to the root.
+    # Limits apply hierarchically, so all of them are relevant.
+    # By default, directories are looked up in the (unified) cgroup v2 hierarchy.
+    # With cgroup v1, each controller (e.g. "cpu") has its own hierarchy, mounted
+    # as a directory named after the controllers it's shared with (e.g. "cpu,cpuacct")
+    if (content := _read_text("/proc/self/cgroup")) is None:
+        return []
+    for line in content.splitlines():
+        # e.g. "0::/user.slice" (v2) or "4:cpu,cpuacct:/user.slice" (v1)
+        hierarchy_id, _, rest = line.partition(":")
+        controllers, _, path = rest.partition(":")
+        if controller is None:
+            if hierarchy_id == "0" and not controllers:
+                mount_dir = CGROUP_ROOT
+                break
+        elif controller in controllers.split(","):
+            mount_dir = os.path.join(CGROUP_ROOT, controllers)
+            break
+    else:
+        return []
+    path = path.strip("/")
+    dirs: list[str] = []
+    while True:
+        dirs.append(os.path.join(mount_dir, path))
+        if not path:
+            return dirs
+        path = os.path.dirname(path)
+
+
+def get_cpu_quota() -> float | None:
+    """Return the number of CPUs worth of time this process is allowed to use
+    as per its cgroup's quota (e.g., in a container), or None if unlimited."""
+    quotas: list[float] = []
+    for cgroup_dir in _get_cgroup_dirs():
+        if (cpu_max := _read_text(os.path.join(cgroup_dir, "cpu.max"))) is None:
+            continue
+        quota, _, period = cpu_max.partition(" ")
+        if quota == "max":
+            continue
+        try:
+            quotas.append(int(quota) / int(period or 100_000))
+        except (ValueError, ZeroDivisionError):
+            continue
+
+    # cgroup v1
+    for cgroup_dir in _get_cgroup_dirs("cpu"):
+        v1_quota = _read_text(os.path.join(cgroup_dir, "cpu.cfs_quota_us"))
+        v1_period = _read_text(os.path.join(cgroup_dir, "cpu.cfs_period_us"))
+        if v1_quota is None or v1_period is None:
+            continue
+        try:
+            if (quota_us := int(v1_quota)) > 0:
+                quotas.append(quota_us / int(v1_period))
+        except (ValueError, ZeroDivisionError):
+            continue
+
+    return min(quotas, default=None)
+
+
+def get_available_memory() -> int | None:
+    """Return available memory in bytes, or None if unknown.
+
+    This is the lowest value between the system's MemAvailable and the
+    headroom left below cgroup limits.
+    """
+    candidates: list[int] = []
+    if (meminfo := _read_text("/proc/meminfo")) is not None:
+        for line in meminfo.splitlines():
+            if line.startswith("MemAvailable:"):
+                try:
+                    candidates.append(int(line.split()[1]) * 1024)
+                except (ValueError, IndexError):
+                    pass
+                break
+
+    for cgroup_dir in _get_cgroup_dirs():
+        memory_max = _read_text(os.path.join(cgroup_dir, "memory.max"))
+        memory_current = _read_text(os.path.join(cgroup_dir, "memory.current"))
+        if memory_max in (None, "max") or memory_current is None:
+            continue
+        try:
+            candidates.append(max(0, int(memory_max) - int(memory_current)))
+        except ValueError:
+            continue
+
+    return min(candidates, default=None)
+
+
+@cache
+def get_cpu_topology() -> CPUTopology:
+    logical_cpus = _get_logical_cpu_count()
+    physical_cores: int | None = None
+    numa_nodes: int | None = None
+    if (affinity := _get_affinity()) is not None:
+        physical_cores = _get_physical_cores(affinity)
+        numa_nodes = _get_numa_nodes(affinity)
+
+    return CPUTopology(
+        logical_cpus=logical_cpus,
+        physical_cores=min(physical_cores or logical_cpus, logical_cpus),
+        numa_nodes=numa_nodes or 1,
+        quota=get_cpu_quota(),
+    )
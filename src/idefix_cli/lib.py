@@ -5,7 +5,7 @@ import platform
 import re
 import sys
 import warnings
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from configparser import ConfigParser
 from contextlib import chdir
 from enum import StrEnum
@@ -13,12 +13,15 @@ from functools import wraps
 from glob import glob
 from itertools import chain
 from pathlib import Path
+from stat import S_ISREG
 from textwrap import indent
-from typing import Any, TypeVar, cast
+from time import monotonic, sleep
+from typing import Any, BinaryIO, NamedTuple, TypeVar, cast
 
-from packaging.version import Version
+from packaging.version import InvalidVersion, Version
 from termcolor import cprint
 
+from idefix_cli._cache import dump_cache, load_cache
 from idefix_cli._theme import get_symbol
 
 # workaround mypy not being confortable around decorator preserving signatures
@@ -40,10 +43,15 @@ __all__ = [
     "print_subcommand",
     "files_from_patterns",
     "get_idefix_version",
+    "get_idefix_info",
+    "IdefixInfo",
+    "get_git_tracked_files",
     "get_config_file",
     "get_configuration",
+    "clear_configuration_cache",
     "get_option",
     "make_file_tree",
+    "LogFollower",
 ]
 
 
@@ -65,22 +73,26 @@ _Tree: type[_WindowsTree | _PosixTree]
 
 if platform.system().lower().startswith("win"):
     # Windows
-    env_var = "APPDATA"
-    default_usr_dir = "AppData"
+    _CONFIG_HOME_ENV_VAR = "APPDATA"
+    _DEFAULT_CONFIG_HOME = "AppData"
     _Tree = _WindowsTree
 
 else:
     # POSIX
-    env_var = "XDG_CONFIG_HOME"
-    default_usr_dir = ".config"
+    _CONFIG_HOME_ENV_VAR = "XDG_CONFIG_HOME"
+    _DEFAULT_CONFIG_HOME = ".config"
     _Tree = _PosixTree
 
 
-XDG_CONFIG_HOME = os.environ.get(
-    env_var,
-    os.path.join(os.path.expanduser("~"), default_usr_dir),
-)
-del env_var, default_usr_dir
+def _get_config_home() -> str:
+    # read from the environment, as it is when called
+    return os.environ.get(
+        _CONFIG_HOME_ENV_VAR,
+        os.path.join(os.path.expanduser("~"), _DEFAULT_CONFIG_HOME),
+    )
+
+
+XDG_CONFIG_HOME = _get_config_home()
 
 
 class requires_idefix:
@@ -275,27 +287,87 @@ def files_from_patterns(
         >>> files_from_patterns(Path.home() / "myproject", "*.py", "*.txt") # doctest: +SKIP
         ["data.txt", "script1.py", "script2.py"]
     """
+    from idefix_cli._glob import PatternMatcher
+
+    if excludes is None:
+        excludes = []
+    if PatternMatcher.supports(chain(patterns, excludes), recursive=recursive):
+        # walk the directory tree only once, however many patterns are requested
+        return PatternMatcher(patterns, excludes=excludes, recursive=recursive).match(
+            source
+        )
+
+    # absolute paths and relative references ("..") are only supported with glob
     include_globs = set(
         chain.from_iterable(
             glob(os.path.join(source, p), recursive=recursive) for p in patterns
         )
     )
-    if excludes is None:
-        exclude_globs = set()
-    else:
-        exclude_globs = set(
-            chain.from_iterable(
-                glob(os.path.join(source, p), recursive=recursive) for p in excludes
-            )
+    exclude_globs = set(
+        chain.from_iterable(
+            glob(os.path.join(source, p), recursive=recursive) for p in excludes
         )
-    retv = set()
-    for fp in include_globs - exclude_globs:
-        if os.path.isdir(fp):
-            # it is important to append os.path.sep to directory names so
-            # it's clear that they are not files when listed with idfx clean --dry
-            fp += os.path.sep
-        retv.add(os.path.abspath(fp))
-    return sorted(retv)
+    )
+    return sorted({os.path.abspath(fp) for fp in include_globs - exclude_globs})
+
+
+# in-process memo for get_idefix_version, as {changelog: (mtime_ns, size, version)}
+_IDEFIX_VERSION_MEMO: dict[str, tuple[int, int, Version]] = {}
+
+
+def _read_idefix_version(changelog: str) -> Version:
+    with open(changelog) as fh:
+        for line in fh:
+            if not VERSECT_REGEXP.match(line):
+                continue
+            # stop reading at the first (most recent) release
+            match = VERSION_REGEXP.search(line)
+            assert match is not None
+            return Version(match.group())
+
+    raise RuntimeError(
+        "Something went wrong while trying to determine Idefix's version."
+    )
+
+
+def _get_idefix_version(idefix_dir: str) -> Version:
+    # We rely on parsing the CHANGELOG file to determine the most recent release at
+    # any given point. This is more reliable than checking for the closest ancestor
+    # in git tags because the development branch usually doesn't decend from releases.
+    # Another reason why this seems reasonable is that tarball releases are supposed
+    # to ship a CHANGELOG file as well.
+    changelog = os.path.abspath(os.path.join(idefix_dir, "CHANGELOG.md"))
+    try:
+        st = os.stat(changelog)
+    except OSError:
+        st = None
+    if st is None or not S_ISREG(st.st_mode):
+        # this is inevitable if the user is checked in a version that predates
+        # the introduction of a changelog (Idefix v0.7.0)
+        return Version("0")
+
+    key = (st.st_mtime_ns, st.st_size)
+    if (memo := _IDEFIX_VERSION_MEMO.get(changelog)) is not None and memo[:2] == key:
+        return memo[2]
+
+    # the result is also cached on disk, so it persists across invocations
+    cache = load_cache("idefix_versions")
+    entry = cache.get(changelog)
+    if isinstance(entry, list) and entry[:2] == list(key):
+        try:
+            version = Version(entry[2])
+        except (IndexError, TypeError, InvalidVersion):
+            entry = None
+    else:
+        entry = None
+
+    if entry is None:
+        version = _read_idefix_version(changelog)
+        cache[changelog] = [*key, str(version)]
+        dump_cache("idefix_versions", cache)
+
+    _IDEFIX_VERSION_MEMO[changelog] = (*key, version)
+    return version
 
 
 @requires_idefix()
@@ -312,30 +384,405 @@ def get_idefix_version() -> Version:
         >>> if (version := get_idefix_version()) < Version("1.1"): # doctest: +SKIP
         ...     print_error(f"Idefix v{version} is too old (v1.1 or newer is required)")
     """
-    # We rely on parsing the CHANGELOG file to determine the most recent release at
-    # any given point. This is more reliable than checking for the closest ancestor
-    # in git tags because the development branch usually doesn't decend from releases.
-    # Another reason why this seems reasonable is that tarball releases are supposed
-    # to ship a CHANGELOG file as well.
-    changelog = os.path.join(os.environ["IDEFIX_DIR"], "CHANGELOG.md")
-    if not os.path.isfile(changelog):
-        # this is inevitable if the user is checked in a version that predates
-        # the introduction of a changelog (Idefix v0.7.0)
-        return Version("0")
+    return _get_idefix_version(os.environ["IDEFIX_DIR"])
 
-    with open(changelog) as fh:
-        for line in fh:
-            if not re.match(VERSECT_REGEXP, line):
-                continue
-            match = re.search(VERSION_REGEXP, line)
-            assert match is not None
-            return Version(match.group())
 
-    raise RuntimeError(
-        "Something went wrong while trying to determine Idefix's version."
+def _find_git_dir(directory: str) -> str | None:
+    git_dir = os.path.join(directory, ".git")
+    if os.path.isfile(git_dir):
+        # worktrees and submodules use a file pointing to the actual directory
+        with open(git_dir) as fh:
+            content = fh.read().strip()
+        if not content.startswith("gitdir:"):
+            return None
+        git_dir = os.path.join(directory, content.removeprefix("gitdir:").strip())
+    if not os.path.isdir(git_dir):
+        return None
+    return os.path.abspath(git_dir)
+
+
+def _get_git_common_dir(git_dir: str) -> str:
+    # worktrees share refs with the main repository
+    try:
+        with open(os.path.join(git_dir, "commondir")) as fh:
+            return os.path.abspath(os.path.join(git_dir, fh.read().strip()))
+    except OSError:
+        return git_dir
+
+
+def _resolve_git_ref(git_dir: str, ref: str) -> str | None:
+    for base_dir in (git_dir, _get_git_common_dir(git_dir)):
+        try:
+            with open(os.path.join(base_dir, ref)) as fh:
+                return fh.read().strip()
+        except OSError:
+            continue
+
+    try:
+        with open(os.path.join(_get_git_common_dir(git_dir), "packed-refs")) as fh:
+            for line in fh:
+                sha, _, name = line.strip().partition(" ")
+                if name == ref:
+                    return sha
+    except OSError:
+        pass
+    return None
+
+
+def _read_git_head(directory: str) -> tuple[str | None, str | None]:
+    # Resolve a repository's HEAD without spawning git. Return the commit hash
+    # and the name of the current branch (None if HEAD is detached)
+    if (git_dir := _find_git_dir(directory)) is None:
+        return None, None
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as fh:
+            head = fh.read().strip()
+    except OSError:
+        return None, None
+
+    if not head.startswith("ref:"):
+        return head, None
+
+    ref = head.removeprefix("ref:").strip()
+    return _resolve_git_ref(git_dir, ref), ref.removeprefix("refs/heads/")
+
+
+def _find_git_worktree(directory: str) -> tuple[str, str] | None:
+    # return the root of the working tree containing directory, and its git directory
+    directory = os.path.abspath(directory)
+    while True:
+        if (git_dir := _find_git_dir(directory)) is not None:
+            return directory, git_dir
+        if (parent := os.path.dirname(directory)) == directory:
+            return None
+        directory = parent
+
+
+def _read_git_varint(data: bytes, pos: int) -> tuple[int, int]:
+    # variable length integers, as encoded in index v4 (see git's varint.c)
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+def _get_git_hash_size(git_dir: str) -> int:
+    # object names are sha1 hashes (20 bytes), unless configured otherwise
+    try:
+        with open(os.path.join(_get_git_common_dir(git_dir), "config")) as fh:
+            config = fh.read()
+    except OSError:
+        return 20
+    if re.search(r"objectformat\s*=\s*sha256", config, flags=re.IGNORECASE):
+        return 32
+    return 20
+
+
+def _read_git_index(index_file: str, *, hash_size: int) -> list[str] | None:
+    # Return paths to all entries in a git index file (versions 2 to 4),
+    # or None if the format is not supported. See
+    # https://git-scm.com/docs/index-format
+    import struct
+
+    try:
+        with open(index_file, "rb") as fh:
+            data = fh.read()
+    except OSError:
+        return None
+
+    if len(data) < 12 + hash_size or data[:4] != b"DIRC":
+        return None
+    version, nentries = struct.unpack_from(">II", data, 4)
+    if version not in (2, 3, 4):
+        return None
+
+    paths: list[str] = []
+    previous = b""
+    pos = 12
+    try:
+        for _ in range(nentries):
+            start = pos
+            mode = struct.unpack_from(">I", data, pos + 24)[0]
+            if mode >> 12 == 0o04:
+                # sparse directory entry: needs to be expanded by git itself
+                return None
+            flags = struct.unpack_from(">H", data, pos + 40 + hash_size)[0]
+            pos += 42 + hash_size
+            if flags & 0x4000 and version >= 3:
+                # extended flags
+                pos += 2
+
+            if version == 4:
+                strip, pos = _read_git_varint(data, pos)
+                end = data.index(b"\0", pos)
+                name = previous[: len(previous) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                end = data.index(b"\0", pos)
+                name = data[pos:end]
+                # entries are padded with 1 to 8 null bytes
+                pos = start + ((end - start) // 8 + 1) * 8
+            previous = name
+            paths.append(name.decode("utf-8", errors="surrogateescape"))
+
+        # a split index only contains part of its entries
+        while pos + 8 <= len(data) - hash_size:
+            signature = data[pos : pos + 4]
+            if signature == b"link":
+                return None
+            (size,) = struct.unpack_from(">I", data, pos + 4)
+            pos += 8 + size
+    except (struct.error, ValueError, IndexError):
+        return None
+    return paths
+
+
+# in-process memo for git indices, as {index_file: (mtime_ns, size, paths)}
+_GIT_INDEX_MEMO: dict[str, tuple[int, int, tuple[str, ...]]] = {}
+
+
+def _get_git_index_entries(git_dir: str) -> tuple[str, ...] | None:
+    index_file = os.path.join(git_dir, "index")
+    try:
+        st = os.stat(index_file)
+    except OSError:
+        # new repository, nothing was ever staged
+        return ()
+
+    key = (st.st_mtime_ns, st.st_size)
+    if (memo := _GIT_INDEX_MEMO.get(index_file)) is not None and memo[:2] == key:
+        return memo[2]
+    entries = _read_git_index(index_file, hash_size=_get_git_hash_size(git_dir))
+    if entries is None:
+        return None
+    _GIT_INDEX_MEMO[index_file] = (*key, paths := tuple(entries))
+    return paths
+
+
+def _git_ls_files(directory: str) -> set[str]:
+    import subprocess
+
+    try:
+        res = subprocess.run(
+            ["git", "ls-files", "-z"], capture_output=True, cwd=directory
+        )
+    except OSError:
+        # git isn't installed
+        return set()
+    return {_ for _ in res.stdout.decode(errors="surrogateescape").split("\0") if _}
+
+
+def get_git_tracked_files(directory: os.PathLike[str] | str) -> set[str]:
+    """
+    Collect files tracked in the git repository containing a directory,
+    within that directory.
+    This is equivalent to running `git ls-files` from the directory, but the git
+    index is read directly whenever possible, which avoids spawning a process.
+
+    Args:
+        directory (os.PathLike[str] | str): the directory to inspect
+
+    Returns:
+        files (set[str]): paths relative to the directory, using "/" as a separator
+            (as printed by `git ls-files`). This set is empty if the directory isn't
+            part of a git repository.
+
+    Examples:
+        >>> "CHANGELOG.md" in get_git_tracked_files(os.environ["IDEFIX_DIR"]) # doctest: +SKIP
+        True
+    """
+    directory = os.path.abspath(directory)
+    if "GIT_DIR" in os.environ or "GIT_INDEX_FILE" in os.environ:
+        # custom layouts are left to git itself
+        return _git_ls_files(directory)
+    if (worktree := _find_git_worktree(directory)) is None:
+        return set()
+
+    root, git_dir = worktree
+    if (entries := _get_git_index_entries(git_dir)) is None:
+        return _git_ls_files(directory)
+
+    prefix = os.path.relpath(directory, root).replace(os.sep, "/")
+    if prefix == ".":
+        return set(entries)
+    prefix += "/"
+    return {e.removeprefix(prefix) for e in entries if e.startswith(prefix)}
+
+
+class IdefixInfo(NamedTuple):
+    """Summary information on the active Idefix installation ($IDEFIX_DIR)
+
+    Attributes:
+        directory (str): absolute path to Idefix's source directory
+        version (packaging.version.Version): see get_idefix_version
+        git_head (str | None): the commit hash checked out in $IDEFIX_DIR,
+            or None if Idefix isn't installed as a git repository
+        git_branch (str | None): the current git branch (None if in detached HEAD state)
+    """
+
+    directory: str
+    version: Version
+    git_head: str | None
+    git_branch: str | None
+
+
+@requires_idefix()
+def get_idefix_info() -> IdefixInfo:
+    """
+    Collect information on the active Idefix installation.
+    Git metadata is read directly from the repository, without invoking git.
+
+    Returns:
+        info (IdefixInfo): version and git metadata
+
+    Examples:
+        >>> info = get_idefix_info() # doctest: +SKIP
+        >>> print(f"Idefix v{info.version} ({info.git_branch} @ {info.git_head})") # doctest: +SKIP
+        Idefix v2.2.0 (develop @ 6f8d2ba2e4f3a5c8e1a9a2b4c3d1e0f9a8b7c6d5)
+    """
+    idefix_dir = os.path.abspath(os.environ["IDEFIX_DIR"])
+    git_head, git_branch = _read_git_head(idefix_dir)
+    return IdefixInfo(
+        directory=idefix_dir,
+        version=_get_idefix_version(idefix_dir),
+        git_head=git_head,
+        git_branch=git_branch,
     )
 
 
+class LogFollower:
+    """Follow a log file (e.g., idefix.0.log) while it's being written.
+
+    Only newly appended content is read, from the last known offset, and
+    complete lines are returned. The file doesn't need to exist yet, and it is
+    read again from the start if it's truncated or replaced.
+
+    On Linux, waiting wakes up as soon as the file is modified (using inotify).
+    Elsewhere, or if no notification is received (e.g., on network file systems),
+    the file is polled with an exponential backoff, from min_interval to max_interval
+    (in seconds), which is reset whenever new content is read.
+
+    Examples:
+        >>> with LogFollower("idefix.0.log") as log: # doctest: +SKIP
+        ...     for line in log.follow(until=lambda: proc.poll() is not None):
+        ...         if line.startswith("Main: Job completed"):
+        ...             break
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike[str] | str,
+        *,
+        min_interval: float = 0.01,
+        max_interval: float = 1.0,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.offset = 0
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._interval = min_interval
+        self._fh: BinaryIO | None = None
+        self._partial = b""
+        # ctypes is only imported when needed
+        from idefix_cli._inotify import open_file_watcher
+
+        self._watcher = open_file_watcher(os.path.dirname(self.path))
+
+    def __enter__(self) -> LogFollower:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._close_file()
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def _close_file(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def seek_end(self) -> None:
+        """Skip the current content of the file, if any, so only lines appended
+        afterwards are read. The file is still read from the start if it's
+        truncated or replaced later, e.g., by a new run writing to the same log.
+        """
+        self._close_file()
+        self._partial = b""
+        try:
+            self._fh = open(self.path, "rb")
+        except FileNotFoundError:
+            self.offset = 0
+            return
+        self.offset = os.fstat(self._fh.fileno()).st_size
+
+    def read_lines(self) -> list[str]:
+        """Return complete lines appended since the last call, without line endings"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._close_file()
+            return []
+
+        if (
+            self._fh is None
+            or os.fstat(self._fh.fileno()).st_ino != st.st_ino
+            or st.st_size < self.offset
+        ):
+            # (re)start from the beginning of a new, replaced or truncated file
+            self._close_file()
+            try:
+                self._fh = open(self.path, "rb")
+            except FileNotFoundError:
+                return []
+            self.offset = 0
+            self._partial = b""
+
+        self._fh.seek(self.offset)
+        if not (data := self._fh.read()):
+            return []
+        self.offset += len(data)
+        self._interval = self.min_interval
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        return [line.rstrip(b"\r").decode(errors="replace") for line in lines]
+
+    def wait(self) -> None:
+        """Block until the file is (possibly) modified"""
+        interval = self._interval
+        self._interval = min(2 * self._interval, self.max_interval)
+        if self._watcher is None:
+            sleep(interval)
+            return
+
+        name = os.path.basename(self.path)
+        deadline = monotonic() + interval
+        while (remaining := deadline - monotonic()) > 0:
+            if name in self._watcher.wait(remaining):
+                return
+
+    def follow(self, *, until: Callable[[], bool] | None = None) -> Iterator[str]:
+        """Yield lines as they're appended to the file, until the until callback
+        returns True (or forever). Lines written before that are still yielded,
+        including a last incomplete one.
+        """
+        while True:
+            done = until is not None and until()
+            yield from self.read_lines()
+            if done:
+                if self._partial:
+                    yield self._partial.rstrip(b"\r").decode(errors="replace")
+                    self._partial = b""
+                return
+            self.wait()
+
+
 def get_config_file() -> str:
     """
     Return absolute path to the active configuration file.
@@ -348,11 +795,82 @@ def get_config_file() -> str:
     return os.path.abspath(conf_file)
 
 
+class _ConfigurationCache:
+    # The active configuration file is only parsed again if it's
+    # changed (or another file becomes active) since it was last read.
+    def __init__(self) -> None:
+        self._key: tuple[str, int, int] | None = None
+        self._text = ""
+        self._conf = ConfigParser()
+
+    def _update(self) -> None:
+        conf_file = get_config_file()
+        try:
+            st = os.stat(conf_file)
+        except OSError:
+            key = (conf_file, -1, -1)
+        else:
+            key = (conf_file, st.st_mtime_ns, st.st_size)
+
+        if key == self._key:
+            return
+
+        text = ""
+        if key[1] >= 0:
+            try:
+                with open(conf_file, encoding="locale") as fh:
+                    text = fh.read()
+            except OSError:
+                # same as ConfigParser.read
+                pass
+        self._conf = self._parse(text, conf_file)
+        self._text = text
+        self._key = key
+
+    @staticmethod
+    def _parse(text: str, source: str) -> ConfigParser:
+        cf = ConfigParser()
+        cf.read_string(text, source=source)
+        return cf
+
+    def get(self) -> ConfigParser:
+        # the returned object is shared, and should not be modified
+        self._update()
+        return self._conf
+
+    def get_copy(self) -> ConfigParser:
+        self._update()
+        assert self._key is not None
+        return self._parse(self._text, self._key[0])
+
+    def clear(self) -> None:
+        self._key = None
+        self._text = ""
+        self._conf = ConfigParser()
+
+
+_CONFIGURATION_CACHE = _ConfigurationCache()
+
+
+def clear_configuration_cache() -> None:
+    """Force the configuration file to be parsed again on next access.
+
+    The configuration is cached in memory, and automatically parsed again
+    if the active configuration file is modified, so calling this function
+    should rarely be necessary.
+
+    Returns:
+        None
+    """
+    _CONFIGURATION_CACHE.clear()
+
+
 def get_configuration() -> ConfigParser:
     """Parse the whole configuration file (local if present, else global)
 
     Returns:
         cf (configparser.ConfigParser): parsed configuration object (may be empty).
+            This is a copy, which can be modified without side effects.
 
     Examples:
         >>> cf = get_configuration()
@@ -362,10 +880,7 @@ def get_configuration() -> ConfigParser:
     See also:
         get_option
     """
-    cf = ConfigParser()
-    if os.path.isfile(conf_file := get_config_file()):
-        cf.read(conf_file)
-    return cf
+    return _CONFIGURATION_CACHE.get_copy()
 
 
 def get_option(section_name: str, option_name: str, /) -> str:
@@ -382,7 +897,7 @@ def get_option(section_name: str, option_name: str, /) -> str:
         >>> get_option("compilation", "compiler")
         'g++'
     """
-    usr_conf = get_configuration()
+    usr_conf = _CONFIGURATION_CACHE.get()
     return usr_conf.get(section_name, option_name, fallback="")
 
 
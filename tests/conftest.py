@@ -23,6 +23,14 @@ def isolated_conf_dir(tmp_path, monkeypatch):
     return conf_dir
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    # not using tmp_path here, as some tests expect it to be empty
+    cache_dir = tmp_path_factory.mktemp("cache")
+    monkeypatch.setattr("idefix_cli._cache.XDG_CACHE_HOME", str(cache_dir))
+    return cache_dir
+
+
 def pytest_sessionstart(session) -> None:
     # define a temporary local configuration file
     # to get actual content in doctest examples
@@ -120,3 +120,68 @@ def test_plugins(isolated_conf_dir, tmp_path, capsys):
     out, err = capsys.readouterr()
     assert out == "Hello Idefix !\n"
     assert err == ""
+
+
+def test_lazy_command_loading(isolated_conf_dir, tmp_path, capsys):
+    with open(isolated_conf_dir / "idefix.cfg", "w") as fh:
+        fh.write(f"[idefix_cli]\nplugins_directory = {tmp_path!s}")
+
+    with open(tmp_path / "boom.py", "w") as fh:
+        fh.write(
+            dedent(
+                """
+                'a command that cannot be imported'
+                raise RuntimeError("this module should never be executed")
+
+                def add_arguments(parser):
+                    return
+
+                def command():
+                    return 1
+                """
+            )
+        )
+
+    parser = argparse.ArgumentParser(allow_abbrev=False)
+    commands = _setup_commands(parser)
+    assert "boom" in commands
+
+    known_args, unknown_args = parser.parse_known_args(["read", "--indent", "2", "x"])
+    assert known_args.command == "read"
+    assert known_args.indent == 2
+    assert unknown_args == []
+
+    cmd, accepts_unknown_args = commands["read"]
+    assert cmd.__name__ == "command"
+    assert not accepts_unknown_args
+
+    _, accepts_unknown_args = commands["run"]
+    assert accepts_unknown_args
+
+
+def test_command_manifest(isolated_conf_dir, isolated_cache_dir, tmp_path):
+    with open(isolated_conf_dir / "idefix.cfg", "w") as fh:
+        fh.write(f"[idefix_cli]\nplugins_directory = {tmp_path!s}")
+
+    plugin = tmp_path / "hello.py"
+    plugin.write_text(
+        dedent(
+            """
+            'say hello'
+            def add_arguments(parser):
+                return
+
+            def command():
+                return 0
+            """
+        )
+    )
+
+    commands = _setup_commands(argparse.ArgumentParser(allow_abbrev=False))
+    assert commands.get_command("hello").metadata.help == "say hello"
+    assert (isolated_cache_dir / "idefix_cli" / "commands.json").is_file()
+
+    # cached metadata is invalidated when the source changes
+    plugin.write_text(plugin.read_text().replace("say hello", "say hello again"))
+    commands = _setup_commands(argparse.ArgumentParser(allow_abbrev=False))
+    assert commands.get_command("hello").metadata.help == "say hello again"
@@ -0,0 +1,148 @@
+import json
+import sys
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from idefix_cli.__main__ import idfx_entry_point as main
+from idefix_cli._commands.batch import parse_jobs
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_parse_jobs():
+    jobs = parse_jobs(
+        [
+            "# a comment",
+            "",
+            "read a.ini --indent 2",
+            "idfx clone a b && write 'b/idefix.ini' b.json  # trailing comment",
+        ]
+    )
+    assert [job.lineno for job in jobs] == [3, 4]
+    assert jobs[0].commands == [["read", "a.ini", "--indent", "2"]]
+    assert jobs[1].commands == [
+        ["clone", "a", "b"],
+        ["write", "b/idefix.ini", "b.json"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "line, msg",
+    (
+        ("read a.ini &&", "line 1: empty command"),
+        ("idfx", "line 1: empty command"),
+        ("serve", "line 1: idfx serve cannot be batched"),
+        ("read 'a.ini", "line 1: No closing quotation"),
+    ),
+)
+def test_parse_invalid_jobs(line, msg):
+    with pytest.raises(ValueError, match=f"^{msg}$"):
+        parse_jobs([line])
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires fork")
+def test_batch(tmp_path, capsys):
+    batch_file = tmp_path / "jobs.txt"
+    inifile = DATA_DIR / "minimal.ini"
+    batch_file.write_text(
+        f"read {inifile}\n"
+        f"read {inifile} && read {tmp_path / 'missing.ini'} && read {inifile}\n"
+    )
+
+    ret = main(["batch", str(batch_file), "-j", "2"])
+    assert ret != 0
+
+    out, err = capsys.readouterr()
+    lines = out.splitlines()
+    # the first job produces one line of output, the second produces 3 lines
+    # (including an error message), and stops at the first failure
+    assert sum(line.startswith("{") for line in lines) == 2
+    assert json.loads(lines[0])["Dummy"]["x"] == 1
+    assert f"🎉 line 1 (exit code 0): read {inifile}" in lines
+    assert f"💥 no such file {tmp_path / 'missing.ini'}" in lines
+    assert "💥 line 2 (exit code 1): " in err
+    assert err.endswith("💥 1 out of 2 jobs failed\n")
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires fork")
+def test_batch_chain_after_exec(isolated_conf_dir, tmp_path, capfd):
+    # commands that replace their process (like idfx conf, which execs cmake)
+    # don't end their job early
+    with open(isolated_conf_dir / "idefix.cfg", "w") as fh:
+        fh.write(f"[idefix_cli]\nplugins_directory = {tmp_path / 'plugins'}\n")
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "execer.py").write_text(
+        dedent(
+            f"""
+            "a command that replaces its own process"
+            import os
+
+            def add_arguments(parser):
+                return
+
+            def command():
+                cmd = [{sys.executable!r}, "-c", "print('replaced')"]
+                os.execvp(cmd[0], cmd)
+            """
+        )
+    )
+    batch_file = tmp_path / "jobs.txt"
+    inifile = DATA_DIR / "minimal.ini"
+    batch_file.write_text(
+        f"execer && read {inifile}\nexecer && read {tmp_path / 'missing.ini'}\n"
+    )
+
+    ret = main(["batch", str(batch_file)])
+    assert ret != 0
+
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines.count("replaced") == 2
+    assert sum(line.startswith("{") for line in lines) == 1
+    assert "💥 line 2 (exit code 1): " in err
+    assert err.endswith("💥 1 out of 2 jobs failed\n")
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires fork")
+@pytest.mark.parametrize("target", ["self", "parent"])
+def test_batch_killed(isolated_conf_dir, tmp_path, capfd, target):
+    # commands, or the workers running their job, may be killed by a signal
+    # (e.g. by the OOM killer), which is reported as shells do
+    with open(isolated_conf_dir / "idefix.cfg", "w") as fh:
+        fh.write(f"[idefix_cli]\nplugins_directory = {tmp_path / 'plugins'}\n")
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "killer.py").write_text(
+        dedent(
+            """
+            "a command that kills its own process, or its parent"
+            import os
+            from signal import SIGKILL
+
+            def add_arguments(parser):
+                parser.add_argument("target")
+
+            def command(target):
+                os.kill(os.getpid() if target == "self" else os.getppid(), SIGKILL)
+            """
+        )
+    )
+    batch_file = tmp_path / "jobs.txt"
+    batch_file.write_text(f"killer {target}\n")
+
+    ret = main(["batch", str(batch_file)])
+    assert ret != 0
+    _, err = capfd.readouterr()
+    assert f"💥 line 1 (exit code 137): killer {target}\n" in err
+
+
+def test_batch_nothing_to_do(tmp_path, capsys):
+    batch_file = tmp_path / "jobs.txt"
+    batch_file.write_text("# nothing\n")
+
+    ret = main(["batch", str(batch_file)])
+    assert ret == 0
+    out, err = capsys.readouterr()
+    assert out == "Nothing to do.\n"
+    assert err == ""
@@ -0,0 +1,168 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import idefix_cli.lib
+from idefix_cli._build_cache import (
+    BuildCache,
+    format_size,
+    get_build_cache,
+    get_build_key,
+    parse_size,
+)
+
+IDEFIX_FILES = {
+    "CMakeLists.txt": (
+        "cmake_minimum_required(VERSION 3.16)\n"
+        "project(Idefix CXX)\n"
+        "add_subdirectory(src/kokkos kokkos)\n"
+        "add_executable(idefix src/main.cpp src/core.cpp ${CMAKE_BINARY_DIR}/setup.cpp)\n"
+        "target_include_directories(idefix PUBLIC ${CMAKE_BINARY_DIR} src)\n"
+        "target_link_libraries(idefix kokkoscore)\n"
+    ),
+    "src/kokkos/CMakeLists.txt": (
+        "add_library(kokkoscore STATIC core.cpp)\n"
+        "configure_file(config.h.in ${CMAKE_CURRENT_BINARY_DIR}/KokkosCore_config.h)\n"
+        "target_include_directories(kokkoscore PUBLIC ${CMAKE_CURRENT_BINARY_DIR})\n"
+    ),
+    "src/kokkos/config.h.in": "#define KOKKOS 1\n",
+    "src/kokkos/core.cpp": '#include "KokkosCore_config.h"\nint k(){return KOKKOS;}\n',
+    "src/core.cpp": '#include "definitions.hpp"\nint core(){return DIM;}\n',
+    "src/main.cpp": "int setup();int core();int k();\nint main(){return 0;}\n",
+}
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [("1024", 1024), ("2K", 2048), ("1.5M", 1536 * 1024), ("10GiB", 10 * 1024**3)],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+def test_parse_invalid_size():
+    with pytest.raises(ValueError, match=r"^invalid size 'lots'$"):
+        parse_size("lots")
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [(12, "12 B"), (2048, "2.0 KiB"), (5 * 1024**3, "5.0 GiB"), (2**50, "1024.0 TiB")],
+)
+def test_format_size(size, expected):
+    assert format_size(size) == expected
+
+
+def test_build_cache_configuration(isolated_conf_dir, capsys):
+    assert not get_build_cache().enabled
+
+    conf_file = isolated_conf_dir / "idefix.cfg"
+    conf_file.write_text(
+        "[idfx cache]\nenabled = yes\nmax_size = 1G\ndirectory = ~/builds\n"
+    )
+    build_cache = get_build_cache()
+    assert build_cache.enabled
+    assert build_cache.max_size == 1024**3
+    assert build_cache.root == Path("~", "builds").expanduser()
+
+    conf_file.write_text("[idfx cache]\nenabled = sure\nmax_size = big\n")
+    build_cache = get_build_cache()
+    assert not build_cache.enabled
+    assert build_cache.max_size == 5 * 1024**3
+    _, err = capsys.readouterr()
+    assert "Expected [idfx cache].enabled to be a boolean" in err
+    assert "Expected [idfx cache].max_size to be a size" in err
+
+
+@pytest.fixture()
+def idefix_dir(tmp_path, monkeypatch):
+    idefix_dir = tmp_path / "idefix"
+    for file, content in IDEFIX_FILES.items():
+        (idefix_dir / file).parent.mkdir(parents=True, exist_ok=True)
+        (idefix_dir / file).write_text(content)
+    monkeypatch.setenv("IDEFIX_DIR", str(idefix_dir))
+    monkeypatch.setattr(idefix_cli.lib, "_IDEFIX_VERSION_MEMO", {})
+    return idefix_dir
+
+
+def configure(directory, idefix_dir, *, dim=3):
+    directory.mkdir()
+    (directory / "setup.cpp").write_text("int setup(){return 0;}\n")
+    (directory / "definitions.hpp").write_text(f"#define DIM {dim}\n")
+    subprocess.run(
+        ["cmake", str(idefix_dir)], cwd=directory, check=True, capture_output=True
+    )
+
+
+def make(directory):
+    # return compiled objects
+    out = subprocess.run(
+        ["make"], cwd=directory, check=True, capture_output=True, text=True
+    ).stdout
+    return sorted(
+        line.rpartition(" ")[2] for line in out.splitlines() if "Building" in line
+    )
+
+
+@pytest.mark.skipif(
+    sys.platform.startswith("win")
+    or any(shutil.which(exe) is None for exe in ("cmake", "make", "c++")),
+    reason="requires cmake and make",
+)
+def test_build_cache(tmp_path, idefix_dir):
+    build_cache = BuildCache(tmp_path / "cache", max_size=1024**3)
+    configure(tmp_path / "prob1", idefix_dir)
+    assert len(make(tmp_path / "prob1")) == 4
+    key = get_build_key(tmp_path / "prob1")
+    assert build_cache.store(tmp_path / "prob1", key) == 4
+    # objects are only stored once
+    assert build_cache.store(tmp_path / "prob1", key) == 0
+
+    # identically configured problems share entries, and don't compile anything
+    configure(tmp_path / "prob2", idefix_dir)
+    assert get_build_key(tmp_path / "prob2") == key
+    assert build_cache.restore(tmp_path / "prob2", key) == 4
+    assert make(tmp_path / "prob2") == []
+
+    # but restored objects are rebuilt when their dependencies change
+    (tmp_path / "prob2" / "definitions.hpp").write_text("#define DIM 2\n")
+    assert make(tmp_path / "prob2") == ["CMakeFiles/idefix.dir/src/core.cpp.o"]
+
+    # objects are only restored if their dependencies are identical
+    configure(tmp_path / "prob3", idefix_dir, dim=2)
+    assert build_cache.restore(tmp_path / "prob3", key) == 3
+    assert make(tmp_path / "prob3") == ["CMakeFiles/idefix.dir/src/core.cpp.o"]
+    assert build_cache.store(tmp_path / "prob3", key) == 1
+
+    (entry,) = build_cache.list_entries()
+    assert entry.key == key.digest
+    assert entry.nobjects == 5
+
+    # different build options use different entries
+    subprocess.run(
+        ["cmake", "-DCMAKE_BUILD_TYPE=Debug", "."],
+        cwd=tmp_path / "prob3",
+        check=True,
+        capture_output=True,
+    )
+    assert get_build_key(tmp_path / "prob3") != key
+
+
+def test_trim(tmp_path):
+    build_cache = BuildCache(tmp_path, max_size=100)
+    for i, key in enumerate(("old", "recent", "current")):
+        (tmp_path / key).mkdir()
+        (tmp_path / key / "manifest.json").write_text(
+            '{"version": 1, "revision": "abc", "compiler": "GNU 14.2.0", '
+            '"objects": {"a.o": {"x": {"deps": {}, "size": 60}}}}'
+        )
+        os.utime(tmp_path / key / "manifest.json", ns=(i, i))
+
+    assert [e.key for e in build_cache.list_entries()] == ["current", "recent", "old"]
+    evicted = build_cache.trim(keep="old")
+    assert [e.key for e in evicted] == ["recent", "current"]
+    assert [e.key for e in build_cache.list_entries()] == ["old"]
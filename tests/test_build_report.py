@@ -0,0 +1,115 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from idefix_cli._build_report import (
+    BuildTimer,
+    CompileRecord,
+    _parse_ninja_log,
+    _parse_timer_log,
+    format_build_report,
+)
+
+
+def test_parse_timer_log():
+    content = (
+        "1000\t3000\t1500\t/idefix/src/main.cpp\n"
+        "garbage\n"
+        "2000\t7000\t4000\t/idefix/src/fluid/fluid.cpp\n"
+    )
+    assert _parse_timer_log(content) == [
+        CompileRecord("/idefix/src/main.cpp", 1000, 3000, 1500),
+        CompileRecord("/idefix/src/fluid/fluid.cpp", 2000, 7000, 4000),
+    ]
+
+
+def test_parse_ninja_log():
+    content = (
+        "# ninja log v5\n"
+        "12\t2034\t0\tCMakeFiles/idefix.dir/src/main.cpp.o\t8cd0d5c5a46b9a5e\n"
+        "2034\t2100\t0\tidefix\tbe1ab4e5ce5c2c8a\n"
+    )
+    assert _parse_ninja_log(content) == [
+        CompileRecord("CMakeFiles/idefix.dir/src/main.cpp.o", 12_000_000, 2_034_000_000)
+    ]
+
+
+def test_format_build_report(tmp_path):
+    records = [
+        CompileRecord(str(tmp_path / "src" / "a.cpp"), 0, 2 * 10**9, 10**9),
+        CompileRecord(str(tmp_path / "src" / "b.cpp"), 0, 4 * 10**9, 3 * 10**9),
+        CompileRecord("/elsewhere/c.cpp", 10**9, 2 * 10**9, 10**9),
+    ]
+    report = format_build_report(
+        records, wall_ns=5 * 10**9, jobs=2, top=2, roots=[tmp_path]
+    )
+    assert report.splitlines() == [
+        "Build report: 3 translation units compiled in 5.0s (wall time)",
+        "  total compilation time: 7.0s",
+        "  total CPU time: 5.0s",
+        "  achieved parallelism: 1.4 (70% of 2 jobs)",
+        "  slowest translation units (2/3):",
+        f"        4.0s  {os.path.join('src', 'b.cpp')}",
+        f"        2.0s  {os.path.join('src', 'a.cpp')}",
+    ]
+
+
+def test_format_empty_build_report():
+    assert format_build_report([], wall_ns=10, jobs=1) == (
+        "Build report: no translation units were compiled"
+    )
+
+
+def test_unsupported_generator(tmp_path, capsys):
+    (tmp_path / "CMakeCache.txt").write_text("CMAKE_GENERATOR:INTERNAL=Xcode\n")
+    timer = BuildTimer(tmp_path)
+    cmd = ["cmake", "--build", "."]
+    assert timer.instrument(cmd) == cmd
+    assert timer.collect() is None
+    _, err = capsys.readouterr()
+    assert "build reports are not supported with the Xcode generator" in err
+
+
+@pytest.mark.skipif(
+    sys.platform.startswith("win")
+    or any(shutil.which(exe) is None for exe in ("cmake", "make", "c++")),
+    reason="requires cmake and make",
+)
+def test_makefile_build_timings(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "CMakeLists.txt").write_text(
+        "cmake_minimum_required(VERSION 3.16)\n"
+        "project(Test CXX)\n"
+        "add_executable(prog main.cpp lib.cpp)\n"
+    )
+    (source_dir / "main.cpp").write_text("int f();\nint main(){return f();}\n")
+    (source_dir / "lib.cpp").write_text("int f(){return 0;}\n")
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    subprocess.run(
+        ["cmake", "-G", "Unix Makefiles", str(source_dir)],
+        cwd=build_dir,
+        check=True,
+        capture_output=True,
+    )
+
+    timer = BuildTimer(build_dir)
+    cmd = timer.instrument(["cmake", "--build", ".", "--parallel", "2"])
+    assert cmd[-2] == "--"
+    assert cmd[-1].startswith("SHELL=")
+    subprocess.run(cmd, cwd=build_dir, check=True, capture_output=True)
+    assert (build_dir / "prog").is_file()
+
+    records = timer.collect()
+    assert records is not None
+    assert sorted(r.target for r in records) == [
+        str(source_dir / "lib.cpp"),
+        str(source_dir / "main.cpp"),
+    ]
+    for record in records:
+        assert record.end_ns > record.start_ns
+        assert record.cpu_ns is not None
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from idefix_cli.__main__ import idfx_entry_point as main
+
+
+@pytest.fixture()
+def build_cache_dir(tmp_path, isolated_conf_dir):
+    cache_dir = tmp_path / "builds"
+    (isolated_conf_dir / "idefix.cfg").write_text(
+        f"[idfx cache]\nenabled = true\ndirectory = {cache_dir}\n"
+    )
+    for i, key in enumerate(("0123abcd", "0456abcd", "789abcde")):
+        (cache_dir / key).mkdir(parents=True)
+        (cache_dir / key / "manifest.json").write_text(
+            '{"version": 1, "revision": "abc", "compiler": "GNU 14.2.0", '
+            '"objects": {"a.o": {"x": {"deps": {}, "size": 2048}}}}'
+        )
+        os.utime(cache_dir / key / "manifest.json", ns=(i, i))
+    return cache_dir
+
+
+def test_list(build_cache_dir, capsys):
+    assert main(["cache"]) == 0
+    out, err = capsys.readouterr()
+    assert err == ""
+    lines = out.splitlines()
+    assert lines[0].split() == ["KEY", "SIZE", "LAST", "USED", "OBJECTS", "COMPILER"]
+    assert [line.split()[0] for line in lines[1:4]] == [
+        "789abcde",
+        "0456abcd",
+        "0123abcd",
+    ]
+    assert lines[-1] == f"Total: 6.0 KiB (budget: 5.0 GiB), in {build_cache_dir}"
+
+
+def test_list_empty(tmp_path, isolated_conf_dir, capsys):
+    assert main(["cache"]) == 0
+    out, _ = capsys.readouterr()
+    assert out.startswith("The build cache is disabled.\nNo entries in ")
+
+
+def test_evict_keys(build_cache_dir, capsys):
+    assert main(["cache", "evict", "0123", "789"]) == 0
+    assert sorted(os.listdir(build_cache_dir)) == ["0456abcd"]
+
+
+def test_evict_ambiguous_key(build_cache_dir, capsys):
+    assert main(["cache", "evict", "0"]) != 0
+    _, err = capsys.readouterr()
+    assert "more than one entry matches key '0'" in err
+    assert len(os.listdir(build_cache_dir)) == 3
+
+
+def test_evict_max_size(build_cache_dir, capsys):
+    assert main(["cache", "evict", "--max-size", "4K"]) == 0
+    assert sorted(os.listdir(build_cache_dir)) == ["0456abcd", "789abcde"]
+
+
+def test_evict_all(build_cache_dir, capsys):
+    assert main(["cache", "evict", "--all"]) == 0
+    assert os.listdir(build_cache_dir) == []
+
+
+def test_evict_requires_target(build_cache_dir, capsys):
+    assert main(["cache", "evict"]) != 0
+    _, err = capsys.readouterr()
+    assert "evict requires either keys, --all or --max-size" in err
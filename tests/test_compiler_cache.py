@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import idefix_cli._compiler_cache as compiler_cache
+from idefix_cli._compiler_cache import (
+    CompilerCacheStats,
+    get_compiler_cache_stats,
+    get_compiler_launcher,
+)
+
+CCACHE_STATS = (
+    "stats_updated_timestamp\t1729150000\n"
+    "direct_cache_hit\t12\n"
+    "preprocessed_cache_hit\t3\n"
+    "cache_miss\t5\n"
+    "called_for_link\t2\n"
+)
+
+SCCACHE_STATS = json.dumps(
+    {
+        "stats": {
+            "compile_requests": 24,
+            "cache_hits": {"counts": {"C/C++": 10, "CUDA": 2}, "adv_counts": {}},
+            "cache_misses": {"counts": {"C/C++": 4}, "adv_counts": {}},
+        }
+    }
+)
+
+
+def test_compiler_launcher(tmp_path):
+    assert get_compiler_launcher(tmp_path) is None
+    (tmp_path / "CMakeCache.txt").write_text("CMAKE_CXX_COMPILER:FILEPATH=g++\n")
+    assert get_compiler_launcher(tmp_path) is None
+    (tmp_path / "CMakeCache.txt").write_text(
+        "CMAKE_CXX_COMPILER_LAUNCHER:STRING=/usr/bin/ccache;--some-option\n"
+    )
+    assert get_compiler_launcher(tmp_path) == "/usr/bin/ccache"
+
+
+@pytest.mark.parametrize(
+    "launcher, output, expected",
+    [
+        ("ccache", CCACHE_STATS, CompilerCacheStats(hits=15, misses=5)),
+        ("/opt/bin/sccache", SCCACHE_STATS, CompilerCacheStats(hits=12, misses=4)),
+        ("sccache", "not json", None),
+        ("distcc", "", None),
+    ],
+)
+def test_compiler_cache_stats(monkeypatch, launcher, output, expected):
+    monkeypatch.setattr(compiler_cache, "_run_stats_command", lambda cmd: output)
+    assert get_compiler_cache_stats(launcher) == expected
+
+
+@pytest.mark.parametrize(
+    "stats, expected",
+    [
+        (CompilerCacheStats(hits=3, misses=1), "3 hits, 1 misses (75% hit rate)"),
+        (CompilerCacheStats(hits=0, misses=0), "nothing was compiled"),
+    ],
+)
+def test_compiler_cache_stats_str(stats, expected):
+    assert str(stats) == expected
+    assert stats - stats == CompilerCacheStats(hits=0, misses=0)
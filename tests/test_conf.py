@@ -1,4 +1,5 @@
 import os
+import sys
 
 import pytest
 from packaging.version import Version
@@ -69,3 +70,196 @@ def test_setup_requiring_cmake_in_bad_env(capsys, monkeypatch, subtests, tmp_pat
 def test_cmake_subs(args, expected):
     ret = substitute_cmake_args(args)
     assert ret == expected
+
+
+def test_cmake_launcher(isolated_conf_dir, capsys):
+    conf_file = isolated_conf_dir / "idefix.cfg"
+    conf_file.write_text(f"[idfx conf]\ncompiler_launcher = {sys.executable}\n")
+    assert substitute_cmake_args(["-mhd"]) == [
+        "-DIdefix_MHD=ON",
+        f"-DCMAKE_CXX_COMPILER_LAUNCHER={sys.executable}",
+    ]
+
+    # explicit arguments take precedence
+    args = ["-DCMAKE_CXX_COMPILER_LAUNCHER=sccache"]
+    assert substitute_cmake_args(args) == args
+
+    conf_file.write_text("[idfx conf]\ncompiler_launcher = not-a-ccache\n")
+    assert substitute_cmake_args(["-mhd"]) == ["-DIdefix_MHD=ON"]
+    _, err = capsys.readouterr()
+    assert "Could not find compiler launcher 'not-a-ccache'" in err
+
+
+@pytest.fixture()
+def configured_dir(tmp_path, monkeypatch):
+    idefix_dir = tmp_path / "idefix"
+    idefix_dir.mkdir()
+    monkeypatch.setenv("IDEFIX_DIR", str(idefix_dir))
+    problem_dir = tmp_path / "problem"
+    problem_dir.mkdir()
+    (problem_dir / "setup.cpp").touch()
+    (problem_dir / "Makefile").touch()
+    compiler = tmp_path / "bin" / "mycxx"
+    compiler.parent.mkdir()
+    compiler.touch(mode=0o755)
+    monkeypatch.setenv("PATH", str(compiler.parent), prepend=os.pathsep)
+    (problem_dir / "CMakeCache.txt").write_text(
+        f"CMAKE_HOME_DIRECTORY:INTERNAL={idefix_dir}\n"
+        "CMAKE_GENERATOR:INTERNAL=Unix Makefiles\n"
+        f"CMAKE_CXX_COMPILER:FILEPATH={compiler}\n"
+        "Idefix_MHD:BOOL=ON\n"
+        "Idefix_MPI:BOOL=OFF\n"
+        "Kokkos_ARCH_AMPERE86:BOOL=ON\n"
+    )
+    return problem_dir
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        ([], True),
+        (["-DIdefix_MHD=ON", "-DIdefix_MPI=OFF"], True),
+        (["-D", "Idefix_MHD:BOOL=yes", "-DIdefix_MPI=0"], True),
+        pytest.param(
+            ["-DCMAKE_CXX_COMPILER=mycxx"],
+            True,
+            marks=pytest.mark.skipif(
+                sys.platform.startswith("win"), reason="requires an executable file"
+            ),
+        ),
+        (["-G", "Unix Makefiles"], True),
+        (["-DIdefix_MPI=ON"], False),
+        (["-DIdefix_DEBUG=OFF"], False),
+        (["-DCMAKE_CXX_COMPILER=not-a-compiler"], False),
+        (["-GNinja"], False),
+        (["-UIdefix_MHD"], False),
+        (["--fresh"], False),
+        (["-D"], False),
+    ],
+)
+def test_is_configured(configured_dir, args, expected):
+    from idefix_cli._commands.conf import is_configured
+
+    assert is_configured(configured_dir, args) is expected
+
+
+def test_is_configured_other_source_dir(configured_dir, tmp_path, monkeypatch):
+    from idefix_cli._commands.conf import is_configured
+
+    monkeypatch.setenv("IDEFIX_DIR", str(tmp_path))
+    assert not is_configured(configured_dir, [])
+
+
+def test_is_configured_without_build_files(configured_dir):
+    from idefix_cli._commands.conf import is_configured
+
+    (configured_dir / "Makefile").unlink()
+    assert not is_configured(configured_dir, [])
+
+
+@pytest.mark.usefixtures("isolated_conf_dir")
+def test_skip_noop_configuration(configured_dir, capsys, monkeypatch):
+    from idefix_cli._commands.conf import EngineRequirement, command
+
+    monkeypatch.setattr(
+        "idefix_cli._commands.conf._get_engine",
+        lambda: (EngineRequirement.CMAKE, None),
+    )
+    monkeypatch.setattr("os.execvp", pytest.fail)
+    assert command("-mhd", directory=str(configured_dir), interactive=False) == 0
+    out, err = capsys.readouterr()
+    assert err == ""
+    assert out == (
+        f"{configured_dir} is already configured with the requested options, "
+        "skipping cmake (use --force to run it anyway)\n"
+    )
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="uses a shell script")
+def test_cmake_version_cache(tmp_path, monkeypatch):
+    import idefix_cli._commands.conf as conf
+
+    cmake = tmp_path / "cmake"
+    cmake.write_text("#!/bin/sh\necho 'cmake version 3.28.1'\n")
+    cmake.chmod(0o755)
+    monkeypatch.setattr(conf, "_CMAKE_VERSION_MEMO", {})
+    assert conf.get_cmake_version(str(cmake)) == Version("3.28.1")
+
+    # the result is persisted on disk, so cmake doesn't need to run again
+    conf._CMAKE_VERSION_MEMO.clear()
+    with monkeypatch.context() as m:
+        m.setattr(conf, "_probe_cmake_version", pytest.fail)
+        assert conf.get_cmake_version(str(cmake)) == Version("3.28.1")
+
+    # ... unless it changes
+    cmake.write_text("#!/bin/sh\necho 'cmake version 3.31.10'\n")
+    assert conf.get_cmake_version(str(cmake)) == Version("3.31.10")
+
+    cmake.write_text("#!/bin/sh\necho 'cmake version ???'\n")
+    assert conf.get_cmake_version(str(cmake)) is None
+
+
+@pytest.mark.skipif(
+    sys.platform.startswith("win"), reason="requires an executable file"
+)
+@pytest.mark.parametrize("ninja_available", [True, False])
+@pytest.mark.usefixtures("isolated_conf_dir")
+def test_generator_selection(tmp_path, monkeypatch, ninja_available):
+    from idefix_cli._commands.conf import substitute_cmake_generator
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    if ninja_available:
+        (bin_dir / "ninja").touch(mode=0o755)
+    monkeypatch.setenv("PATH", str(bin_dir))
+    problem_dir = tmp_path / "problem"
+    problem_dir.mkdir()
+
+    expected = ["-G", "Ninja"] if ninja_available else []
+    assert substitute_cmake_generator([], problem_dir) == expected
+
+    # an explicit generator is always preserved
+    args = ["-G", "Unix Makefiles"]
+    assert substitute_cmake_generator(args, problem_dir) == args
+
+    # as well as the generator of an existing build directory
+    (problem_dir / "CMakeCache.txt").write_text(
+        "CMAKE_GENERATOR:INTERNAL=Unix Makefiles\n"
+    )
+    assert substitute_cmake_generator([], problem_dir) == []
+
+
+@pytest.mark.parametrize(
+    "option, expected",
+    [("auto", []), ("Unix Makefiles", ["-G", "Unix Makefiles"])],
+)
+def test_configured_generator(
+    isolated_conf_dir, tmp_path, monkeypatch, option, expected
+):
+    from idefix_cli._commands.conf import substitute_cmake_generator
+
+    monkeypatch.setenv("PATH", "")
+    (isolated_conf_dir / "idefix.cfg").write_text(
+        f"[idfx conf]\ngenerator = {option}\n"
+    )
+    assert substitute_cmake_generator([], tmp_path) == expected
+
+
+@pytest.mark.parametrize(
+    "native_arch, expected",
+    [("SKX", "-DKokkos_ARCH_SKX=ON"), (None, "-DKokkos_ARCH_NATIVE=ON")],
+)
+@pytest.mark.usefixtures("isolated_conf_dir")
+def test_native_arch(monkeypatch, capsys, native_arch, expected):
+    monkeypatch.setattr(
+        "idefix_cli._commands.conf.get_native_arch", lambda: native_arch
+    )
+    assert substitute_cmake_args(["-arch", "native", "Ampere86"]) == [
+        expected,
+        "-DKokkos_ARCH_AMPERE86=ON",
+    ]
+    out, err = capsys.readouterr()
+    if native_arch is None:
+        assert "Could not detect the host's CPU architecture" in err
+    else:
+        assert out == "Detected CPU architecture: SKX\n"
@@ -0,0 +1,76 @@
+import pytest
+
+import idefix_cli._cpu_arch as cpu_arch
+from idefix_cli._cpu_arch import detect_kokkos_arch, get_native_arch
+
+
+def intel(model, *flags):
+    return (
+        "processor\t: 0\n"
+        "vendor_id\t: GenuineIntel\n"
+        "cpu family\t: 6\n"
+        f"model\t\t: {model}\n"
+        f"flags\t\t: fpu sse sse2 {' '.join(flags)}\n"
+        "\n"
+        "processor\t: 1\n"
+        "flags\t\t: fpu\n"
+    )
+
+
+def amd(family, model, *flags):
+    return (
+        "vendor_id\t: AuthenticAMD\n"
+        f"cpu family\t: {family}\n"
+        f"model\t\t: {model}\n"
+        f"flags\t\t: fpu avx avx2 {' '.join(flags)}\n"
+    )
+
+
+def arm(implementer, part):
+    return (
+        f"CPU implementer\t: {implementer}\nCPU architecture: 8\nCPU part\t: {part}\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "cpuinfo, machine, expected",
+    [
+        (intel(42, "avx"), "x86_64", "SNB"),
+        (intel(60, "avx", "avx2"), "x86_64", "HSW"),
+        (intel(79, "avx", "avx2", "adx"), "x86_64", "BDW"),
+        (intel(94, "avx", "avx2", "adx", "clflushopt"), "x86_64", "SKL"),
+        (intel(85, "avx2", "avx512f", "clflushopt"), "x86_64", "SKX"),
+        (intel(106, "avx2", "avx512f", "avx512_vbmi2"), "x86_64", "ICX"),
+        (intel(126, "avx2", "avx512f", "avx512_vbmi2"), "x86_64", "ICL"),
+        (intel(143, "avx512f", "avx512_vbmi2", "amx_tile"), "x86_64", "SPR"),
+        (intel(87, "avx512f", "avx512er"), "x86_64", "KNL"),
+        (intel(15, "sse3"), "x86_64", None),
+        (amd(23, 1), "x86_64", "ZEN"),
+        (amd(23, 49), "x86_64", "ZEN2"),
+        (amd(25, 1), "x86_64", "ZEN3"),
+        (amd(25, 17, "avx512f"), "x86_64", "ZEN4"),
+        (amd(21, 2), "x86_64", None),
+        (arm("0x46", "0x001"), "aarch64", "A64FX"),
+        (arm("0x41", "0xd4f"), "aarch64", "ARMV9_GRACE"),
+        (arm("0x41", "0xfff"), "aarch64", None),
+        ("cpu\t\t: POWER9 (raw), altivec supported\n", "ppc64le", "POWER9"),
+        (intel(85, "avx512f"), "riscv64", None),
+        ("", "x86_64", None),
+    ],
+)
+def test_detect_kokkos_arch(cpuinfo, machine, expected):
+    assert detect_kokkos_arch(cpuinfo, machine) == expected
+
+
+def test_native_arch_cache(monkeypatch):
+    monkeypatch.setattr(cpu_arch.socket, "gethostname", lambda: "node001")
+    monkeypatch.setattr(cpu_arch, "detect_kokkos_arch", lambda *args: "ZEN3")
+    assert get_native_arch() == "ZEN3"
+
+    # results are cached per host
+    monkeypatch.setattr(cpu_arch, "detect_kokkos_arch", pytest.fail)
+    assert get_native_arch() == "ZEN3"
+
+    monkeypatch.setattr(cpu_arch.socket, "gethostname", lambda: "node002")
+    monkeypatch.setattr(cpu_arch, "detect_kokkos_arch", lambda *args: "SKX")
+    assert get_native_arch() == "SKX"
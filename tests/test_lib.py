@@ -1,6 +1,25 @@
 import os
+import subprocess
+import threading
+import time
+from glob import glob
 
-from idefix_cli.lib import run_subcommand
+import pytest
+from packaging.version import Version
+
+import idefix_cli._inotify
+import idefix_cli.lib
+from idefix_cli.lib import (
+    LogFollower,
+    clear_configuration_cache,
+    files_from_patterns,
+    get_configuration,
+    get_git_tracked_files,
+    get_idefix_info,
+    get_idefix_version,
+    get_option,
+    run_subcommand,
+)
 
 
 def test_simple_subcommand(capsys):
@@ -15,3 +34,252 @@ def test_subcommand_from_loc(capsys, tmp_path):
     out, err = capsys.readouterr()
     assert out.startswith(f"🚀 running ls (from {tmp_path}{os.sep})")
     assert err == ""
+
+
+def test_configuration_cache(isolated_conf_dir):
+    conf_file = isolated_conf_dir / "idefix.cfg"
+    conf_file.write_text("[compilation]\ncompiler = g++\n")
+    assert get_option("compilation", "compiler") == "g++"
+
+    # modifying a copy has no side effects
+    cf = get_configuration()
+    cf["compilation"]["compiler"] = "clang++"
+    assert get_option("compilation", "compiler") == "g++"
+
+    # the cache is invalidated when the file is modified
+    conf_file.write_text("[compilation]\ncompiler = icpx\n")
+    os.utime(conf_file, ns=(0, 0))
+    assert get_option("compilation", "compiler") == "icpx"
+
+    # ... or when a local configuration file takes precedence
+    local_conf_file = isolated_conf_dir.parent / "idefix.cfg"
+    local_conf_file.write_text("[compilation]\ncompiler = nvcc\n")
+    assert get_option("compilation", "compiler") == "nvcc"
+
+    local_conf_file.unlink()
+    assert get_option("compilation", "compiler") == "icpx"
+
+
+def test_clear_configuration_cache(isolated_conf_dir):
+    conf_file = isolated_conf_dir / "idefix.cfg"
+    conf_file.write_text("[compilation]\ncompiler = g++\n")
+    assert get_option("compilation", "compiler") == "g++"
+
+    # same size, same mtime: changes are invisible until the cache is cleared
+    st = conf_file.stat()
+    conf_file.write_text("[compilation]\ncompiler = c++\n")
+    os.utime(conf_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert get_option("compilation", "compiler") == "g++"
+
+    clear_configuration_cache()
+    assert get_option("compilation", "compiler") == "c++"
+
+
+@pytest.fixture()
+def file_tree(tmp_path):
+    for file in (
+        "setup.cpp",
+        "definitions.hpp",
+        ".hidden.cpp",
+        "src/a.cpp",
+        "src/a.hpp",
+        "src/sub/b.cpp",
+        "src/.git/c.cpp",
+        "build/CMakeFiles/d.cpp",
+        "build/e.cpp",
+        "CMakeLists.txt",
+    ):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).touch()
+    return tmp_path
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+@pytest.mark.parametrize(
+    "patterns",
+    [
+        ("*.cpp",),
+        ("*",),
+        ("**",),
+        ("**/*.cpp", "**/*.hpp"),
+        ("**/", "*/"),
+        (".*", "**/.git/*"),
+        ("src/*", "src/**/*.cpp", "CMakeLists.txt", "build"),
+        ("[sb]*/*.?pp",),
+    ],
+)
+def test_files_from_patterns(file_tree, patterns, recursive):
+    # results should be the same as with glob
+    expected = sorted(
+        {
+            os.path.abspath(fp)
+            for p in patterns
+            for fp in glob(os.path.join(file_tree, p), recursive=recursive)
+        }
+    )
+    assert files_from_patterns(file_tree, *patterns, recursive=recursive) == expected
+
+
+def test_files_from_patterns_excludes(file_tree):
+    files = files_from_patterns(
+        file_tree,
+        "**/*.cpp",
+        recursive=True,
+        excludes=["build/**", "src/sub/b.cpp"],
+    )
+    assert files == [
+        str(file_tree / "setup.cpp"),
+        str(file_tree / "src" / "a.cpp"),
+    ]
+
+
+@pytest.fixture()
+def fake_idefix_dir(tmp_path, monkeypatch):
+    idefix_dir = tmp_path / "idefix"
+    idefix_dir.mkdir()
+    monkeypatch.setenv("IDEFIX_DIR", str(idefix_dir))
+    monkeypatch.setattr(idefix_cli.lib, "_IDEFIX_VERSION_MEMO", {})
+    return idefix_dir
+
+
+def test_idefix_version_no_changelog(fake_idefix_dir):
+    assert get_idefix_version() == Version("0")
+
+
+def test_idefix_version_cache(fake_idefix_dir, monkeypatch):
+    changelog = fake_idefix_dir / "CHANGELOG.md"
+    changelog.write_text("## [Unreleased]\n\n## [2.1.0] - 2024-01-01\n")
+    assert get_idefix_version() == Version("2.1.0")
+
+    # the result is persisted on disk, so it's still available
+    # without the in-process memo
+    idefix_cli.lib._IDEFIX_VERSION_MEMO.clear()
+    with monkeypatch.context() as m:
+        m.setattr(idefix_cli.lib, "_read_idefix_version", pytest.fail)
+        assert get_idefix_version() == Version("2.1.0")
+
+    # and invalidated when the changelog changes
+    changelog.write_text("## [2.2.0] - 2025-01-01\n## [2.1.0] - 2024-01-01\n")
+    assert get_idefix_version() == Version("2.2.0")
+
+
+def test_idefix_info_no_git(fake_idefix_dir):
+    info = get_idefix_info()
+    assert info.directory == str(fake_idefix_dir)
+    assert info.version == Version("0")
+    assert info.git_head is None
+    assert info.git_branch is None
+
+
+def test_idefix_info_git(fake_idefix_dir):
+    def git(*args):
+        return subprocess.run(
+            ["git", *args],
+            cwd=fake_idefix_dir,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    git("init", "--quiet", "--initial-branch=develop")
+    git(
+        "-c",
+        "user.name=a",
+        "-c",
+        "user.email=a@b",
+        "commit",
+        "-q",
+        "--allow-empty",
+        "-m",
+        "init",
+    )
+    head = git("rev-parse", "HEAD")
+
+    info = get_idefix_info()
+    assert info.git_head == head
+    assert info.git_branch == "develop"
+
+    # packed refs
+    git("pack-refs", "--all")
+    assert get_idefix_info().git_head == head
+
+    # detached HEAD
+    git("checkout", "-q", "--detach")
+    info = get_idefix_info()
+    assert info.git_head == head
+    assert info.git_branch is None
+
+
+@pytest.mark.parametrize("index_version", [2, 3, 4])
+def test_get_git_tracked_files(tmp_path, index_version):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True)
+
+    assert get_git_tracked_files(tmp_path) == set()
+
+    git("init", "--quiet")
+    for file in ("a.cpp", "sub/b.hpp", "sub/dir with spaces/c.h", "untracked.cpp"):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).touch()
+    git("add", "a.cpp", "sub")
+    git("update-index", "--index-version", str(index_version))
+
+    assert get_git_tracked_files(tmp_path) == {
+        "a.cpp",
+        "sub/b.hpp",
+        "sub/dir with spaces/c.h",
+    }
+    assert get_git_tracked_files(tmp_path / "sub") == {
+        "b.hpp",
+        "dir with spaces/c.h",
+    }
+
+    # the index is read again when modified
+    git("add", "untracked.cpp")
+    assert "untracked.cpp" in get_git_tracked_files(tmp_path)
+
+
+def test_log_follower(tmp_path):
+    logfile = tmp_path / "idefix.0.log"
+    with LogFollower(logfile) as log:
+        assert log.read_lines() == []
+
+        logfile.write_text("first\nsec")
+        assert log.read_lines() == ["first"]
+        with open(logfile, "a") as fh:
+            fh.write("ond\r\nthird\n")
+        assert log.read_lines() == ["second", "third"]
+        assert log.offset == logfile.stat().st_size
+        assert log.read_lines() == []
+
+        # truncated files are read from the start
+        logfile.write_text("new\n")
+        assert log.read_lines() == ["new"]
+
+        # and so are replaced files
+        os.remove(logfile)
+        logfile.write_text("replaced\nlonger content\n")
+        assert log.read_lines() == ["replaced", "longer content"]
+
+
+@pytest.mark.parametrize("notify", [True, False])
+def test_log_follower_follow(tmp_path, monkeypatch, notify):
+    if not notify:
+        monkeypatch.setattr(
+            idefix_cli._inotify, "open_file_watcher", lambda directory: None
+        )
+    logfile = tmp_path / "idefix.0.log"
+
+    def write_log():
+        for i in range(3):
+            time.sleep(0.05)
+            with open(logfile, "a") as fh:
+                fh.write(f"line {i}\n")
+        with open(logfile, "a") as fh:
+            fh.write("incomplete")
+
+    writer = threading.Thread(target=write_log)
+    with LogFollower(logfile, max_interval=0.05) as log:
+        writer.start()
+        lines = list(log.follow(until=lambda: not writer.is_alive()))
+    assert lines == ["line 0", "line 1", "line 2", "incomplete"]
@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from idefix_cli._progress import (
+    KILL_DELAY,
+    STOP_GRACE_PERIOD,
+    ProgressMonitor,
+    Watchdog,
+    parse_duration,
+)
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_progress_from_log():
+    progress = ProgressMonitor(tstop=0.1)
+    lines = (DATA_DIR / "OrszagTang3D" / "idefix.0.log").read_text().splitlines()
+    records = [
+        record
+        for wall_time, line in enumerate(lines)
+        if (record := progress.feed(line, wall_time=float(wall_time))) is not None
+    ]
+    assert len(records) == 11
+    assert records[0].cycle == 0
+    assert records[0].cell_updates is None
+    assert records[0].mpi_overhead is None
+    assert records[1].cycle == 10
+    assert records[1].cell_updates == pytest.approx(1.348727e06)
+    assert records[1].mpi_overhead == pytest.approx(0.448231)
+    # rates are measured over the last 10 records
+    assert len(progress.records) == 10
+
+
+def test_progress_rates():
+    progress = ProgressMonitor(tstop=1.0, max_cycles=1000)
+    assert progress.format_status() == "waiting for progress..."
+    progress.feed(
+        "TimeIntegrator:  time |  cycle |  time step | cell (updates/s) | MPI overhead (%)"
+    )
+    progress.feed("TimeIntegrator:  0.0e+00 | 0 | 1e-3 | N/A | N/A", wall_time=0.0)
+    assert progress.cycle_rate is None
+    assert progress.eta is None
+    progress.feed("TimeIntegrator:  1.0e-01 | 100 | 1e-3 | 2.0e6 | 3.5", wall_time=10.0)
+    assert progress.cycle_rate == pytest.approx(10)
+    assert progress.time_rate == pytest.approx(0.01)
+    # the cycle limit is reached first
+    assert progress.eta == pytest.approx(90)
+    assert progress.format_status() == (
+        "t = 1.0000e-01 / 1 (10.0%) | cycle 100 | 10 cycles/s | "
+        "2.000e+06 cell updates/s | MPI overhead 3.5% | ETA 1m30s"
+    )
+
+
+def test_progress_restart():
+    progress = ProgressMonitor()
+    progress.feed("TimeIntegrator:  1.0e+00 | 100 | 1e-3", wall_time=0.0)
+    progress.feed("TimeIntegrator:  1.1e+00 | 110 | 1e-3", wall_time=1.0)
+    progress.feed("TimeIntegrator:  0.0e+00 | 0 | 1e-3", wall_time=2.0)
+    assert len(progress.records) == 1
+
+
+def test_watchdog_walltime():
+    watchdog = Watchdog(max_walltime=3600, start=0.0)
+    assert watchdog.check(now=3599.0) is None
+    assert watchdog.check(now=3600.0) == "stop"
+    assert watchdog.reason == "wall time budget (1h00m) exhausted"
+    # escalation
+    assert watchdog.check(now=3601.0) is None
+    assert watchdog.check(now=3600.0 + STOP_GRACE_PERIOD) == "terminate"
+    assert watchdog.check(now=3600.0 + STOP_GRACE_PERIOD + 1) is None
+    assert watchdog.check(now=3600.0 + STOP_GRACE_PERIOD + KILL_DELAY) == "kill"
+    assert watchdog.check(now=1e6) is None
+
+
+def test_watchdog_stall():
+    watchdog = Watchdog(stall_timeout=60, start=0.0)
+    watchdog.record_progress(now=50.0)
+    assert watchdog.check(now=100.0) is None
+    assert watchdog.check(now=110.0) == "stop"
+    assert watchdog.reason == "no progress in the last 1m00s"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("45", 45), ("45s", 45), ("10m", 600), ("1d2h", 93600), ("10:00", 600)],
+)
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "ten", "1:2:3:4", "1h-2"])
+def test_parse_invalid_duration(value):
+    with pytest.raises(ValueError, match=r"^invalid duration "):
+        parse_duration(value)
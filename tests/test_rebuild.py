@@ -0,0 +1,203 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from idefix_cli._cmake import CMakeCacheEntry, read_cmake_cache
+from idefix_cli._rebuild import (
+    BuildManifest,
+    DependencyGraph,
+    SourceIndex,
+    filter_dependencies,
+    get_updated_files,
+    parse_depfile,
+)
+
+
+def make_dirs_old(root):
+    # directories that were modified too recently are never trusted as unchanged
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(0, 0))
+
+
+@pytest.fixture()
+def problem_dir(tmp_path):
+    for file in (
+        "setup.cpp",
+        "definitions.hpp",
+        "idefix.ini",
+        "CMakeLists.txt",
+        ".hidden.cpp",
+        "sub/module.cpp",
+        "CMakeFiles/3.28/CompilerIdCXX/CMakeCXXCompilerId.cpp",
+    ):
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).touch()
+    make_dirs_old(tmp_path)
+    return tmp_path
+
+
+def test_source_index(problem_dir):
+    expected = [
+        str(problem_dir / "CMakeLists.txt"),
+        str(problem_dir / "definitions.hpp"),
+        str(problem_dir / "setup.cpp"),
+        str(problem_dir / "sub" / "module.cpp"),
+    ]
+    index = SourceIndex(problem_dir)
+    assert index.get_sources(problem_dir) == expected
+    index.save()
+    assert (problem_dir / ".idfx" / "sources.json").is_file()
+    make_dirs_old(problem_dir)
+    index = SourceIndex(problem_dir)
+    assert index.get_sources(problem_dir) == expected
+    index.save()
+
+    # unchanged directories are not listed again
+    index = SourceIndex(problem_dir)
+    index._list_dir = pytest.fail
+    assert index.get_sources(problem_dir) == expected
+
+    # ... but modified ones are
+    (problem_dir / "sub" / "new.hpp").touch()
+    index = SourceIndex(problem_dir)
+    assert index.get_sources(problem_dir) == [
+        *expected[:3],
+        str(problem_dir / "sub" / "module.cpp"),
+        str(problem_dir / "sub" / "new.hpp"),
+    ]
+
+
+def test_source_index_git_repository(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "tracked.cpp").touch()
+    (src / "untracked.cpp").touch()
+    subprocess.run(["git", "init", "--quiet"], cwd=tmp_path, check=True)
+    subprocess.run(["git", "add", "src/tracked.cpp"], cwd=tmp_path, check=True)
+
+    index = SourceIndex(tmp_path)
+    assert index.get_sources(src, tracked_only=True) == [str(src / "tracked.cpp")]
+
+    subprocess.run(["git", "add", "src/untracked.cpp"], cwd=tmp_path, check=True)
+    assert index.get_sources(src, tracked_only=True) == [
+        str(src / "tracked.cpp"),
+        str(src / "untracked.cpp"),
+    ]
+
+
+def test_get_updated_files(problem_dir):
+    files = [str(problem_dir / "setup.cpp"), str(problem_dir / "definitions.hpp")]
+    os.utime(files[0], ns=(0, 2_000))
+    os.utime(files[1], ns=(0, 1_000))
+    assert get_updated_files(files, since_ns=1_000) == files[:1]
+    assert get_updated_files(files, since_ns=0) == files
+
+
+def test_build_manifest(problem_dir):
+    exe = problem_dir / "idefix"
+    exe.write_text("binary")
+    sources = [str(problem_dir / "setup.cpp"), str(problem_dir / "definitions.hpp")]
+    setup = problem_dir / "setup.cpp"
+    setup.write_text("int main() {}\n")
+
+    manifest = BuildManifest(problem_dir)
+    assert manifest.get_changes(exe, sources, configuration="A") == [
+        "no build record found"
+    ]
+    manifest.record(exe, sources, configuration="A")
+
+    manifest = BuildManifest(problem_dir)
+    assert manifest.get_changes(exe, sources, configuration="A") == []
+    assert manifest.get_changes(exe, sources, configuration="B") == [
+        "build configuration changed"
+    ]
+    assert manifest.get_changes(exe, sources[:1], configuration="A") == [
+        f"removed: {sources[1]}"
+    ]
+
+    # updating mtimes isn't considered a change
+    os.utime(setup, ns=(0, 0))
+    assert manifest.get_changes(exe, sources, configuration="A") == []
+
+    # but changing contents is, even if mtimes are preserved.
+    # In this case, the file is touched so make doesn't skip it
+    setup.write_text("int main() {return 0;}\n")
+    os.utime(setup, ns=(0, 0))
+    assert manifest.get_changes(exe, sources, configuration="A") == [
+        f"modified: {setup}"
+    ]
+    assert setup.stat().st_mtime_ns > 0
+
+    exe.write_text("rebuilt outside of idfx")
+    assert manifest.get_changes(exe, sources, configuration="A") == [
+        "executable was modified outside of idfx"
+    ]
+
+
+def test_read_cmake_cache(tmp_path):
+    cache_file = tmp_path / "CMakeCache.txt"
+    cache_file.write_text(
+        "# This is the CMakeCache file.\n"
+        "//Dimensions of the problem\n"
+        "Idefix_DIMENSIONS:STRING=3\n"
+        '"weird:name":BOOL=ON\n'
+        "CMAKE_CXX_FLAGS:STRING=-O3 -g=1\n"
+        "\n"
+        "CMAKE_CACHEFILE_DIR:INTERNAL=/tmp\n"
+    )
+    assert read_cmake_cache(cache_file) == {
+        "Idefix_DIMENSIONS": CMakeCacheEntry("STRING", "3"),
+        "weird:name": CMakeCacheEntry("BOOL", "ON"),
+        "CMAKE_CXX_FLAGS": CMakeCacheEntry("STRING", "-O3 -g=1"),
+        "CMAKE_CACHEFILE_DIR": CMakeCacheEntry("INTERNAL", "/tmp"),
+    }
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="uses POSIX paths")
+def test_parse_depfile(tmp_path):
+    depfile = tmp_path / "setup.cpp.o.d"
+    depfile.write_text(
+        "CMakeFiles/idefix.dir/setup.cpp.o: /src/setup.cpp \\\n"
+        "  /src/definitions.hpp /idefix/src/idefix.hpp \\\n"
+        "  /path\\ with\\ spaces/a.hpp ../relative.hpp\n"
+        "\n"
+        "# phony targets\n"
+        "/src/definitions.hpp:\n"
+    )
+    assert parse_depfile(str(depfile), base_dir="/build") == {
+        "/src/setup.cpp",
+        "/src/definitions.hpp",
+        "/idefix/src/idefix.hpp",
+        "/path with spaces/a.hpp",
+        "/relative.hpp",
+    }
+
+
+def test_dependency_graph(problem_dir):
+    graph = DependencyGraph(problem_dir)
+    assert graph.get_dependencies() is None
+
+    target_dir = problem_dir / "CMakeFiles" / "idefix.dir"
+    target_dir.mkdir(parents=True)
+    (target_dir / "setup.cpp.o.d").write_text(
+        f"setup.cpp.o: {problem_dir / 'setup.cpp'} definitions.hpp\n"
+    )
+    sources = [
+        str(problem_dir / "CMakeLists.txt"),
+        str(problem_dir / "definitions.hpp"),
+        str(problem_dir / "setup.cpp"),
+        str(problem_dir / "sub" / "module.cpp"),
+    ]
+
+    graph = DependencyGraph(problem_dir)
+    deps = graph.get_dependencies()
+    assert filter_dependencies(sources, deps) == sources[:3]
+    graph.save()
+
+    # parsed files are cached
+    graph = DependencyGraph(problem_dir)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("idefix_cli._rebuild.parse_depfile", pytest.fail)
+        assert graph.get_dependencies() == deps
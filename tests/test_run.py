@@ -1,7 +1,18 @@
+import sys
+
 import pytest
+from packaging.version import Version
 
+import idefix_cli._commands.run
+import idefix_cli._progress
 from idefix_cli.__main__ import idfx_entry_point as main
-from idefix_cli._commands.run import get_highest_power_of_two
+from idefix_cli._commands.run import (
+    _spawn_idefix_lt_1,
+    get_build_jobs,
+    get_highest_power_of_two,
+    get_parallel_layout,
+)
+from idefix_cli._progress import ProgressMonitor, Watchdog
 
 
 def test_times_without_one_step(capsys):
@@ -39,3 +50,229 @@ def test_get_highest_power_of_two(n):
     assert retv.bit_count() == 1  # is a power of two
     assert retv <= n
     assert retv << 1 > n
+
+
+@pytest.fixture()
+def build_resources(monkeypatch, isolated_conf_dir):
+    import idefix_cli._commands.run as run
+
+    monkeypatch.setattr(run, "get_cpu_count", lambda: 16)
+    monkeypatch.setattr(run, "get_host_cpu_count", lambda: 16)
+    monkeypatch.setattr(run, "get_load_average", lambda: 0.0)
+    monkeypatch.setattr(run, "get_available_memory", lambda: 64 * 1024**3)
+    return run
+
+
+def test_build_jobs(build_resources):
+    assert get_build_jobs() == (16, "16 CPUs available")
+
+
+def test_build_jobs_load(build_resources, monkeypatch):
+    monkeypatch.setattr(build_resources, "get_load_average", lambda: 12.2)
+    assert get_build_jobs() == (
+        4,
+        "16 CPUs available, current load average is 12.2",
+    )
+
+
+def test_build_jobs_load_with_quota(build_resources, monkeypatch):
+    # a container limited to 4 CPUs on a busy 64 CPUs host
+    monkeypatch.setattr(build_resources, "get_cpu_count", lambda: 4)
+    monkeypatch.setattr(build_resources, "get_host_cpu_count", lambda: 64)
+    monkeypatch.setattr(build_resources, "get_load_average", lambda: 40.0)
+    assert get_build_jobs() == (4, "4 CPUs available")
+
+    monkeypatch.setattr(build_resources, "get_load_average", lambda: 62.4)
+    assert get_build_jobs() == (
+        2,
+        "4 CPUs available, current load average is 62.4",
+    )
+
+
+def test_build_jobs_memory(build_resources, monkeypatch):
+    monkeypatch.setattr(build_resources, "get_available_memory", lambda: 6 * 1024**3)
+    assert get_build_jobs() == (
+        4,
+        "16 CPUs available, 6.0 GiB of memory available",
+    )
+
+
+def test_build_jobs_from_conf(build_resources, isolated_conf_dir, capsys):
+    conf_file = isolated_conf_dir / "idefix.cfg"
+    conf_file.write_text("[compilation]\njobs = 32\n")
+    assert get_build_jobs() == (32, f"as configured in {conf_file}")
+
+    conf_file.write_text("[compilation]\njobs = many\n")
+    assert get_build_jobs() == (16, "16 CPUs available")
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert err.startswith(
+        "❗ Expected [compilation].jobs to be a strictly positive integer, got 'many'"
+    )
+
+
+@pytest.fixture()
+def topology(monkeypatch):
+    import idefix_cli._commands.run as run
+    from idefix_cli._topology import CPUTopology
+
+    topology = CPUTopology(logical_cpus=32, physical_cores=16, numa_nodes=2, quota=None)
+    monkeypatch.setattr(run, "get_cpu_topology", lambda: topology)
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+    return topology
+
+
+@pytest.mark.parametrize(
+    "options, nproc, expected",
+    [
+        ({}, -1, (-1, None)),
+        ({}, "auto", (-1, None)),
+        ({"Idefix_MPI": "ON"}, "auto", (16, None)),
+        ({"Idefix_MPI": "ON"}, 4, (4, None)),
+        ({"Idefix_MPI": "ON", "Kokkos_ENABLE_CUDA": "ON"}, "auto", (-1, None)),
+        ({"Kokkos_ENABLE_OPENMP": "ON"}, "auto", (-1, 16)),
+        ({"Idefix_MPI": "ON", "Kokkos_ENABLE_OPENMP": "ON"}, "auto", (2, 8)),
+        ({"Idefix_MPI": "ON", "Kokkos_ENABLE_OPENMP": "ON"}, 4, (4, 4)),
+    ],
+)
+def test_parallel_layout(tmp_path, topology, options, nproc, expected):
+    (tmp_path / "CMakeCache.txt").write_text(
+        "".join(f"{key}:BOOL={value}\n" for key, value in options.items())
+    )
+    assert get_parallel_layout(tmp_path, nproc, ()) == expected
+
+
+def test_parallel_layout_dec(tmp_path, topology):
+    (tmp_path / "CMakeCache.txt").write_text(
+        "Idefix_MPI:BOOL=ON\nKokkos_ENABLE_OPENMP:BOOL=ON\n"
+    )
+    assert get_parallel_layout(tmp_path, -1, ("-dec", "2", "2")) == (-1, 4)
+
+
+def test_parallel_layout_omp_num_threads(tmp_path, topology, monkeypatch):
+    (tmp_path / "CMakeCache.txt").write_text("Kokkos_ENABLE_OPENMP:BOOL=ON\n")
+    monkeypatch.setenv("OMP_NUM_THREADS", "3")
+    assert get_parallel_layout(tmp_path, -1, ()) == (-1, None)
+
+
+def test_build_command(tmp_path):
+    from idefix_cli._commands.run import get_build_command
+
+    # configured with Idefix's python script
+    assert get_build_command(tmp_path, jobs=4) == ["make", "-j", "4"]
+
+    (tmp_path / "CMakeCache.txt").write_text("CMAKE_GENERATOR:INTERNAL=Ninja\n")
+    assert get_build_command(tmp_path, jobs=4) == [
+        "cmake",
+        "--build",
+        ".",
+        "--parallel",
+        "4",
+    ]
+
+
+FAKE_IDEFIX_LT_1 = """\
+import signal, sys, time
+
+def stop(signum, frame):
+    with open("idefix.0.log", "a") as fh:
+        fh.write("Main: Job was interrupted before completion.\\n")
+    sys.exit(0)
+
+signal.signal(signal.SIGUSR2, stop)
+with open("idefix.0.log", "w") as fh:
+    for cycle in range(int(sys.argv[1])):
+        fh.write(f"TimeIntegrator: {cycle * 0.1:e} | {cycle} | 1e-1 | 1e4\\n")
+        fh.flush()
+        time.sleep(0.02)
+"""
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires SIGUSR2")
+@pytest.mark.parametrize("ncycles, expected", [(3, -1), (50, 1)])
+def test_spawn_idefix_lt_1(tmp_path, monkeypatch, ncycles, expected):
+    monkeypatch.setattr(
+        idefix_cli._commands.run, "get_idefix_version", lambda: Version("0.9")
+    )
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "idefix.py").write_text(FAKE_IDEFIX_LT_1)
+    cmd = [sys.executable, "idefix.py", "10"]
+    assert _spawn_idefix_lt_1(cmd, ncycles=ncycles) == expected
+
+
+FAKE_IDEFIX = """\
+import time
+with open("idefix.0.log", "w") as fh:
+    fh.write("TimeIntegrator: time | cycle | time step | cell (updates/s)\\n")
+    for cycle in range(5):
+        fh.write(f"TimeIntegrator: {cycle * 0.1:e} | {cycle} | 1e-1 | 1e4\\n")
+        fh.flush()
+        time.sleep(0.02)
+"""
+
+
+def test_monitor_idefix(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(idefix_cli._commands.run, "MONITOR_INTERVAL", 0)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "idefix.py").write_text(FAKE_IDEFIX)
+    # left over from a previous run
+    (tmp_path / "idefix.0.log").write_text(
+        "TimeIntegrator: 1.0e+00 | 1000 | 1e-1 | 1e4\n" * 100
+    )
+    progress = ProgressMonitor(tstop=1.0)
+    cmd = [sys.executable, "idefix.py"]
+    ret, usage = idefix_cli._commands.run._watch_idefix(
+        cmd, progress=progress, monitor=True
+    )
+    assert ret == 0
+    if sys.platform.startswith("win"):
+        assert usage is None
+    else:
+        assert usage.user_time > 0
+        assert usage.max_rss > 0
+    _, err = capsys.readouterr()
+    reports = err.splitlines()
+    assert reports[0].startswith("Progress: t = 0.0000e+00 / 1 (0.0%) | cycle 0")
+    assert reports[-1].startswith("Progress: t = 4.0000e-01 / 1 (40.0%) | cycle 4 |")
+    assert "ETA" in reports[-1]
+
+
+FAKE_STALLED_IDEFIX = """\
+import signal, sys, time
+
+def stop(signum, frame):
+    with open("idefix.0.log", "a") as fh:
+        fh.write("Main: Job was interrupted before completion.\\n")
+    sys.exit(0)
+
+if sys.argv[1] == "graceful":
+    signal.signal(signal.SIGUSR2, stop)
+else:
+    signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+with open("idefix.0.log", "w") as fh:
+    for cycle in range(3):
+        fh.write(f"TimeIntegrator: {cycle * 0.1:e} | {cycle} | 1e-1 | 1e4\\n")
+        fh.flush()
+time.sleep(30)
+"""
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires SIGUSR2")
+@pytest.mark.parametrize("behavior", ["graceful", "unresponsive"])
+def test_stall_timeout(tmp_path, monkeypatch, capsys, behavior):
+    monkeypatch.setattr(idefix_cli._progress, "STOP_GRACE_PERIOD", 0.2)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "idefix.py").write_text(FAKE_STALLED_IDEFIX)
+    cmd = [sys.executable, "idefix.py", behavior]
+    ret, _ = idefix_cli._commands.run._watch_idefix(
+        cmd, progress=ProgressMonitor(), watchdog=Watchdog(stall_timeout=0.3)
+    )
+    _, err = capsys.readouterr()
+    assert "no progress in the last 0s, stopping idefix" in err
+    if behavior == "graceful":
+        assert ret == 0
+        last_line = (tmp_path / "idefix.0.log").read_text().splitlines()[-1]
+        assert last_line == "Main: Job was interrupted before completion."
+    else:
+        assert "idefix is still running, sending it terminate" in err
+        assert ret == -15
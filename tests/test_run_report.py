@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from idefix_cli._commands.run import _stop_idefix
+from idefix_cli._progress import ProgressMonitor
+from idefix_cli._run_report import (
+    ResourceUsage,
+    dump_run_report,
+    make_run_report,
+    poll_process,
+)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires os.wait4")
+def test_poll_process():
+    cmd = [sys.executable, "-c", "import time; time.sleep(0.1); raise SystemExit(3)"]
+    with subprocess.Popen(cmd) as prog:
+        assert poll_process(prog) is None
+        assert prog.returncode is None
+        usage = poll_process(prog, block=True)
+    assert prog.returncode == 3
+    assert usage is not None
+    assert usage.user_time + usage.system_time > 0
+    # a python interpreter uses at least a couple MiB
+    assert usage.max_rss > 1024**2
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires os.wait4")
+@pytest.mark.parametrize("action", ["stop", "terminate", "kill"])
+def test_stop_exited_process(action):
+    # stopping idefix as it exits doesn't reap it,
+    # so its resource usage can still be collected
+    with subprocess.Popen([sys.executable, "-c", "pass"]) as prog:
+        # wait for the process to exit, without reaping it
+        os.waitid(os.P_PID, prog.pid, os.WEXITED | os.WNOWAIT)
+        _stop_idefix(prog, action)
+        usage = poll_process(prog, block=True)
+    assert prog.returncode == 0
+    assert usage is not None
+
+
+def test_run_report(tmp_path):
+    progress = ProgressMonitor()
+    for line in (
+        "TimeIntegrator: time | cycle | time step | cell (updates/s) | MPI overhead (%)",
+        "TimeIntegrator: 0.0e+00 | 0 | 1e-3 | N/A | N/A",
+        "TimeIntegrator: 1.0e-01 | 100 | 1e-3 | 2.0e6 | 3.0",
+        "TimeIntegrator: 2.0e-01 | 200 | 1e-3 | 4.0e6 | 1.0",
+    ):
+        progress.feed(line)
+    usage = ResourceUsage(
+        user_time=10.5,
+        system_time=0.5,
+        max_rss=2**30,
+        voluntary_context_switches=12,
+        involuntary_context_switches=3,
+    )
+    report = make_run_report(
+        ["./idefix", "-i", "idefix.ini"],
+        start=datetime(2025, 5, 9, 12, 30),
+        wall_time=12.25,
+        returncode=0,
+        usage=usage,
+        progress=progress,
+    )
+    dump_run_report(tmp_path / "idfx_run.json", report)
+    assert json.loads((tmp_path / "idfx_run.json").read_text()) == {
+        "version": 1,
+        "command": ["./idefix", "-i", "idefix.ini"],
+        "start": "2025-05-09T12:30:00",
+        "wall_time": 12.25,
+        "returncode": 0,
+        "user_time": 10.5,
+        "system_time": 0.5,
+        "max_rss": 2**30,
+        "voluntary_context_switches": 12,
+        "involuntary_context_switches": 3,
+        "cycles": 200,
+        "time": 0.2,
+        "cell_updates_per_second": 3.0e6,
+        "mpi_overhead": 2.0,
+    }
+
+
+def test_run_report_without_data():
+    report = make_run_report(
+        ["./idefix"],
+        start=datetime(2025, 5, 9),
+        wall_time=1.0,
+        returncode=1,
+        usage=None,
+        progress=ProgressMonitor(),
+    )
+    assert report["max_rss"] is None
+    assert report["cycles"] is None
+    assert report["cell_updates_per_second"] is None
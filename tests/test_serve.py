@@ -0,0 +1,152 @@
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+from signal import SIGINT
+from textwrap import dedent
+
+import pytest
+
+from idefix_cli._client import forward, get_peer_uid
+
+pytestmark = pytest.mark.skipif(
+    sys.platform.startswith("win"), reason="idfx serve is not supported on Windows"
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+@pytest.fixture()
+def server(tmp_path, isolated_cache_dir):
+    socket_path = str(tmp_path / "idfx.sock")
+    env = {**os.environ, "XDG_CACHE_HOME": str(isolated_cache_dir)}
+    env.pop("IDFX_SOCKET", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "idefix_cli", "serve", "--socket", socket_path],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    tstart = time.monotonic()
+    while not os.path.exists(socket_path):
+        if time.monotonic() - tstart > 30:
+            proc.kill()
+            pytest.fail("server failed to start")
+        time.sleep(0.05)
+    yield socket_path
+    proc.send_signal(SIGINT)
+    proc.wait(timeout=10)
+    assert not os.path.exists(socket_path)
+
+
+def test_forward_no_server(tmp_path):
+    ret = forward("idfx", ["read", "idefix.ini"], socket_path=str(tmp_path / "nope"))
+    assert ret is None
+
+
+def test_socket_permissions(server):
+    assert stat.S_IMODE(os.stat(server).st_mode) == 0o600
+
+
+def test_peer_uid():
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        assert get_peer_uid(left) == os.getuid()
+
+
+def test_forward_other_user(server, capfd, monkeypatch):
+    # the server runs as another user: nothing is sent,
+    # and the command is executed locally
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    ret = forward("idfx", ["read", "idefix.ini"], socket_path=server)
+    assert ret is None
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert err == f"ignoring {server}, which isn't served by the current user\n"
+
+
+def test_forward(server, capfd, monkeypatch, tmp_path):
+    inifile = os.path.join(DATA_DIR, "minimal.ini")
+    ret = forward("idfx", ["read", inifile], socket_path=server)
+    assert ret == 0
+    out, err = capfd.readouterr()
+    assert json.loads(out)["Dummy"]["x"] == 1
+    assert err == ""
+
+    # the command runs from the client's working directory
+    monkeypatch.chdir(tmp_path)
+    ret = forward("idfx", ["read", "missing.ini"], socket_path=server)
+    assert ret == 1
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert err == "💥 no such file missing.ini\n"
+
+
+def test_forward_exec(server, capfd, monkeypatch, tmp_path):
+    # commands that replace their process (like idfx conf, which execs cmake)
+    # still report their exit code to the client
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "idefix.cfg").write_text(
+        f"[idefix_cli]\nplugins_directory = {tmp_path / 'plugins'}\n"
+    )
+    (tmp_path / "plugins").mkdir()
+    (tmp_path / "plugins" / "execer.py").write_text(
+        dedent(
+            f"""
+            "a command that replaces its own process"
+            import os
+
+            def add_arguments(parser):
+                return
+
+            def command():
+                cmd = [{sys.executable!r}, "-c", "print('replaced'); exit(3)"]
+                os.execvp(cmd[0], cmd)
+            """
+        )
+    )
+    ret = forward("idfx", ["execer"], socket_path=server)
+    assert ret == 3
+    out, err = capfd.readouterr()
+    assert out == "replaced\n"
+    assert err == ""
+
+
+def test_forward_user_dirs(server, capfd, monkeypatch, tmp_path):
+    # configuration and cache directories are the client's, not the server's
+    conf_dir = tmp_path / "client_config"
+    cache_dir = tmp_path / "client_cache"
+    plugins_dir = tmp_path / "plugins"
+    workdir = tmp_path / "workdir"
+    for path in (conf_dir, cache_dir, plugins_dir, workdir):
+        path.mkdir()
+    (conf_dir / "idefix.cfg").write_text(
+        f"[idefix_cli]\nplugins_directory = {plugins_dir}\n"
+    )
+    (plugins_dir / "cachedir.py").write_text(
+        dedent(
+            """
+            "print the cache directory"
+            from idefix_cli._cache import get_cache_dir
+
+            def add_arguments(parser):
+                return
+
+            def command():
+                print(get_cache_dir())
+                return 0
+            """
+        )
+    )
+    monkeypatch.chdir(workdir)
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(conf_dir))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_dir))
+    ret = forward("idfx", ["cachedir"], socket_path=server)
+    assert ret == 0
+    out, err = capfd.readouterr()
+    assert out == f"{cache_dir / 'idefix_cli'}\n"
+    assert err == ""
@@ -0,0 +1,181 @@
+import json
+import random
+import sys
+
+import inifix
+import pytest
+
+from idefix_cli.__main__ import idfx_entry_point as main
+from idefix_cli._sweep import apply_variant, get_variants, latin_hypercube
+
+BASE_INIFILE = """\
+[Grid]
+X1-grid 1 0.0 64 u 1.0
+
+[TimeIntegrator]
+CFL 0.9
+tstop 1.0
+
+[Hydro]
+solver hllc
+csiso constant 1.0
+"""
+
+FAKE_IDEFIX = """\
+#!/bin/sh
+if grep -q "CFL *0.5" idefix.ini; then
+    echo "Main: Job was aborted because of an unrecoverable error." > idefix.0.log
+else
+    echo "Main: Job completed successfully." > idefix.0.log
+fi
+echo "running with $*"
+"""
+
+
+def test_product_variants():
+    spec = {"parameters": {"TimeIntegrator.CFL": [0.5, 0.9], "Hydro.solver": ["roe"]}}
+    assert get_variants(spec) == [
+        {"TimeIntegrator.CFL": 0.5, "Hydro.solver": "roe"},
+        {"TimeIntegrator.CFL": 0.9, "Hydro.solver": "roe"},
+    ]
+
+
+def test_list_variants():
+    variants = [{"TimeIntegrator.CFL": 0.5}, {"Hydro.solver": "roe"}]
+    assert get_variants({"mode": "list", "variants": variants}) == variants
+
+
+def test_lhs_variants():
+    spec = {
+        "mode": "lhs",
+        "samples": 5,
+        "seed": 0,
+        "parameters": {
+            "TimeIntegrator.CFL": [0.1, 0.6],
+            "TimeIntegrator.tstop": [0, 5],
+        },
+    }
+    variants = get_variants(spec)
+    assert variants == get_variants(spec)
+    # each of the 5 strata is sampled once
+    assert sorted(int(v["TimeIntegrator.CFL"] * 10) for v in variants) == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+    assert sorted(int(v["TimeIntegrator.tstop"]) for v in variants) == [0, 1, 2, 3, 4]
+
+
+def test_latin_hypercube_pairing():
+    rng = random.Random(1)
+    variants = latin_hypercube({"a.x": (0, 1), "a.y": (0, 1)}, 100, rng=rng)
+    pairs = [(int(v["a.x"] * 100), int(v["a.y"] * 100)) for v in variants]
+    # strata are randomly paired between parameters
+    assert pairs != [(i, i) for i in range(100)]
+
+
+@pytest.mark.parametrize(
+    "spec, match",
+    [
+        ({"mode": "grid"}, "unknown mode 'grid'"),
+        ({}, "'product' mode requires 'parameters', a mapping"),
+        ({"parameters": {"Hydro.solver": []}}, "must be mapped to non-empty lists"),
+        ({"parameters": {"solver": ["roe"]}}, "expected parameters named as"),
+        ({"mode": "list", "variants": [1]}, "requires 'variants', a list of mappings"),
+        (
+            {"mode": "lhs", "parameters": {"Hydro.csiso": [0, 1]}},
+            "requires 'samples', a positive integer",
+        ),
+        (
+            {"mode": "lhs", "samples": 2, "parameters": {"Hydro.csiso": [0, 1, 2]}},
+            r"expected an interval \[low, high\] for 'Hydro.csiso'",
+        ),
+    ],
+)
+def test_invalid_spec(spec, match):
+    with pytest.raises(ValueError, match=match):
+        get_variants(spec)
+
+
+def test_apply_variant():
+    conf = inifix.loads(BASE_INIFILE)
+    new_conf = apply_variant(conf, {"TimeIntegrator.CFL": 0.5})
+    assert new_conf["TimeIntegrator"]["CFL"] == 0.5
+    assert conf["TimeIntegrator"]["CFL"] == 0.9
+
+    with pytest.raises(ValueError, match="'Hydro.gamma' isn't defined in the base"):
+        apply_variant(conf, {"Hydro.gamma": 1.4})
+
+
+@pytest.fixture()
+def base_dir(tmp_path):
+    base = tmp_path / "base"
+    base.mkdir()
+    (base / "idefix.ini").write_text(BASE_INIFILE)
+    (base / "setup.cpp").write_text("")
+    (base / "idefix").write_text(FAKE_IDEFIX)
+    (base / "idefix").chmod(0o755)
+    return base
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="requires a shell script")
+def test_sweep(tmp_path, base_dir, capsys):
+    spec = tmp_path / "spec.toml"
+    spec.write_text(
+        '[parameters]\n"TimeIntegrator.CFL" = [0.5, 0.9]\n"TimeIntegrator.tstop" = [1, 2]\n'
+    )
+    outdir = tmp_path / "sweep"
+    ret = main(
+        ["sweep", str(spec), "--dir", str(base_dir), "-o", str(outdir), "--cores", "2"]
+        + ["-nowrite"]
+    )
+    out, err = capsys.readouterr()
+    assert ret != 0
+    assert "Running 4 variants" in out
+    assert "2 at a time" in out
+    assert err.count("Job was aborted because of an unrecoverable error.") == 2
+    assert "2 out of 4 variants failed" in err
+
+    manifest = json.loads((outdir / "sweep.json").read_text())
+    assert manifest["variants"]["3"] == {
+        "TimeIntegrator.CFL": 0.9,
+        "TimeIntegrator.tstop": 2,
+    }
+    variant = outdir / "3"
+    assert (variant / "idefix").resolve() == base_dir / "idefix"
+    assert (variant / "setup.cpp").is_symlink()
+    conf = inifix.load(variant / "idefix.ini")
+    assert conf["TimeIntegrator"] == {"CFL": 0.9, "tstop": 2}
+    assert conf["Hydro"] == inifix.load(base_dir / "idefix.ini")["Hydro"]
+    assert (variant / "idfx_sweep.out").read_text() == (
+        "running with -i idefix.ini -nowrite\n"
+    )
+
+    # variants are never overwritten
+    assert main(["sweep", str(spec), "--dir", str(base_dir), "-o", str(outdir)]) != 0
+    _, err = capsys.readouterr()
+    assert "destination directory exists" in err
+
+
+def test_sweep_dry_run(tmp_path, base_dir, capsys):
+    spec = tmp_path / "spec.json"
+    spec.write_text('{"mode": "list", "variants": [{"Hydro.solver": "roe"}]}')
+    outdir = tmp_path / "sweep"
+    args = ["sweep", str(spec), "--dir", str(base_dir), "-o", str(outdir), "--dry-run"]
+    assert main(args) == 0
+    out, _ = capsys.readouterr()
+    assert "Created 1 variants" in out
+    assert inifix.load(outdir / "0" / "idefix.ini")["Hydro"]["solver"] == "roe"
+    assert not (outdir / "0" / "idfx_sweep.out").exists()
+
+
+def test_sweep_invalid_parameter(tmp_path, base_dir, capsys):
+    spec = tmp_path / "spec.json"
+    spec.write_text('{"parameters": {"Hydro.gamma": [1.4]}}')
+    outdir = tmp_path / "sweep"
+    assert main(["sweep", str(spec), "--dir", str(base_dir), "-o", str(outdir)]) != 0
+    assert not outdir.exists()
+    _, err = capsys.readouterr()
+    assert "'Hydro.gamma' isn't defined in the base inifile" in err
@@ -0,0 +1,94 @@
+import pytest
+
+import idefix_cli._topology as topo
+from idefix_cli._topology import CPUTopology, get_available_memory, get_cpu_quota
+
+
+@pytest.mark.parametrize(
+    "quota, expected_cpus, expected_cores",
+    [(None, 32, 16), (4.0, 4, 4), (0.5, 1, 1), (24.5, 25, 16)],
+)
+def test_effective_resources(quota, expected_cpus, expected_cores):
+    topology = CPUTopology(
+        logical_cpus=32, physical_cores=16, numa_nodes=2, quota=quota
+    )
+    assert topology.effective_cpus == expected_cpus
+    assert topology.effective_cores == expected_cores
+
+
+@pytest.fixture()
+def cgroup(tmp_path, monkeypatch):
+    root = tmp_path / "cgroup"
+    leaf = root / "kubepods" / "pod1"
+    leaf.mkdir(parents=True)
+    monkeypatch.setattr(topo, "CGROUP_ROOT", str(root))
+    monkeypatch.setattr(
+        topo,
+        "_get_cgroup_dirs",
+        lambda controller=None: (
+            [str(leaf), str(leaf.parent), str(root)] if controller is None else []
+        ),
+    )
+    return root
+
+
+def test_cpu_quota(cgroup):
+    assert get_cpu_quota() is None
+
+    (cgroup / "kubepods" / "pod1" / "cpu.max").write_text("max 100000\n")
+    assert get_cpu_quota() is None
+
+    # the most restrictive limit in the hierarchy applies
+    (cgroup / "kubepods" / "cpu.max").write_text("400000 100000\n")
+    (cgroup / "kubepods" / "pod1" / "cpu.max").write_text("250000 100000\n")
+    assert get_cpu_quota() == 2.5
+
+
+def test_cpu_quota_v1(tmp_path, monkeypatch):
+    root = tmp_path / "cgroup"
+    cpu_dir = root / "cpu,cpuacct"
+    leaf = cpu_dir / "kubepods" / "pod1"
+    leaf.mkdir(parents=True)
+    monkeypatch.setattr(topo, "CGROUP_ROOT", str(root))
+    real_read_text = topo._read_text
+
+    def read_text(path):
+        if path == "/proc/self/cgroup":
+            return (
+                "5:memory:/kubepods/pod1\n"
+                "4:cpu,cpuacct:/kubepods/pod1\n"
+                "1:name=systemd:/kubepods/pod1"
+            )
+        return real_read_text(path)
+
+    monkeypatch.setattr(topo, "_read_text", read_text)
+    (cpu_dir / "cpu.cfs_quota_us").write_text("-1\n")
+    (cpu_dir / "cpu.cfs_period_us").write_text("100000\n")
+    assert get_cpu_quota() is None
+
+    # the most restrictive limit in the hierarchy applies
+    (leaf.parent / "cpu.cfs_quota_us").write_text("400000\n")
+    (leaf.parent / "cpu.cfs_period_us").write_text("100000\n")
+    (leaf / "cpu.cfs_quota_us").write_text("150000\n")
+    (leaf / "cpu.cfs_period_us").write_text("100000\n")
+    assert get_cpu_quota() == 1.5
+
+
+def test_available_memory(cgroup, monkeypatch):
+    monkeypatch.setattr(topo, "_read_text", _fake_read_text(cgroup))
+    assert get_available_memory() == 1024**3
+
+
+def _fake_read_text(cgroup):
+    real_read_text = topo._read_text
+
+    def read_text(path):
+        if path == "/proc/meminfo":
+            return "MemTotal: 16777216 kB\nMemAvailable: 8388608 kB\n"
+        if path == str(cgroup / "kubepods" / "memory.max"):
+            return str(3 * 1024**3)
+        if path == str(cgroup / "kubepods" / "memory.current"):
+            return str(2 * 1024**3)
+        return real_read_text(path)
+
+    return read_text
@@ -3,20 +3,25 @@ import pytest
 from idefix_cli.__main__ import idfx_entry_point as main
 
 HELP_MESSAGE = (
-    "usage: idfx [-h] [-v] {clean,clone,conf,digest,read,run,switch,write} ...\n"
+    "usage: idfx [-h] [-v]\n"
+    "            {batch,cache,clean,clone,conf,digest,read,run,serve,sweep,switch,write} ...\n"
     "\n"
     "options:\n"
     "  -h, --help            show this help message and exit\n"
     "  -v, --version         show program's version number and exit\n"
     "\n"
     "commands:\n"
-    "  {clean,clone,conf,digest,read,run,switch,write}\n"
+    "  {batch,cache,clean,clone,conf,digest,read,run,serve,sweep,switch,write}\n"
+    "    batch               run many idfx commands from a single process\n"
+    "    cache               inspect and evict entries from the shared build cache\n"
     "    clean               remove compilation files\n"
     "    clone               clone a problem directory\n"
     "    conf                configure Idefix\n"
     "    digest              agregate performance data from log files as json\n"
     "    read                read an Idefix inifile and print it to json format\n"
     "    run                 run an Idefix problem\n"
+    "    serve               run a resident server to amortize idfx's startup time\n"
+    "    sweep               run parameter sweeps from a problem directory\n"
     "    switch              switch git branch in $IDEFIX_DIR using git checkout\n"
     "    write               write an Idefix inifile from a json string\n"
 )